@@ -3,6 +3,7 @@ import PropTypes from "prop-types";
 import { Mic } from "lucide-react";
 
 import { saveConversationToServer } from "../utils/SaveConversation";
+import { createGraphState, applyGraphDelta, applyGraphSnapshot } from "../utils/graphDelta";
 
 export default function AudioInput({ onDataReceived, onChunksReceived, chunkDict, graphData, conversationId, setConversationId, setMessage, message, fileName, setFileName }) {
   const [recording, setRecording] = useState(false);
@@ -16,6 +17,7 @@ export default function AudioInput({ onDataReceived, onChunksReceived, chunkDict
   const lastAutoSaveRef = useRef({ graphData: null, chunkDict: null }); //last saved data
   const wasRecording = useRef(false);
   const graphDataFromSocket = useRef(false);
+  const liveGraphRef = useRef(createGraphState()); // mirror of the server session graph
 
   const fileNameWasReset = useRef(false);
 
@@ -88,6 +90,28 @@ export default function AudioInput({ onDataReceived, onChunksReceived, chunkDict
     }
   };
 
+  // apply graph_delta / graph_snapshot messages; returns true if the message was one of them
+  const handleGraphMessage = (message) => {
+    const state = liveGraphRef.current;
+
+    if (message.type === "graph_snapshot") {
+      applyGraphSnapshot(state, message);
+    } else if (message.type === "graph_delta") {
+      if (!applyGraphDelta(state, message)) {
+        logToServer(`Missed graph delta (have seq ${state.seq}, got ${message.seq}); requesting resync.`);
+        wsRef.current?.send(JSON.stringify({ type: "resync" }));
+        return true;
+      }
+    } else {
+      return false;
+    }
+
+    graphDataFromSocket.current = true; // Set flag before updating state
+    onDataReceived?.([state.nodes.slice()]);
+    onChunksReceived?.({ ...state.chunks });
+    return true;
+  };
+
   const handleFatalError = async () => {
     setRecording(false);
   
@@ -206,6 +230,7 @@ export default function AudioInput({ onDataReceived, onChunksReceived, chunkDict
     const ws = new WebSocket(WS_URL);
     ws.binaryType = "arraybuffer";
     wsRef.current = ws;
+    liveGraphRef.current = createGraphState();
 
     ws.onopen = () => {
       setRecording(true);
@@ -227,15 +252,9 @@ export default function AudioInput({ onDataReceived, onChunksReceived, chunkDict
       try {
         const message = JSON.parse(event.data);
     
-        if (message.type === "existing_json") {
-          graphDataFromSocket.current = true; // Set flag before updating state
-          onDataReceived?.(message.data);
-        }
-      
-        if (message.type === "chunk_dict") {
-          onChunksReceived?.(message.data);
+        if (handleGraphMessage(message)) {
+          console.log("Graph update:", message.type, message.seq);
         }
-        console.log("Chunk Dict:", message.data);
     
         if (message.text) {
           console.log("Transcript:", message.text);
@@ -313,15 +332,8 @@ export default function AudioInput({ onDataReceived, onChunksReceived, chunkDict
         }
         setRecording(false);
         
-        // existing json finally
-        if (message.type === "existing_json") {
-          onDataReceived?.(message.data);
-        }
-        
-        // chunk dict finally
-        if (message.type === "chunk_dict") {
-          onChunksReceived?.(message.data);
-        }
+        // final graph updates
+        handleGraphMessage(message);
       };
   
       // Save after everything is closed and flushed
@@ -7,6 +7,7 @@ import "reactflow/dist/style.css";
 export default function ContextualGraph({
   graphData,
   chunkDict,
+  onChunkNeeded,
   setGraphData,
   selectedNode,
   setSelectedNode,
@@ -29,6 +30,14 @@ export default function ContextualGraph({
 
   const selectedNodeClaims = selectedNodeData?.claims || [];
 
+  // transcripts loaded lazily: fetch the selected node's chunk when it is opened
+  const selectedChunkId = selectedNodeData?.chunk_id;
+  useEffect(() => {
+    if (showTranscript && selectedChunkId && onChunkNeeded && !(selectedChunkId in (chunkDict || {}))) {
+      onChunkNeeded(selectedChunkId);
+    }
+  }, [showTranscript, selectedChunkId, chunkDict, onChunkNeeded]);
+
   // logging
   useEffect(() => {
     console.log("Full Graph Data(contextual):", graphData);
@@ -339,7 +348,8 @@ export default function ContextualGraph({
           (node) => node.node_name === selectedNode
         );
         const chunkId = selectedNodeData?.chunk_id;
-        const transcript = chunkDict?.[chunkId] || "Transcript not available";
+        const isChunkLoading = onChunkNeeded && chunkId && !(chunkId in (chunkDict || {}));
+        const transcript = chunkDict?.[chunkId] || (isChunkLoading ? "Loading transcript..." : "Transcript not available");
 
         return (
           <div className="p-4 border rounded-lg bg-purple-100 shadow-md mb-2 z-20 max-h-[200px] overflow-y-auto">
@@ -467,6 +477,7 @@ ContextualGraph.propTypes = {
     )
   ),
   chunkDict: PropTypes.object,
+  onChunkNeeded: PropTypes.func,
   setGraphData: PropTypes.func.isRequired,
   selectedNode: PropTypes.string,
   setSelectedNode: PropTypes.func.isRequired,
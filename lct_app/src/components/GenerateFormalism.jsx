@@ -3,6 +3,7 @@ import { authenticatedFetch } from "../utils/api";
 
 export default function GenerateFormalism({
   chunkDict,
+  loadChunks,
   graphData,
   isFormalismView,
   setIsFormalismView,
@@ -19,15 +20,17 @@ export default function GenerateFormalism({
   const latestChunk = graphData?.[graphData.length - 1] || [];
 
   const handleFormalismGenerate = async () => {
-    const dataForFormalism = {
-      chunks: chunkDict || {},
-      graph_data: graphData || {},
-      user_pref: userPref,
-    };
-
     setIsLoading(true);
 
     try {
+      // transcripts may not be loaded yet when the conversation was opened graph-only
+      const chunks = loadChunks ? await loadChunks() : chunkDict;
+      const dataForFormalism = {
+        chunks: chunks || {},
+        graph_data: graphData || {},
+        user_pref: userPref,
+      };
+
       const response = await authenticatedFetch("/generate_formalism/", {
         method: "POST",
         headers: {
@@ -1,16 +1,28 @@
 import { useState, useRef, useEffect } from "react";
 
-export default function SaveJson({ chunkDict}) {
-  const isSaveDisabled = !chunkDict || Object.keys(chunkDict).length === 0;
+export default function SaveJson({ chunkDict, loadChunks }) {
+  // with loadChunks the transcript is fetched on demand, so an empty chunkDict is fine
+  const isSaveDisabled = !loadChunks && (!chunkDict || Object.keys(chunkDict).length === 0);
 
-  const handleSave = () => {
+  const handleSave = async () => {
     if (isSaveDisabled) {
       console.warn("Save action attempted while disabled.");
       return;
     }
 
+    let chunks = chunkDict;
+    if (loadChunks) {
+      try {
+        chunks = await loadChunks();
+      } catch (error) {
+        console.error("Error loading transcript:", error);
+        alert("Error loading transcript. Please try again.");
+        return;
+      }
+    }
+
     // Combine all chunk values into a readable text format
-    const combinedText = Object.entries(chunkDict)
+    const combinedText = Object.entries(chunks || {})
       .map(([id, content]) => `--- Chunk ID: ${id} ---\n${content}`)
       .join("\n\n");
 
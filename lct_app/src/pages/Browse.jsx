@@ -5,6 +5,8 @@ import ShareModal from "../components/ShareModal";
 import { useAuth } from "../contexts/AuthContext";
 import { getUserConversations } from "../utils/api";
 
+const PAGE_SIZE = 25;
+
 export default function Browse() {
   const [conversations, setConversations] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -12,12 +14,14 @@ export default function Browse() {
   const [shareModalOpen, setShareModalOpen] = useState(false);
   const [selectedConversation, setSelectedConversation] = useState(null);
   const [viewType, setViewType] = useState('all'); // 'all', 'owned', 'shared'
+  const [loadingMore, setLoadingMore] = useState(false);
   
-  // Cache for all conversation types
+  // Cache for all conversation types: the pages loaded so far and the cursor of the next one
   const [conversationCache, setConversationCache] = useState({
     all: [],
     owned: [],
     shared: [],
+    cursors: { all: null, owned: null, shared: null },
     loaded: false
   });
   
@@ -47,20 +51,22 @@ export default function Browse() {
 
     setLoading(true);
     try {
-      // Make all three API calls in parallel
-      const [allData, ownedData, sharedData] = await Promise.all([
-        getUserConversations('all'),
-        getUserConversations('owned'),
-        getUserConversations('shared')
+      // First page of all three views in parallel; the backend returns them newest first
+      const [allPage, ownedPage, sharedPage] = await Promise.all([
+        getUserConversations('all', { limit: PAGE_SIZE }),
+        getUserConversations('owned', { limit: PAGE_SIZE }),
+        getUserConversations('shared', { limit: PAGE_SIZE })
       ]);
 
-      // Sort all data (backend should handle this but adding as fallback)
-      const sortByDate = (data) => data.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
-      
       const cache = {
-        all: sortByDate([...allData]),
-        owned: sortByDate([...ownedData]),
-        shared: sortByDate([...sharedData]),
+        all: allPage.conversations,
+        owned: ownedPage.conversations,
+        shared: sharedPage.conversations,
+        cursors: {
+          all: allPage.nextCursor,
+          owned: ownedPage.nextCursor,
+          shared: sharedPage.nextCursor
+        },
         loaded: true
       };
 
@@ -80,6 +86,28 @@ export default function Browse() {
     }
   }, [currentUser, viewType]);
 
+  const handleLoadMore = async () => {
+    const cursor = conversationCache.cursors[viewType];
+    if (!cursor || loadingMore) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await getUserConversations(viewType, { limit: PAGE_SIZE, cursor });
+      const updated = [...conversationCache[viewType], ...page.conversations];
+      setConversationCache((cache) => ({
+        ...cache,
+        [viewType]: updated,
+        cursors: { ...cache.cursors, [viewType]: page.nextCursor }
+      }));
+      setConversations(updated);
+    } catch (err) {
+      console.error("Error fetching more conversations:", err.message);
+      setError("Failed to load more conversations.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleViewTypeChange = (type) => {
     setViewType(type);
     
@@ -210,6 +238,18 @@ export default function Browse() {
               </div>
             </div>
           ))}
+
+          {conversationCache.cursors[viewType] && (
+            <div className="flex justify-center pb-4">
+              <button
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 bg-white/20 text-white font-medium rounded-lg hover:bg-white/30 transition disabled:opacity-50"
+              >
+                {loadingMore ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
         </div>
       )}
       
@@ -1,5 +1,5 @@
 import { useParams, useNavigate } from "react-router-dom";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 // import Input from "./components/Input";
 // import AudioInput from "../components/AudioInput";
 import StructuralGraph from "../components/StructuralGraph";
@@ -12,12 +12,14 @@ import FormalismList from "../components/FormalismList";
 import FormalismCanvas from "../components/FormalismCanvas";
 import AuthButton from "../components/AuthButton";
 import { useAuth } from "../contexts/AuthContext";
-import { getUserConversation } from "../utils/api";
+import { getUserConversation, getConversationChunk } from "../utils/api";
 
 export default function ViewConversation() {
   const [graphData, setGraphData] = useState([]); // Stores graph data
   const [selectedNode, setSelectedNode] = useState(null); // Tracks selected node
-  const [chunkDict, setChunkDict] = useState({}); // Stores chunk data
+  const [chunkDict, setChunkDict] = useState({}); // Stores chunk data, filled lazily
+  const allChunksRef = useRef(null); // pending/finished load of every chunk
+  const pendingChunksRef = useRef(new Set()); // chunk ids being fetched
   const [isFormalismView, setIsFormalismView] = useState(false); // stores layout state: formalism or browsability
   const [selectedFormalism, setSelectedFormalism] = useState(null); // stores selected formalism
   const [formalismData, setFormalismData] = useState({}); // Stores Formalism data
@@ -36,7 +38,8 @@ useEffect(() => {
 
   const loadConversation = async () => {
     try {
-      const data = await getUserConversation(conversationId);
+      // graph only; transcripts are fetched per chunk when a node is opened
+      const data = await getUserConversation(conversationId, { includeChunks: false });
       
       if (data.graph_data) {
         setGraphData((prevGraphData) => {
@@ -49,7 +52,6 @@ useEffect(() => {
           return mergeGraphDataWithUserAnnotations(prevGraphData, data.graph_data);
         });
       }
-      if (data.chunk_dict) setChunkDict(data.chunk_dict);
     } catch (err) {
       console.error("Failed to load conversation:", err);
       if (err.message.includes('Authentication failed')) {
@@ -59,9 +61,43 @@ useEffect(() => {
     }
   };
 
+  allChunksRef.current = null;
+  pendingChunksRef.current = new Set();
+  setChunkDict({});
   loadConversation();
 }, [conversationId, currentUser, navigate]);
 
+const loadChunk = useCallback(async (chunkId) => {
+  if (pendingChunksRef.current.has(chunkId)) return;
+  pendingChunksRef.current.add(chunkId);
+  try {
+    const text = await getConversationChunk(conversationId, chunkId);
+    setChunkDict((prev) => ({ ...prev, [chunkId]: text }));
+  } catch (err) {
+    console.error("Failed to load transcript chunk:", err);
+    setChunkDict((prev) => ({ ...prev, [chunkId]: null }));
+  } finally {
+    pendingChunksRef.current.delete(chunkId);
+  }
+}, [conversationId]);
+
+// full transcript, for formalism generation and export
+const loadAllChunks = useCallback(() => {
+  if (!allChunksRef.current) {
+    allChunksRef.current = getUserConversation(conversationId)
+      .then((data) => {
+        const chunks = data.chunk_dict || {};
+        setChunkDict(chunks);
+        return chunks;
+      })
+      .catch((err) => {
+        allChunksRef.current = null;
+        throw err;
+      });
+  }
+  return allChunksRef.current;
+}, [conversationId]);
+
 // Helper function to preserve user annotations when receiving backend updates
 const mergeGraphDataWithUserAnnotations = (currentData, incomingData) => {
   if (!incomingData || incomingData.length === 0) return currentData;
@@ -110,6 +146,7 @@ useEffect(() => {
           <div className="flex flex-col md:flex-row items-end md:items-center gap-2">
             <GenerateFormalism
               chunkDict={chunkDict}
+              loadChunks={loadAllChunks}
               graphData={graphData}
               isFormalismView={isFormalismView}
               setIsFormalismView={setIsFormalismView}
@@ -121,7 +158,7 @@ useEffect(() => {
 
         {/* Right: Auth Button and Save Transcript */}
         <div className="hidden md:flex justify-end w-full items-center gap-2">
-          {graphData.length > 0 && <SaveTranscript chunkDict={chunkDict} />}
+          {graphData.length > 0 && <SaveTranscript chunkDict={chunkDict} loadChunks={loadAllChunks} />}
           <AuthButton />
         </div>
 
@@ -140,6 +177,7 @@ useEffect(() => {
             <ContextualGraph
                 graphData={graphData}
                 chunkDict={chunkDict}
+                onChunkNeeded={loadChunk}
                 setGraphData={setGraphData}
                 selectedNode={selectedNode}
                 setSelectedNode={setSelectedNode}
@@ -181,6 +219,7 @@ useEffect(() => {
               <ContextualGraph
                 graphData={graphData}
                 chunkDict={chunkDict}
+                onChunkNeeded={loadChunk}
                 setGraphData={setGraphData}
                 selectedNode={selectedNode}
                 setSelectedNode={setSelectedNode}
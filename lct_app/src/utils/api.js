@@ -49,8 +49,12 @@ export async function authenticatedFetch(url, options = {}) {
 /**
  * Get conversations for the current user based on view type
  * @param {string} viewType - 'all', 'owned', or 'shared'
+ * @param {Object} options
+ * @param {number} [options.limit] - page size; omit to fetch the full list
+ * @param {string} [options.cursor] - nextCursor of the previous page
+ * @returns {Promise<{conversations: Array, nextCursor: string|null}>}
  */
-export async function getUserConversations(viewType = 'all') {
+export async function getUserConversations(viewType = 'all', { limit, cursor } = {}) {
   try {
     let endpoint;
     switch (viewType) {
@@ -66,14 +70,22 @@ export async function getUserConversations(viewType = 'all') {
         break;
     }
 
-    const response = await authenticatedFetch(endpoint);
+    const params = new URLSearchParams();
+    if (limit) params.set('limit', limit);
+    if (cursor) params.set('cursor', cursor);
+    const query = params.toString();
+
+    const response = await authenticatedFetch(query ? `${endpoint}?${query}` : endpoint);
     
     if (!response.ok) {
       const errorData = await response.json().catch(() => ({}));
       throw new Error(errorData.detail || 'Failed to fetch conversations');
     }
 
-    return await response.json();
+    return {
+      conversations: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+    };
   } catch (error) {
     console.error('Error fetching user conversations:', error);
     throw error;
@@ -82,10 +94,12 @@ export async function getUserConversations(viewType = 'all') {
 
 /**
  * Get a specific conversation by ID
+ * @param {boolean} includeChunks - false to load only the graph (chunk_dict comes back empty)
  */
-export async function getUserConversation(conversationId) {
+export async function getUserConversation(conversationId, { includeChunks = true } = {}) {
   try {
-    const response = await authenticatedFetch(`/conversations/${conversationId}`);
+    const query = includeChunks ? '' : '?include_chunks=false';
+    const response = await authenticatedFetch(`/conversations/${conversationId}${query}`);
     
     if (!response.ok) {
       const errorData = await response.json().catch(() => ({}));
@@ -99,6 +113,27 @@ export async function getUserConversation(conversationId) {
   }
 }
 
+/**
+ * Get the transcript text of one chunk of a conversation
+ */
+export async function getConversationChunk(conversationId, chunkId) {
+  try {
+    const response = await authenticatedFetch(
+      `/conversations/${conversationId}/chunks/${encodeURIComponent(chunkId)}`
+    );
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.detail || 'Failed to fetch transcript chunk');
+    }
+
+    return (await response.json()).text;
+  } catch (error) {
+    console.error('Error fetching transcript chunk:', error);
+    throw error;
+  }
+}
+
 /**
  * Save conversation data
  */
@@ -0,0 +1,48 @@
+/**
+ * Client side of the /ws/audio graph update protocol.
+ *
+ * The server sends a `graph_delta` per processed batch ({seq, added_nodes,
+ * updated_nodes, new_chunks}) and a `graph_snapshot` ({seq, graph_data,
+ * chunk_dict}) when the client asks to resync.
+ */
+
+export function createGraphState() {
+  return { seq: 0, nodes: [], index: new Map(), chunks: {} };
+}
+
+/**
+ * Replace the state with a full snapshot
+ */
+export function applyGraphSnapshot(state, snapshot) {
+  const nodes = snapshot.graph_data?.[0] || [];
+  state.seq = snapshot.seq;
+  state.nodes = nodes.slice();
+  state.index = new Map(nodes.map((node, i) => [node.node_name, i]));
+  state.chunks = { ...(snapshot.chunk_dict || {}) };
+  return state;
+}
+
+/**
+ * Apply one delta in place. Returns false (leaving the state untouched) when
+ * the delta is out of sequence, in which case the caller should resync.
+ */
+export function applyGraphDelta(state, delta) {
+  if (delta.seq !== state.seq + 1) {
+    return false;
+  }
+
+  // updated nodes get new objects so React sees the change
+  for (const { node_name, fields } of delta.updated_nodes || []) {
+    const i = state.index.get(node_name);
+    if (i !== undefined) {
+      state.nodes[i] = { ...state.nodes[i], ...fields };
+    }
+  }
+  for (const node of delta.added_nodes || []) {
+    state.index.set(node.node_name, state.nodes.length);
+    state.nodes.push(node);
+  }
+  Object.assign(state.chunks, delta.new_chunks || {});
+  state.seq = delta.seq;
+  return true;
+}
@@ -1,24 +1,24 @@
 import anthropic
 import os
 import json
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, Query, BackgroundTasks, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.concurrency import run_in_threadpool
 from websockets.exceptions import ConnectionClosedError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, Response
 from pydantic import BaseModel, HttpUrl
 import time
-from typing import Dict, Generator, List, Any, Optional
+from typing import AsyncGenerator, Dict, Generator, List, Any, Optional, Set
 import uuid
 import random
 import requests
 import asyncio
+import threading
 import websockets
 from google import genai
 from google.genai import types
 from pathlib import Path
-from google.cloud import storage
 from datetime import datetime
 import urllib.parse
 from langchain_openai import ChatOpenAI
@@ -29,9 +29,24 @@ from langchain.schema import HumanMessage, SystemMessage, AIMessage
 # from lct_python_backend.db_helpers import get_all_conversations, insert_conversation_metadata, get_conversation_gcs_path
 # from firestore_db import get_all_conversations_test, insert_conversation_metadata_test, get_conversation_gcs_path_test, share_conversation_test, get_all_accessible_conversations_test, get_conversation_shared_users_test, remove_user_from_conversation_test, get_owned_conversations_test, get_shared_conversations_test
 # from firebase_auth import initialize_firebase_admin, verify_firebase_token, get_user_by_email, get_users_by_uids
-from lct_python_backend.firestore_db import get_all_conversations_test, insert_conversation_metadata_test, get_conversation_gcs_path_test, share_conversation_test, get_all_accessible_conversations_test, get_conversation_shared_users_test, remove_user_from_conversation_test, get_owned_conversations_test, get_shared_conversations_test
-from lct_python_backend.firebase_auth import initialize_firebase_admin, verify_firebase_token, get_user_by_email, get_users_by_uids
+from lct_python_backend.conversation_store import get_blob_store, get_metadata_store, BlobNotFoundError
+from lct_python_backend.conversation_codec import decode_conversation
+from lct_python_backend.conversation_log import LOG_KEEP_SNAPSHOTS, conversation_log, VersionNotFoundError
+from lct_python_backend.firebase_auth import initialize_firebase_admin, verify_firebase_token, get_users_by_uids, resolve_users_by_emails, normalize_email
+from lct_python_backend.conversation_graph import ConversationGraph
+from lct_python_backend.node_store import CompactNodeStore
+from lct_python_backend.graph_repair import repair_and_add_nodes
+from lct_python_backend.node_dedup import NearDuplicateIndex, merge_near_duplicates
+from lct_python_backend.graph_cache import graph_cache, conversation_cache
+from lct_python_backend.graph_delta import build_graph_delta, build_graph_snapshot
+from lct_python_backend.graph_analytics import refresh_graph_analytics
+from lct_python_backend.search_index import index_conversation, search_nodes, conversation_file_names
+from lct_python_backend.semantic_index import semantic_index
+from lct_python_backend.loopy_diagram import parse_loopy, parse_loopy_reply, normalize_loopy, encode_loopy_url
+from lct_python_backend.job_queue import job_queue, QueueFullError
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 # from dotenv import load_dotenv
 
 # load_dotenv() 
@@ -40,6 +55,10 @@ from contextlib import asynccontextmanager
 BATCH_SIZE = 4
 MAX_BATCH_SIZE = 12
 
+# formalism generation: concurrent LLM calls per request and per-call timeout (seconds)
+FORMALISM_CONCURRENCY = int(os.getenv("FORMALISM_CONCURRENCY", "8"))
+FORMALISM_TIMEOUT = float(os.getenv("FORMALISM_TIMEOUT", "180"))
+
 
 # Directory to save JSON files
 # SAVE_DIRECTORY = "../saved_json"
@@ -67,7 +86,13 @@ MAX_BATCH_SIZE = 12
 @asynccontextmanager
 async def lifespan(app):
     initialize_firebase_admin()
+    get_blob_store().connect()
+    await get_metadata_store().connect()
+    await job_queue.start()
     yield
+    await job_queue.stop()
+    await get_metadata_store().close()
+    get_blob_store().close()
 
 lct_app = FastAPI(lifespan=lifespan)
 
@@ -78,6 +103,7 @@ lct_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "ETag"],  # next page token of the paginated listings
 )
 
 # Serve JS/CSS/assets from Vite build folder
@@ -100,7 +126,9 @@ GOOGLEAI_API_KEY = os.getenv("GOOGLEAI_API_KEY")
 
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
 
-GCS_FOLDER = os.getenv("GCS_FOLDER")
+GCS_FOLDER = os.getenv("GCS_FOLDER", "conversations")
+# upper bound for ?limit= on the conversation listings
+CONVERSATION_PAGE_MAX = int(os.getenv("CONVERSATION_PAGE_MAX", "200"))
 
 VITE_API_URL = os.getenv("VITE_API_URL")
 
@@ -174,6 +202,7 @@ class SaveJsonResponse(BaseModel):
     message: str
     file_id: str  # UUID of the saved file
     file_name: str  # Original file name provided by the user
+    version: Optional[int] = None  # version this save created
     
 class generateFormalismRequest(BaseModel):
     chunks: dict
@@ -194,6 +223,74 @@ class SaveJsonResponseExtended(BaseModel):
 class ConversationResponse(BaseModel):
     graph_data: List[Any]
     chunk_dict: Dict[str, Any]
+    version: Optional[int] = None
+    latest_version: Optional[int] = None
+
+class ChunkResponse(BaseModel):
+    chunk_id: str
+    text: Any
+
+class GraphNodesResponse(BaseModel):
+    nodes: List[Any]
+    total: int
+    offset: int
+    limit: int
+
+class GraphPathResponse(BaseModel):
+    path: List[str]
+    nodes: List[Any]
+
+class GraphAnalyticsResponse(BaseModel):
+    version: str
+    node_count: int
+    edge_count: int
+    degree_centrality: Dict[str, float]
+    betweenness_centrality: Dict[str, float]
+    top_degree: List[Dict[str, Any]]
+    top_betweenness: List[Dict[str, Any]]
+    thread_clusters: List[List[str]]
+    bookmark_reach: Dict[str, int]
+    longest_contextual_chains: List[List[str]]
+
+class SearchHit(BaseModel):
+    conversation_id: str
+    file_name: Optional[str]
+    node_name: str
+    chunk_id: Optional[str]
+    snippet: str
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+class JobResultResponse(JobStatusResponse):
+    result: Optional[Any] = None
+
+class RelatedThread(BaseModel):
+    conversation_id: str
+    file_name: Optional[str]
+    node_name: str
+    summary: Optional[str]
+    score: float
+
+class RelatedThreadsResponse(BaseModel):
+    node_name: str
+    related: List[RelatedThread]
     
 class Citation(BaseModel):
     title: str
@@ -1411,20 +1508,16 @@ def convert_to_loopy_url(data_dict, base_url="https://ncase.me/loopy/v1.1/"):
         base_url: Base URL for LOOPY (default: v1.1)
     
     Returns:
-        Complete LOOPY URL with encoded data
+        Complete LOOPY URL with encoded data. The structure is validated and repaired
+        locally first (see loopy_diagram.normalize_loopy).
     """
     
-    if isinstance(data_dict, str):
-        cleaned = data_dict.strip()
-        data_structure = json.loads(cleaned)
-    else:
-        data_structure = data_dict
+    data_structure, report = normalize_loopy(parse_loopy(data_dict))
+    print(f"[INFO]: LOOPY diagram normalized: {report}")
+    if not report["loops"]:
+        print("[WARNING]: LOOPY diagram has no feedback loop")
     
-    json_string = json.dumps(data_structure, separators=(',', ':'))
-    
-    encoded_data = urllib.parse.quote(json_string)
-    
-    loopy_url = f"{base_url}?data={encoded_data}"
+    loopy_url = encode_loopy_url(data_structure, base_url)
     
     return loopy_url
 
@@ -1458,14 +1551,17 @@ def causal_loop_formalism_generator(
                 AIMessage(content="[")
             ]
     
-    result = "[" + call_openrouter_langchain(
+    response = call_openrouter_langchain(
         messages=messages,
         model=model,
         temp=temp,
         max_tokens=max_tokens,
     )
+    if response is None:
+        return None
     
-    loopy_url = convert_to_loopy_url(result)
+    # the reply continues the "[" prefill above
+    loopy_url = convert_to_loopy_url(parse_loopy_reply(response, prefill="["))
     
     return loopy_url
 
@@ -1613,22 +1709,27 @@ def stream_generate_context_json(chunks: Dict[str, str]) -> Generator[str, None,
     if not isinstance(chunks, dict):
         raise TypeError("The chunks must be a dictionary.")
     
-    existing_json = []
+    graph = ConversationGraph()
+    dedup_index = NearDuplicateIndex()
     
     for chunk_id, chunk_text in chunks.items():
-        mod_input = f'Existing JSON : \n {repr(existing_json)} \n\n Transcript Input: \n {chunk_text}'
+        mod_input = f'Existing JSON : \n {repr(graph.nodes)} \n\n Transcript Input: \n {chunk_text}'
         output_json = generate_lct_json_gemini(mod_input)
         # output_json = generate_lct_json_claude(mod_input)
 
         if output_json is None:
-            yield json.dumps(existing_json)  # Send whatever we have so far
+            yield json.dumps(graph.nodes)  # Send whatever we have so far
             continue
 
         for item in output_json:
             item["chunk_id"] = chunk_id  # Attach chunk ID
 
-        existing_json.extend(output_json)
-        yield json.dumps(existing_json)
+        # overlapping chunks re-emit the same discussion; fold those into the earlier node
+        output_json, merged_nodes = merge_near_duplicates(graph, dedup_index, output_json)
+        repair = repair_and_add_nodes(graph, output_json, merged_nodes)
+        for node in repair["added"]:
+            dedup_index.add(node)
+        yield json.dumps(graph.nodes)
         time.sleep(0.5)
 
 # saving the JSON file
@@ -1705,60 +1806,63 @@ def save_json_to_gcs(
     graph_data: list,
     conversation_id: str = None
 ) -> dict:
+    """
+    Appends a version to the conversation's log (see conversation_log): only the nodes
+    and chunks changed since the last save are written
+    """
     try:
-        client = storage.Client()
-        bucket = client.bucket(GCS_BUCKET_NAME)
-
         file_id = conversation_id or str(uuid.uuid4())
-        object_path = f"{GCS_FOLDER}/{file_id}.json"
-        blob = bucket.blob(object_path)
-
-        data = {
-            "file_name": file_name,
-            "conversation_id": file_id,
-            "chunks": chunks,
-            "graph_data": graph_data
-        }
-
-        blob.upload_from_string(json.dumps(data, indent=4), content_type="application/json")
+        saved = conversation_log.save(f"{GCS_FOLDER}/{file_id}", file_name, chunks, graph_data)
 
         return {
             "file_id": file_id,
             "file_name": file_name,
             "message": "Saved to GCS successfully",
-            "gcs_path": f"{object_path}"  # path for DB
+            "gcs_path": saved["head_path"],  # path for DB
+            "version": saved["version"],
+            "needs_compaction": saved["needs_compaction"],
         }
 
     except Exception as e:
         print(f"[FATAL] Failed to save JSON to GCS: {e}")
         raise
-    
-def load_conversation_from_gcs(gcs_path: str) -> dict:
+
+def is_legacy_conversation_path(gcs_path: str) -> bool:
+    """
+    Conversations saved before the versioned log are a single JSON object
+    """
+    return gcs_path.endswith(".json")
+
+def load_conversation_from_gcs(gcs_path: str, include_chunks: bool = True, version: Optional[int] = None) -> dict:
+    """
+    graph_data and chunk_dict of a stored conversation at `version` (default latest);
+    chunk_dict is left empty when include_chunks is False
+    """
     try:
         # Split GCS path into bucket and object path
         if "/" not in gcs_path:
             raise ValueError("Invalid GCS path. Must be in format 'bucket/path/to/file.json'")
 
-        bucket_name = GCS_BUCKET_NAME
-        object_path = gcs_path
-
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(object_path)
-
-        if not blob.exists():
+        try:
+            if is_legacy_conversation_path(gcs_path):
+                if version not in (None, 1):
+                    raise VersionNotFoundError(f"Version {version} not found")
+                data = decode_conversation(get_blob_store().download(gcs_path))
+                data = {"graph_data": data.get("graph_data"), "chunk_dict": data.get("chunks"),
+                        "version": 1, "latest_version": 1}
+            else:
+                data = conversation_log.load(gcs_path, version=version, include_chunks=include_chunks)
+        except BlobNotFoundError:
             raise HTTPException(status_code=404, detail="Conversation file not found in GCS.")
-        data = json.loads(blob.download_as_string())
-        graph_data = data.get("graph_data")
-        chunk_dict = data.get("chunks")
+        except VersionNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Version {version} not found.")
 
-        if graph_data is None or chunk_dict is None:
+        if data["graph_data"] is None or data["chunk_dict"] is None:
             raise HTTPException(status_code=422, detail="Invalid conversation file structure.")
 
-        return {
-            "graph_data": graph_data,
-            "chunk_dict": chunk_dict,
-        }
+        if not include_chunks:
+            data["chunk_dict"] = {}
+        return data
 
     except HTTPException:
         raise
@@ -1766,12 +1870,46 @@ def load_conversation_from_gcs(gcs_path: str) -> dict:
         print(f"[FATAL] GCS error loading path '{gcs_path}': {e}")
         raise HTTPException(status_code=500, detail=f"GCS error: {str(e)}")
 
-def get_node_by_name(graph_data, node_name):
-    for node in graph_data:
-        if node.get("node_name") == node_name:
-            return node
-    return None
+def load_conversation_chunk(gcs_path: str, chunk_id: str) -> Any:
+    """
+    Text of one chunk of the latest version
+    """
+    try:
+        if is_legacy_conversation_path(gcs_path):
+            text = load_conversation_from_gcs(gcs_path)["chunk_dict"].get(chunk_id)
+        else:
+            try:
+                text = conversation_log.load_chunk(gcs_path, chunk_id)
+            except BlobNotFoundError:
+                raise HTTPException(status_code=404, detail="Conversation file not found in GCS.")
+        if text is None:
+            raise HTTPException(status_code=404, detail="Chunk not found.")
+        return text
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FATAL] GCS error loading chunk '{chunk_id}' of '{gcs_path}': {e}")
+        raise HTTPException(status_code=500, detail=f"GCS error: {str(e)}")
+
+def load_conversation_cached(gcs_path: str, generation: str, include_chunks: bool = True, version: Optional[int] = None) -> dict:
+    """
+    load_conversation_from_gcs through the in-process cache; a cached entry is used only
+    if it was read from the same object generation
+    """
+    key = (gcs_path, version, include_chunks)
+    cached = conversation_cache.get(key)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    data = load_conversation_from_gcs(gcs_path, include_chunks=include_chunks, version=version)
+    conversation_cache.set(key, (generation, data))
+    return data
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
 
 def convert_to_embedded(loopy_link, width=1000, height=600):
 
@@ -1783,34 +1921,193 @@ def convert_to_embedded(loopy_link, width=1000, height=600):
         raise ValueError(f"Failed to convert to Loopy URL: {str(e)}")
 
 
-def generate_formalism(chunks: dict, graph_data: dict, user_pref: str) -> List:
-    
-    formalism_list = []
-    for node in graph_data[0]:
-        contextual_node =''
+def build_formalism_inputs(chunks: dict, graph_data: list, user_pref: str) -> List[tuple]:
+    """
+    (node_name, formalism prompt input) for every contextual-progress node
+    """
+    graph = ConversationGraph.from_graph_data(graph_data)
+    inputs = []
+    for node in graph.contextual_progress_nodes():
+        contextual_node = str(node)
         related_nodes = ''
-        raw_text = ''
-        loopy_url = None
-        if 'is_contextual_progress' in node and node['is_contextual_progress']:
-            contextual_node = str(node)
-            for n in node['linked_nodes']:
-                related_nodes += "\n" + str(get_node_by_name(graph_data[0], n))
-            chunk_id = node['chunk_id']
-            raw_text = chunks[chunk_id]
-            
-            formalism_input = f"conversation_data: \n contextual node : \n {contextual_node} \n related nodes : \n {related_nodes} \n user_research_background : \n generate formalisms {user_pref} \n raw_text : \n {raw_text}"
-            # loopy_url = generate_individual_formalism(formalism_input=formalism_input)
-            loopy_url = causal_loop_formalism_generator(user_input=formalism_input)
-            formal_proof = deepseek_prover_formalism_generator(user_input=formalism_input)
-            if loopy_url:
-                # iframe_loopy_url = convert_to_embedded(loopy_url)
-                formalism_list.append({
-                    'formalism_node' : node['node_name'],
-                    'formalism_graph_url' : loopy_url,
-                    'formal_proof' : formal_proof
-                })
+        for related_node in graph.get_linked_nodes(node['node_name']):
+            related_nodes += "\n" + str(related_node)
+        chunk_id = node['chunk_id']
+        raw_text = chunks[chunk_id]
+        
+        formalism_input = f"conversation_data: \n contextual node : \n {contextual_node} \n related nodes : \n {related_nodes} \n user_research_background : \n generate formalisms {user_pref} \n raw_text : \n {raw_text}"
+        inputs.append((node['node_name'], formalism_input))
+    return inputs
+
+# worker threads for the blocking formalism LLM calls; sized above FORMALISM_CONCURRENCY so
+# calls abandoned after a timeout (threads cannot be interrupted) don't starve new ones
+formalism_executor = ThreadPoolExecutor(max_workers=2 * FORMALISM_CONCURRENCY, thread_name_prefix="formalism")
+
+async def run_formalism_call(semaphore: asyncio.Semaphore, generator, formalism_input: str, timeout: float):
+    """
+    Run one blocking generator off the event loop. Returns (result, error message).
+    """
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(formalism_executor, partial(generator, user_input=formalism_input)),
+                timeout,
+            )
+            return result, None
+        except asyncio.TimeoutError:
+            return None, f"timed out after {timeout:g}s"
+        except Exception as e:
+            return None, str(e)
+
+async def generate_formalism(
+    chunks: dict,
+    graph_data: list,
+    user_pref: str,
+    concurrency: int = FORMALISM_CONCURRENCY,
+    timeout: float = FORMALISM_TIMEOUT,
+) -> List:
+    """
+    Causal loop diagram and formal proof for every contextual-progress node. Both
+    generators for all nodes run concurrently, at most `concurrency` at a time; a failed
+    or timed-out call leaves its field empty instead of failing the request.
+    """
+    inputs = build_formalism_inputs(chunks, graph_data, user_pref)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    calls = []
+    for _, formalism_input in inputs:
+        calls.append(run_formalism_call(semaphore, causal_loop_formalism_generator, formalism_input, timeout))
+        calls.append(run_formalism_call(semaphore, deepseek_prover_formalism_generator, formalism_input, timeout))
+    results = await asyncio.gather(*calls)
+
+    formalism_list = []
+    for i, (node_name, _) in enumerate(inputs):
+        (loopy_url, loopy_error), (formal_proof, proof_error) = results[2 * i], results[2 * i + 1]
+        if proof_error:
+            print(f"[WARNING]: Formal proof for '{node_name}' failed: {proof_error}")
+        if not loopy_url:
+            print(f"[WARNING]: Causal loop diagram for '{node_name}' failed: {loopy_error}")
+            continue
+        # iframe_loopy_url = convert_to_embedded(loopy_url)
+        formalism_list.append({
+            'formalism_node' : node_name,
+            'formalism_graph_url' : loopy_url,
+            'formal_proof' : formal_proof
+        })
+    print(f"[INFO]: Generated formalisms for {len(formalism_list)}/{len(inputs)} nodes")
     return formalism_list
 
+async def stream_formalism_events(
+    inputs: List[tuple],
+    concurrency: int = FORMALISM_CONCURRENCY,
+    timeout: float = FORMALISM_TIMEOUT,
+) -> AsyncGenerator[dict, None]:
+    """
+    Same fan-out as generate_formalism over build_formalism_inputs output, yielding
+    events as calls complete:
+    - start: {total_nodes, total_calls}
+    - formalism: {formalism_node, formalism_graph_url, formal_proof, complete}; sent once
+      the diagram is ready (formal_proof None and complete False if the proof is still
+      running), and again when the proof arrives. A proof that finishes first is held
+      back until the node's diagram is sent.
+    - error: {formalism_node, stage ("formalism_graph_url" or "formal_proof"), detail}
+    - progress: {completed, total_calls} after every call
+    - done: {completed_nodes, failed_calls}
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def tagged(node_name, stage, generator, formalism_input):
+        result, error = await run_formalism_call(semaphore, generator, formalism_input, timeout)
+        return node_name, stage, result, error
+
+    tasks = []
+    for node_name, formalism_input in inputs:
+        tasks.append(asyncio.ensure_future(tagged(node_name, "formalism_graph_url", causal_loop_formalism_generator, formalism_input)))
+        tasks.append(asyncio.ensure_future(tagged(node_name, "formal_proof", deepseek_prover_formalism_generator, formalism_input)))
+
+    yield {"type": "start", "total_nodes": len(inputs), "total_calls": len(tasks)}
+    # node_name -> {"formalism_graph_url", "formal_proof"} of finished calls (None if failed)
+    finished: Dict[str, dict] = {}
+    completed_nodes = 0
+    failed_calls = 0
+    try:
+        for completed, next_done in enumerate(asyncio.as_completed(tasks), start=1):
+            node_name, stage, result, error = await next_done
+            node = finished.setdefault(node_name, {})
+            node[stage] = result
+            if error or not result:
+                failed_calls += 1
+                yield {"type": "error", "formalism_node": node_name, "stage": stage, "detail": error or "empty response"}
+
+            if "formalism_graph_url" in node:
+                both = "formal_proof" in node
+                # the diagram goes out on its own completion; the proof only once the diagram has
+                if stage == "formalism_graph_url" or both:
+                    if node["formalism_graph_url"] or node.get("formal_proof"):
+                        yield {
+                            "type": "formalism",
+                            "formalism_node": node_name,
+                            "formalism_graph_url": node["formalism_graph_url"],
+                            "formal_proof": node.get("formal_proof"),
+                            "complete": both,
+                        }
+                        completed_nodes += both
+            yield {"type": "progress", "completed": completed, "total_calls": len(tasks)}
+    finally:
+        # client went away: stop waiting on the remaining calls
+        for task in tasks:
+            task.cancel()
+
+    print(f"[INFO]: Streamed formalisms for {completed_nodes}/{len(inputs)} nodes ({failed_calls} failed calls)")
+    yield {"type": "done", "completed_nodes": completed_nodes, "failed_calls": failed_calls}
+
+async def format_formalism_stream(events: AsyncGenerator[dict, None], sse: bool) -> AsyncGenerator[str, None]:
+    async for event in events:
+        if sse:
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        else:
+            yield json.dumps(event) + "\n"
+
+# background job handlers: (payload, report_progress) -> result
+async def formalism_job(payload: dict, report_progress) -> dict:
+    inputs = build_formalism_inputs(payload["chunks"], payload["graph_data"], payload["user_pref"])
+    formalisms: Dict[str, dict] = {}
+    async for event in stream_formalism_events(inputs):
+        if event["type"] == "formalism" and event["formalism_graph_url"]:
+            formalisms[event["formalism_node"]] = {
+                'formalism_node' : event["formalism_node"],
+                'formalism_graph_url' : event["formalism_graph_url"],
+                'formal_proof' : event["formal_proof"]
+            }
+        elif event["type"] == "progress":
+            report_progress({"completed_calls": event["completed"], "total_calls": event["total_calls"]})
+    order = {node_name: i for i, (node_name, _) in enumerate(inputs)}
+    return {"formalism_data": sorted(formalisms.values(), key=lambda f: order[f['formalism_node']])}
+
+async def context_job(payload: dict, report_progress) -> dict:
+    chunks = payload["chunks"]
+    stop = threading.Event()
+
+    def run() -> list:
+        nodes = []
+        for done, nodes_json in enumerate(stream_generate_context_json(chunks), start=1):
+            nodes = json.loads(nodes_json)
+            report_progress({"chunks_done": done, "total_chunks": len(chunks), "nodes": len(nodes)})
+            if stop.is_set():
+                raise asyncio.CancelledError()
+        return nodes
+
+    try:
+        nodes = await asyncio.get_running_loop().run_in_executor(None, run)
+    except asyncio.CancelledError:
+        # the LLM call in flight finishes in its thread; no further chunks are started
+        stop.set()
+        raise
+    return {"graph_data": [nodes], "chunk_dict": chunks}
+
+job_queue.register("generate_formalism", formalism_job)
+job_queue.register("generate_context", context_job)
+
 # temporary token for assemblyai streaming api
 def generate_assemblyai_temp_token(expires_in_seconds):
     url = f"https://streaming.assemblyai.com/v3/token?expires_in_seconds={expires_in_seconds}"
@@ -1830,12 +2127,30 @@ def generate_assemblyai_temp_token(expires_in_seconds):
             print(error.response.json())
         raise
 
+async def list_conversation_rows(user_uid: str, view: str, limit: Optional[int], cursor: Optional[str]) -> tuple:
+    """
+    (rows, next cursor) from the user's conversation index: the full list when no page
+    size is given, otherwise one page
+    """
+    if limit is None and cursor:
+        raise HTTPException(status_code=400, detail="cursor requires limit")
+    try:
+        return await get_metadata_store().list_user_conversations(user_uid, view, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # all conversations
 @lct_app.get("/conversations/", response_model=List[SaveJsonResponseExtended])
-async def list_saved_conversations(current_user: dict = Depends(verify_firebase_token)):
+async def list_saved_conversations(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=CONVERSATION_PAGE_MAX, description="page size; omit for the full list"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    current_user: dict = Depends(verify_firebase_token)
+):
     try:
-        # Get conversations accessible to the user (owned + shared)
-        rows = get_all_accessible_conversations_test(user_uid=current_user['uid'])
+        rows, next_cursor = await list_conversation_rows(current_user['uid'], "all", limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         conversations = []
 
         for row in rows:
@@ -1854,15 +2169,24 @@ async def list_saved_conversations(current_user: dict = Depends(verify_firebase_
         print(f"[INFO] Loaded {len(conversations)} conversations from DB")
         return conversations
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[FATAL] Error fetching from DB: {e}")
         raise HTTPException(status_code=500, detail=f"Database access error: {str(e)}")
 
 # owned conversations only
 @lct_app.get("/conversations/owned/", response_model=List[SaveJsonResponseExtended])
-async def list_owned_conversations(current_user: dict = Depends(verify_firebase_token)):
+async def list_owned_conversations(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=CONVERSATION_PAGE_MAX, description="page size; omit for the full list"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    current_user: dict = Depends(verify_firebase_token)
+):
     try:
-        rows = get_owned_conversations_test(user_uid=current_user['uid'])
+        rows, next_cursor = await list_conversation_rows(current_user['uid'], "owned", limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         conversations = []
 
         for row in rows:
@@ -1881,15 +2205,24 @@ async def list_owned_conversations(current_user: dict = Depends(verify_firebase_
         print(f"[INFO] Loaded {len(conversations)} owned conversations from DB")
         return conversations
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[FATAL] Error fetching owned conversations from DB: {e}")
         raise HTTPException(status_code=500, detail=f"Database access error: {str(e)}")
 
 # shared conversations only
 @lct_app.get("/conversations/shared/", response_model=List[SaveJsonResponseExtended])
-async def list_shared_conversations(current_user: dict = Depends(verify_firebase_token)):
+async def list_shared_conversations(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=CONVERSATION_PAGE_MAX, description="page size; omit for the full list"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    current_user: dict = Depends(verify_firebase_token)
+):
     try:
-        rows = get_shared_conversations_test(user_uid=current_user['uid'])
+        rows, next_cursor = await list_conversation_rows(current_user['uid'], "shared", limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         conversations = []
 
         for row in rows:
@@ -1908,6 +2241,8 @@ async def list_shared_conversations(current_user: dict = Depends(verify_firebase
         print(f"[INFO] Loaded {len(conversations)} shared conversations from DB")
         return conversations
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[FATAL] Error fetching shared conversations from DB: {e}")
         raise HTTPException(status_code=500, detail=f"Database access error: {str(e)}")
@@ -1966,20 +2301,245 @@ async def list_shared_conversations(current_user: dict = Depends(verify_firebase
   
 # get individual conversations 
 @lct_app.get("/conversations/{conversation_id}", response_model=ConversationResponse)
-async def get_conversation(conversation_id: str, current_user: dict = Depends(verify_firebase_token)):
+async def get_conversation(
+    conversation_id: str,
+    request: Request,
+    response: Response,
+    include_chunks: bool = Query(True, description="false: graph only, fetch chunk texts via /chunks/{chunk_id}"),
+    version: Optional[int] = Query(None, ge=1, description="earlier saved version; default latest"),
+    current_user: dict = Depends(verify_firebase_token)
+):
     try:
         # gcs_path = await get_conversation_gcs_path(conversation_id)
-        gcs_path = get_conversation_gcs_path_test(conversation_id, owner_uid=current_user['uid'])
+        gcs_path = await get_metadata_store().get_conversation_gcs_path(conversation_id, current_user['uid'])
         if not gcs_path:
             raise HTTPException(status_code=404, detail="Conversation not found or access denied.")
 
-        return load_conversation_from_gcs(gcs_path)
+        # saved versions never change and, unless LOG_KEEP_SNAPSHOTS lets compaction
+        # delete them, never go away; anything else is revalidated against the object
+        # generation (the log head), a metadata read that doesn't download anything
+        versioned = version is not None and not is_legacy_conversation_path(gcs_path) and gcs_path.endswith("/head")
+        immutable = versioned and LOG_KEEP_SNAPSHOTS == 0
+        if immutable:
+            generation = f"v{version}"
+        else:
+            generation = await run_in_threadpool(get_blob_store().generation, gcs_path)
+            if generation is None:
+                raise HTTPException(status_code=404, detail="Conversation file not found in GCS.")
+            if versioned:
+                generation = f"{generation}-v{version}"
+
+        headers = {
+            "ETag": f'"{generation}-{"full" if include_chunks else "graph"}"',
+            "Cache-Control": "private, max-age=31536000, immutable" if immutable else "private, no-cache",
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        data = await run_in_threadpool(load_conversation_cached, gcs_path, generation,
+                                       include_chunks=include_chunks, version=version)
+        response.headers.update(headers)
+        return data
 
     except HTTPException:
         raise
     except Exception as e:
         print(f"[FATAL] Error loading conversation '{conversation_id}': {e}")
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}") 
+
+@lct_app.get("/conversations/{conversation_id}/chunks/{chunk_id}", response_model=ChunkResponse)
+async def get_conversation_chunk(conversation_id: str, chunk_id: str, current_user: dict = Depends(verify_firebase_token)):
+    """
+    Transcript text of one chunk, loaded when a node is opened
+    """
+    try:
+        gcs_path = await get_metadata_store().get_conversation_gcs_path(conversation_id, current_user['uid'])
+        if not gcs_path:
+            raise HTTPException(status_code=404, detail="Conversation not found or access denied.")
+
+        text = await run_in_threadpool(load_conversation_chunk, gcs_path, chunk_id)
+        return ChunkResponse(chunk_id=chunk_id, text=text)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FATAL] Error loading chunk '{chunk_id}' of conversation '{conversation_id}': {e}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+async def load_conversation_graph(conversation_id: str, user_uid: str) -> ConversationGraph:
+    """
+    Indexed graph of a stored conversation, served from the in-process cache while the
+    stored object is at the generation it was built from (saves on other instances
+    change it). Access is checked on every call.
+    """
+    gcs_path = await get_metadata_store().get_conversation_gcs_path(conversation_id, user_uid)
+    if not gcs_path:
+        raise HTTPException(status_code=404, detail="Conversation not found or access denied.")
+    generation = await run_in_threadpool(get_blob_store().generation, gcs_path)
+    if generation is None:
+        raise HTTPException(status_code=404, detail="Conversation file not found in GCS.")
+
+    cached = graph_cache.get(conversation_id)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    conversation = await run_in_threadpool(load_conversation_cached, gcs_path, generation, include_chunks=False)
+    graph = ConversationGraph.from_graph_data(conversation["graph_data"])
+    graph_cache.set(conversation_id, (generation, graph))
+    return graph
+
+def paginate_nodes(nodes: List[Any], offset: int, limit: int) -> dict:
+    return {
+        "nodes": nodes[offset:offset + limit],
+        "total": len(nodes),
+        "offset": offset,
+        "limit": limit,
+    }
+
+# paginated node listing, optionally filtered by chunk, bookmarks or contextual progress
+@lct_app.get("/conversations/{conversation_id}/nodes", response_model=GraphNodesResponse)
+async def get_conversation_nodes(
+    conversation_id: str,
+    chunk_id: Optional[str] = None,
+    bookmarks_only: bool = False,
+    contextual_progress_only: bool = False,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(verify_firebase_token)
+):
+    try:
+        graph = await load_conversation_graph(conversation_id, current_user['uid'])
+
+        if chunk_id is not None:
+            nodes = graph.get_chunk_nodes(chunk_id)
+        else:
+            nodes = graph.nodes
+        if bookmarks_only:
+            nodes = [node for node in nodes if node.get("is_bookmark")]
+        if contextual_progress_only:
+            nodes = [node for node in nodes if node.get("is_contextual_progress")]
+
+        return paginate_nodes(nodes, offset, limit)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FATAL] Error querying nodes of '{conversation_id}': {e}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+# nodes within `depth` hops of a node
+@lct_app.get("/conversations/{conversation_id}/neighbours", response_model=GraphNodesResponse)
+async def get_node_neighbours(
+    conversation_id: str,
+    node_name: str,
+    depth: int = Query(1, ge=1, le=10),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(verify_firebase_token)
+):
+    try:
+        graph = await load_conversation_graph(conversation_id, current_user['uid'])
+        if node_name not in graph:
+            raise HTTPException(status_code=404, detail=f"Node '{node_name}' not found.")
+
+        return paginate_nodes(graph.neighbourhood(node_name, depth), offset, limit)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FATAL] Error querying neighbours in '{conversation_id}': {e}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+# shortest path between two nodes
+@lct_app.get("/conversations/{conversation_id}/path", response_model=GraphPathResponse)
+async def get_node_path(
+    conversation_id: str,
+    source: str,
+    target: str,
+    current_user: dict = Depends(verify_firebase_token)
+):
+    try:
+        graph = await load_conversation_graph(conversation_id, current_user['uid'])
+        for node_name in (source, target):
+            if node_name not in graph:
+                raise HTTPException(status_code=404, detail=f"Node '{node_name}' not found.")
+
+        path = graph.shortest_path(source, target)
+        if path is None:
+            raise HTTPException(status_code=404, detail="No path between the given nodes.")
+
+        return {"path": path, "nodes": [graph.get_node(name) for name in path]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FATAL] Error querying path in '{conversation_id}': {e}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+# centrality, clusters, bookmark reach and contextual chains for the saved version
+@lct_app.get("/conversations/{conversation_id}/analytics", response_model=GraphAnalyticsResponse)
+async def get_conversation_analytics(conversation_id: str, current_user: dict = Depends(verify_firebase_token)):
+    try:
+        graph = await load_conversation_graph(conversation_id, current_user['uid'])
+        # cached analytics are used only if computed for this graph version (a save on
+        # another instance, or one whose background refresh hasn't run yet, leaves them stale)
+        return await run_in_threadpool(refresh_graph_analytics, conversation_id, graph.to_graph_data())
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FATAL] Error computing analytics for '{conversation_id}': {e}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+def find_related_threads(conversation_id: str, node: dict, conversation_ids: Set[str], limit: int) -> List[dict]:
+    related = semantic_index.related_nodes(conversation_id, node, conversation_ids, limit=limit)
+    file_names = conversation_file_names([hit["conversation_id"] for hit in related])
+    for hit in related:
+        hit["file_name"] = file_names.get(hit["conversation_id"])
+    return related
+
+# threads from the user's other conversations that discuss the same topic as a node
+@lct_app.get("/conversations/{conversation_id}/related", response_model=RelatedThreadsResponse)
+async def get_related_threads(
+    conversation_id: str,
+    node_name: str,
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(verify_firebase_token)
+):
+    try:
+        graph = await load_conversation_graph(conversation_id, current_user['uid'])
+        node = graph.get_node(node_name)
+        if node is None:
+            raise HTTPException(status_code=404, detail=f"Node '{node_name}' not found.")
+        metadata_store = get_metadata_store()
+        conversation_ids = await metadata_store.accessible_conversation_ids(current_user['uid'])
+        related = await run_in_threadpool(find_related_threads, conversation_id, node, conversation_ids, limit)
+        allowed = await metadata_store.confirm_access([hit["conversation_id"] for hit in related], current_user['uid'])
+        return {"node_name": node_name, "related": [hit for hit in related if hit["conversation_id"] in allowed]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FATAL] Error finding related threads in '{conversation_id}': {e}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+# full-text search over node names, summaries, claims and chunk text of accessible conversations
+@lct_app.get("/search", response_model=SearchResponse)
+async def search_conversations(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(verify_firebase_token),
+):
+    try:
+        metadata_store = get_metadata_store()
+        conversation_ids = await metadata_store.accessible_conversation_ids(current_user['uid'])
+        results = await run_in_threadpool(search_nodes, conversation_ids, q, limit)
+        allowed = await metadata_store.confirm_access([hit["conversation_id"] for hit in results], current_user['uid'])
+        return {"query": q, "results": [hit for hit in results if hit["conversation_id"] in allowed]}
+
+    except Exception as e:
+        print(f"[FATAL] Error searching for '{q}': {e}")
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
 # @lct_app.get("/conversations/{conversation_id}", response_model=ConversationResponse)
 # def get_conversation(conversation_id: str):
 #     try:
@@ -2027,25 +2587,27 @@ async def share_conversation(
         shared_uids = []
         failed_emails = []
         
-        # Get UIDs for each email
-        for email in request.emails:
-            try:
-                user_info = get_user_by_email(email)
-                if user_info['email_verified']:
-                    shared_uids.append(user_info['uid'])
-                else:
-                    failed_emails.append(email)
-                    print(f"[WARNING] User {email} email not verified")
-            except HTTPException as e:
-                if e.status_code == 404:
-                    failed_emails.append(email)
-                    print(f"[WARNING] User not found: {email}")
-                else:
-                    raise e
+        # Resolve all emails up front (batched, concurrent), then share in one write
+        emails = list(dict.fromkeys(request.emails))
+        try:
+            users = await resolve_users_by_emails(emails)
+        except Exception as e:
+            print(f"[ERROR] Error getting users by email: {e}")
+            raise HTTPException(status_code=500, detail="Failed to get user information")
+        for email in emails:
+            user_info = users.get(normalize_email(email))
+            if user_info is None:
+                failed_emails.append(email)
+                print(f"[WARNING] User not found: {email}")
+            elif not user_info['email_verified']:
+                failed_emails.append(email)
+                print(f"[WARNING] User {email} email not verified")
+            elif user_info['uid'] not in shared_uids:
+                shared_uids.append(user_info['uid'])
         
         # Share the conversation if we have valid UIDs
         if shared_uids:
-            success = share_conversation_test(
+            success = await get_metadata_store().share_conversation(
                 conversation_id=conversation_id,
                 owner_uid=current_user['uid'],
                 shared_uids=shared_uids
@@ -2079,7 +2641,7 @@ async def get_shared_users(
 ):
     try:
         # Get the list of UIDs the conversation is shared with
-        shared_uids = get_conversation_shared_users_test(conversation_id, current_user['uid'])
+        shared_uids = await get_metadata_store().get_conversation_shared_users(conversation_id, current_user['uid'])
         
         if not shared_uids:
             return GetSharedUsersResponse(shared_users=[])
@@ -2113,7 +2675,7 @@ async def remove_shared_user(
     current_user: dict = Depends(verify_firebase_token)
 ):
     try:
-        success = remove_user_from_conversation_test(
+        success = await get_metadata_store().remove_user_from_conversation(
             conversation_id=conversation_id,
             owner_uid=current_user['uid'],
             user_uid_to_remove=request.user_uid
@@ -2171,7 +2733,7 @@ async def generate_context_stream(request: ChunkedRequest, current_user: dict =
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
     
 @lct_app.post("/save_json/", response_model=SaveJsonResponse)
-async def save_json_call(request: SaveJsonRequest, current_user: dict = Depends(verify_firebase_token)):
+async def save_json_call(request: SaveJsonRequest, background_tasks: BackgroundTasks, current_user: dict = Depends(verify_firebase_token)):
     """
     FastAPI route to save JSON data and insert metadata into the DB.
     """
@@ -2194,7 +2756,7 @@ async def save_json_call(request: SaveJsonRequest, current_user: dict = Depends(
             raise HTTPException(status_code=500, detail=f"File saving error: {str(file_error)}")
 
         # Insert metadata into DB with owner_uid
-        number_of_nodes = len(request.graph_data[0]) if request.graph_data and isinstance(request.graph_data[0], list) else 0
+        number_of_nodes = len(ConversationGraph.from_graph_data(request.graph_data))
         # print("graph data check: ", request.graph_data)
         # print("number of nodes: ", len(request.graph_data[0]) if request.graph_data and isinstance(request.graph_data[0], list) else 0)
         metadata = {
@@ -2207,7 +2769,15 @@ async def save_json_call(request: SaveJsonRequest, current_user: dict = Depends(
         }
 
         # await insert_conversation_metadata(metadata)
-        insert_conversation_metadata_test(metadata)
+        await get_metadata_store().insert_conversation_metadata(metadata)
+        graph_cache.invalidate(result["file_id"])
+        background_tasks.add_task(refresh_graph_analytics, result["file_id"], request.graph_data)
+        background_tasks.add_task(
+            index_conversation, result["file_id"], result["file_name"], request.graph_data, request.chunks
+        )
+        background_tasks.add_task(semantic_index.index_conversation, result["file_id"], request.graph_data)
+        if result["needs_compaction"]:
+            background_tasks.add_task(conversation_log.compact, f"{GCS_FOLDER}/{result['file_id']}")
 
         # print(f"[INFO] Conversation saved for user {current_user['uid']}: {result['file_id']}")
         return result
@@ -2250,7 +2820,7 @@ async def generate_formalism_call(request: generateFormalismRequest, current_use
         if not isinstance(request.chunks, dict) or not isinstance(request.graph_data, List):
             raise HTTPException(status_code=400, detail="Chunks must be a valid dictionary and Graph Data must be a valid list.")
         try:
-            result = generate_formalism(request.chunks, request.graph_data, request.user_pref) # save json function
+            result = await generate_formalism(request.chunks, request.graph_data, request.user_pref)
         except Exception as formalism_error:
             print(f"[INFO]: Formalism Generation error: {formalism_error}")
             raise HTTPException(status_code=500, detail=f"Formalism Generation error: {str(formalism_error)}")
@@ -2263,6 +2833,73 @@ async def generate_formalism_call(request: generateFormalismRequest, current_use
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
+# streaming variant: NDJSON by default, server-sent events with `Accept: text/event-stream`
+@lct_app.post("/generate_formalism_stream/")
+async def generate_formalism_stream(
+    request: generateFormalismRequest,
+    http_request: Request,
+    current_user: dict = Depends(verify_firebase_token)
+):
+    if not isinstance(request.chunks, dict) or not isinstance(request.graph_data, List):
+        raise HTTPException(status_code=400, detail="Chunks must be a valid dictionary and Graph Data must be a valid list.")
+
+    try:
+        # built up front so bad input fails the request instead of the stream
+        inputs = build_formalism_inputs(request.chunks, request.graph_data, request.user_pref)
+    except Exception as formalism_error:
+        print(f"[INFO]: Formalism Generation error: {formalism_error}")
+        raise HTTPException(status_code=500, detail=f"Formalism Generation error: {str(formalism_error)}")
+
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    events = stream_formalism_events(inputs)
+    return StreamingResponse(
+        format_formalism_stream(events, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+async def submit_job(kind: str, user_uid: str, payload: dict) -> dict:
+    try:
+        job_id = await job_queue.submit(user_uid, kind, payload)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job_id, "status": "queued"}
+
+# background variants of /generate_formalism/ and /generate-context-stream/; poll /jobs/{job_id}
+@lct_app.post("/jobs/generate_formalism/", response_model=JobSubmitResponse, status_code=202)
+async def submit_formalism_job(request: generateFormalismRequest, current_user: dict = Depends(verify_firebase_token)):
+    if not isinstance(request.chunks, dict) or not isinstance(request.graph_data, List):
+        raise HTTPException(status_code=400, detail="Chunks must be a valid dictionary and Graph Data must be a valid list.")
+    return await submit_job("generate_formalism", current_user['uid'], request.model_dump())
+
+@lct_app.post("/jobs/generate_context/", response_model=JobSubmitResponse, status_code=202)
+async def submit_context_job(request: ChunkedRequest, current_user: dict = Depends(verify_firebase_token)):
+    if not request.chunks or not isinstance(request.chunks, dict):
+        raise HTTPException(status_code=400, detail="Chunks must be a non-empty dictionary.")
+    return await submit_job("generate_context", current_user['uid'], request.model_dump())
+
+@lct_app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str, current_user: dict = Depends(verify_firebase_token)):
+    job = await job_queue.get(job_id, current_user['uid'])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@lct_app.get("/jobs/{job_id}/result", response_model=JobResultResponse)
+async def get_job_result(job_id: str, current_user: dict = Depends(verify_firebase_token)):
+    job = await job_queue.get(job_id, current_user['uid'], with_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if job["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}.")
+    return job
+
+@lct_app.delete("/jobs/{job_id}", response_model=JobSubmitResponse)
+async def cancel_job(job_id: str, current_user: dict = Depends(verify_firebase_token)):
+    status = await job_queue.cancel(job_id, current_user['uid'])
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {"job_id": job_id, "status": status}
+
 @lct_app.post("/process_transcript/", response_model=ProcessTranscriptResponse)
 async def process_transcript_batch(request: ProcessTranscriptRequest, current_user: dict = Depends(verify_firebase_token)):
     """
@@ -2342,8 +2979,10 @@ async def websocket_audio_endpoint(client_websocket: WebSocket):
 
     shared_state = {
                     "accumulator": [],
-                    "existing_json": [],
+                    "graph": CompactNodeStore(),
+                    "dedup_index": NearDuplicateIndex(),
                     "chunk_dict": {},
+                    "seq": 0,
                 }
     
     async def should_continue_processing(text_batch, stop_accumulating_flag= False):
@@ -2380,8 +3019,14 @@ async def websocket_audio_endpoint(client_websocket: WebSocket):
         
         #sending graph stuff to front end
         if segmented_input_chunk.strip():
-            mod_input = f'Existing JSON : \n {repr(shared_state["existing_json"])} \n\n Transcript Input: \n {segmented_input_chunk}'
-            output_json = await run_in_threadpool(generate_lct_json_gemini, mod_input)
+            # decoded copies, so the prompt can be built off the event loop
+            existing_nodes = shared_state["graph"].nodes
+            print(f"[INFO]: Generating nodes for a segment with {len(existing_nodes)} existing nodes")
+            output_json = await run_in_threadpool(
+                lambda: generate_lct_json_gemini(
+                    f'Existing JSON : \n {repr(existing_nodes)} \n\n Transcript Input: \n {segmented_input_chunk}'
+                )
+            )
             # output_json = generate_lct_json_claude(mod_input)
 
             if output_json:
@@ -2390,22 +3035,21 @@ async def websocket_audio_endpoint(client_websocket: WebSocket):
                 for item in output_json:
                     item["chunk_id"] = chunk_id
 
-                shared_state["existing_json"].extend(output_json)
-
-                # 🔁 Send it to frontend live
-                await client_websocket.send_text(json.dumps({
-                    "type": "existing_json",
-                    "data": [shared_state["existing_json"]]
-                }))
-                print("[CLIENT WS] Sent message to client: type=existing_json")
-                
-                await asyncio.sleep(0.02)  # 20ms pause
-                
-                await client_websocket.send_text(json.dumps({
-                    "type": "chunk_dict",
-                    "data": shared_state["chunk_dict"]
-                }))
-                print("[CLIENT WS] Sent message to client: type=chunk_dict")
+                output_json, merged_nodes = merge_near_duplicates(shared_state["graph"], shared_state["dedup_index"], output_json)
+                repair = repair_and_add_nodes(shared_state["graph"], output_json, merged_nodes)
+                for node in repair["added"]:
+                    shared_state["dedup_index"].add(node)
+
+                # 🔁 Send only what changed to the frontend
+                shared_state["seq"] += 1
+                delta = build_graph_delta(
+                    shared_state["seq"],
+                    shared_state["graph"],
+                    repair,
+                    {chunk_id: segmented_input_chunk},
+                )
+                await client_websocket.send_text(json.dumps(delta))
+                print(f"[CLIENT WS] Sent message to client: type=graph_delta seq={shared_state['seq']}")
 
         print(f"[INFO]: Evaluated batch of {len(text_batch)} transcripts...")
         return decision, incomplete_seg
@@ -2432,6 +3076,15 @@ async def websocket_audio_endpoint(client_websocket: WebSocket):
                         if msg.get("type") == "client_log":
                             print(f"[INFO]: [Client Log] {msg['message']}")
                             
+                        # client missed a delta; send the full state
+                        if msg.get("type") == "resync":
+                            await client_websocket.send_text(json.dumps(build_graph_snapshot(
+                                shared_state["seq"],
+                                shared_state["graph"],
+                                shared_state["chunk_dict"],
+                            )))
+                            print(f"[CLIENT WS] Sent message to client: type=graph_snapshot seq={shared_state['seq']}")
+                            
                         # if msg.get("type") == "ping":
                         #     print("recieved ping")
                             # return 
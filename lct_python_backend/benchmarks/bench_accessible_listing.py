@@ -0,0 +1,107 @@
+"""
+/conversations/ listing latency for a user with 10k accessible conversations:
+owned and shared queries awaited one after the other then deduped and re-sorted (the
+old path), both ordered queries in flight at once and merged lazily, and the per-user
+conversation index (one read), uncached and from the TTL cache.
+
+By default the metadata store is SQLite in a temporary directory, measured as is and
+with a simulated network round trip added to every query (QUERY_RTT_MS), which is
+where running the queries concurrently pays off against Firestore. With
+FIRESTORE_EMULATOR_HOST set the Firestore store is used instead (no simulated RTT):
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m lct_python_backend.benchmarks.bench_accessible_listing
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_accessible_listing
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from lct_python_backend.benchmarks import bench_event_loop_lag
+from lct_python_backend.conversation_store import FirestoreMetadataStore, SQLiteMetadataStore
+from lct_python_backend.graph_cache import conversation_index_cache
+
+CONVERSATIONS = 10_000
+USER = bench_event_loop_lag.USER
+RUNS = 20
+QUERY_RTT_MS = float(os.getenv("QUERY_RTT_MS", "40"))
+
+
+async def sequential(store, user_uid):
+    """
+    The previous get_all_accessible_conversations
+    """
+    conversations = {}
+    for conv in await store.get_owned_conversations(user_uid):
+        conv["access_type"] = "owner"
+        conversations[conv["id"]] = conv
+    for conv in await store.get_shared_conversations(user_uid):
+        if conv["id"] not in conversations:
+            conv["access_type"] = "shared"
+            conversations[conv["id"]] = conv
+    conversations_list = list(conversations.values())
+    conversations_list.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    return conversations_list
+
+
+def with_rtt(store, rtt_ms):
+    """
+    Add a fixed round trip to every listing query of `store`
+    """
+    for name in ("get_owned_conversations", "get_shared_conversations",
+                 "query_owned_conversations", "query_shared_conversations", "query_user_conversations"):
+        query = getattr(store, name)
+
+        async def delayed(*args, _query=query, **kwargs):
+            await asyncio.sleep(rtt_ms / 1000)
+            return await _query(*args, **kwargs)
+        setattr(store, name, delayed)
+    return store
+
+
+async def measure(name, listing):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        rows = await listing()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"{name:<36} rows={len(rows):>6}  p50 ms={statistics.median(timings):>7.1f} "
+          f"p95 ms={timings[int(len(timings) * 0.95)]:>7.1f}")
+    return rows
+
+
+async def main():
+    bench_event_loop_lag.CONVERSATIONS = CONVERSATIONS
+    with tempfile.TemporaryDirectory() as root:
+        if os.getenv("FIRESTORE_EMULATOR_HOST"):
+            stores = [("firestore", FirestoreMetadataStore())]
+        else:
+            path = os.path.join(root, "metadata.db")
+            stores = [("sqlite", SQLiteMetadataStore(path)),
+                      (f"sqlite + {QUERY_RTT_MS:.0f}ms rtt", with_rtt(SQLiteMetadataStore(path), QUERY_RTT_MS))]
+        # same data set as bench_event_loop_lag, scaled up
+        await bench_event_loop_lag.seed(stores[0][1])
+
+        print(f"{CONVERSATIONS} conversations accessible to one user, {RUNS} runs")
+        for label, store in stores:
+            old = await measure(f"{label} sequential", lambda: sequential(store, USER))
+            new = await measure(f"{label} concurrent merge", lambda: store.get_all_accessible_conversations(USER))
+            assert [row["id"] for row in old] == [row["id"] for row in new]
+
+            async def uncached():
+                conversation_index_cache.invalidate(USER)
+                return (await store.list_user_conversations(USER))[0]
+            indexed = await measure(f"{label} index", uncached)
+            assert [row["id"] for row in indexed] == [row["id"] for row in new]
+
+            async def cached():
+                return (await store.list_user_conversations(USER))[0]
+            await measure(f"{label} index, cached", cached)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
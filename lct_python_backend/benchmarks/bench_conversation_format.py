@@ -0,0 +1,91 @@
+"""
+Object size, encode + upload time and download + parse time of saved conversations:
+legacy pretty-printed JSON vs the versioned formats of conversation_codec.
+
+Uploads go to a temporary LocalBlobStore, or to a GCS emulator when STORAGE_EMULATOR_HOST
+is set (see bench_conversation_load). zstd and msgpack rows are skipped when
+zstandard / msgpack aren't installed.
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_conversation_format
+"""
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from lct_python_backend import conversation_codec
+from lct_python_backend.benchmarks.bench_node_store import _sentence, make_nodes
+from lct_python_backend.conversation_codec import decode_conversation, encode_conversation
+from lct_python_backend.conversation_store import GCSBlobStore, LocalBlobStore
+
+SIZES = (1_000, 5_000, 20_000)
+NODES_PER_CHUNK = 4
+WORDS_PER_CHUNK = 300
+REPEATS = 5
+
+
+def make_conversation(n_nodes):
+    rng = random.Random(n_nodes)
+    nodes = make_nodes(n_nodes)
+    chunks = {f"chunk-{i:08d}": _sentence(rng, WORDS_PER_CHUNK) for i in range(n_nodes // NODES_PER_CHUNK + 1)}
+    return {"file_name": "bench", "conversation_id": "bench", "chunks": chunks, "graph_data": [nodes]}
+
+
+def formats():
+    yield "legacy json indent=4", lambda data: json.dumps(data, indent=4).encode("utf-8")
+    combos = [("json", "none"), ("json", "gzip")]
+    if conversation_codec.zstandard is not None:
+        combos.append(("json", "zstd"))
+    if conversation_codec.msgpack is not None:
+        combos.append(("msgpack", "gzip"))
+        if conversation_codec.zstandard is not None:
+            combos.append(("msgpack", "zstd"))
+    for encoding, compression in combos:
+        yield f"{encoding} + {compression}", (
+            lambda data, e=encoding, c=compression: encode_conversation(data, encoding=e, compression=c)
+        )
+
+
+def median_ms(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(store):
+    print(f"{'nodes':>6} {'format':<22} {'size KiB':>9} {'ratio':>6} {'save ms':>8} {'load ms':>8}")
+    for n_nodes in SIZES:
+        data = make_conversation(n_nodes)
+        legacy_size = None
+        for name, encode in formats():
+            path = f"bench/format-{n_nodes}.bin"
+            payload = encode(data)
+            legacy_size = legacy_size or len(payload)
+            save = median_ms(lambda: store.upload(path, encode(data)))
+            load = median_ms(lambda: decode_conversation(store.download(path)))
+            assert decode_conversation(store.download(path)) == data
+            print(f"{n_nodes:>6} {name:<22} {len(payload) / 1024:>9.0f} "
+                  f"{legacy_size / len(payload):>5.1f}x {save:>8.1f} {load:>8.1f}")
+
+
+def main():
+    if os.getenv("STORAGE_EMULATOR_HOST"):
+        store = GCSBlobStore(os.getenv("GCS_BUCKET_NAME", "lct-bench"))
+        store.connect()
+        if store.client.lookup_bucket(store.bucket_name) is None:
+            store.client.create_bucket(store.bucket_name)
+        run(store)
+        store.close()
+        return
+    with tempfile.TemporaryDirectory() as root:
+        run(LocalBlobStore(root))
+
+
+if __name__ == "__main__":
+    main()
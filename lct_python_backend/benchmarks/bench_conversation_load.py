@@ -0,0 +1,77 @@
+"""
+Latency of the /conversations/{id} storage read against a local GCS emulator:
+a new client plus exists() + download per request (the old path) vs the process-wide
+client with a single download.
+
+Start an emulator and point the client at it, then run from the repository root:
+    docker run -d -p 4443:4443 fsouza/fake-gcs-server -scheme http
+    STORAGE_EMULATOR_HOST=http://localhost:4443 python -m lct_python_backend.benchmarks.bench_conversation_load
+"""
+import json
+import os
+import statistics
+import time
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+
+from lct_python_backend.benchmarks.bench_node_store import make_nodes
+from lct_python_backend.conversation_store import BlobNotFoundError, GCSBlobStore
+
+BUCKET = "lct-bench"
+PROJECT = "test"
+SIZES = (100, 1_000, 5_000)
+REQUESTS = 100
+
+
+def new_client():
+    return storage.Client(project=PROJECT, credentials=AnonymousCredentials())
+
+
+def load_per_request_client(path):
+    blob = new_client().bucket(BUCKET).blob(path)
+    if not blob.exists():
+        raise BlobNotFoundError(path)
+    return json.loads(blob.download_as_bytes())
+
+
+def timed(fn, path):
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        fn(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def main():
+    if not os.getenv("STORAGE_EMULATOR_HOST"):
+        raise SystemExit("Set STORAGE_EMULATOR_HOST to a running GCS emulator")
+    client = new_client()
+    if client.lookup_bucket(BUCKET) is None:
+        client.create_bucket(BUCKET)
+
+    store = GCSBlobStore(BUCKET)
+    store.connect()
+    print(f"{'nodes':>6} {'KiB':>8} {'old p50':>9} {'old p95':>9} {'new p50':>9} {'new p95':>9}  (ms)")
+    for size in SIZES:
+        path = f"bench/conversation-{size}.json"
+        data = {"file_name": "bench", "conversation_id": path, "chunks": {}, "graph_data": [make_nodes(size)]}
+        payload = json.dumps(data, indent=4).encode("utf-8")
+        store.upload(path, payload)
+
+        old = timed(load_per_request_client, path)
+        new = timed(lambda p: json.loads(store.download(p)), path)
+        print(f"{size:>6} {len(payload) / 1024:>8.0f} {old[0]:>9.2f} {old[1]:>9.2f} {new[0]:>9.2f} {new[1]:>9.2f}")
+
+    start = time.perf_counter()
+    try:
+        store.download("bench/missing.json")
+    except BlobNotFoundError:
+        print(f"missing object -> BlobNotFoundError (404) in {(time.perf_counter() - start) * 1000:.2f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Bytes written and latency per /save_json/ call during a replayed live session that
+autosaves after every batch: full re-upload of the conversation vs the conversation log.
+The log's total includes the snapshots written by compaction.
+
+Writes go to a temporary LocalBlobStore, so latency is mostly encode time; against
+GCS the byte counts dominate.
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_conversation_log
+"""
+import copy
+import statistics
+import tempfile
+import time
+
+from lct_python_backend import conversation_log as log_module
+from lct_python_backend.benchmarks.bench_conversation_format import NODES_PER_CHUNK, make_conversation
+from lct_python_backend.conversation_codec import encode_conversation
+from lct_python_backend.conversation_log import ConversationLog
+from lct_python_backend.conversation_store import LocalBlobStore
+
+TOTAL_NODES = 5_000
+NODES_PER_SAVE = 12
+# every Nth save also edits an existing node (bookmark, fact-check result, ...)
+EDIT_EVERY = 4
+
+
+def session_saves(conversation):
+    nodes = conversation["graph_data"][0]
+    chunk_ids = list(conversation["chunks"])
+    for n in range(NODES_PER_SAVE, len(nodes) + 1, NODES_PER_SAVE):
+        graph = [copy.copy(nodes[:n])]
+        if (n // NODES_PER_SAVE) % EDIT_EVERY == 0:
+            graph[0][n // 2] = dict(graph[0][n // 2], is_bookmark=True)
+        chunks = {chunk_id: conversation["chunks"][chunk_id] for chunk_id in chunk_ids[:n // NODES_PER_CHUNK + 1]}
+        yield graph, chunks
+
+
+def report(name, timings, sizes, extra_bytes=0):
+    timings.sort()
+    print(f"{name:<16} saves={len(sizes):>4} total MiB={(sum(sizes) + extra_bytes) / 2**20:>8.1f} "
+          f"last save KiB={sizes[-1] / 1024:>7.0f} p50 ms={statistics.median(timings):>6.1f} "
+          f"p95 ms={timings[int(len(timings) * 0.95)]:>6.1f}")
+
+
+def main():
+    conversation = make_conversation(TOTAL_NODES)
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalBlobStore(root)
+        log_module.get_blob_store = lambda: store
+
+        timings, sizes = [], []
+        for graph, chunks in session_saves(conversation):
+            start = time.perf_counter()
+            data = encode_conversation({"file_name": "bench", "chunks": chunks, "graph_data": graph})
+            store.upload("conversations/full.json", data)
+            timings.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(data))
+        report("full rewrite", timings, sizes)
+
+        log = ConversationLog()
+        timings, sizes = [], []
+        compactions = compaction_bytes = 0
+        for graph, chunks in session_saves(conversation):
+            start = time.perf_counter()
+            saved = log.save("conversations/log", "bench", chunks, graph)
+            timings.append((time.perf_counter() - start) * 1000)
+            sizes.append(saved["bytes_written"])
+            if saved["needs_compaction"]:
+                # runs as a background task in the app, off the save path
+                compaction_bytes += log.compact("conversations/log")
+                compactions += 1
+        report("conversation log", timings, sizes, compaction_bytes)
+        print(f"of which saves MiB={sum(sizes) / 2**20:.1f}, "
+              f"{compactions} compactions MiB={compaction_bytes / 2**20:.1f}")
+
+        start = time.perf_counter()
+        log.load("conversations/log/head")
+        print(f"load latest: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
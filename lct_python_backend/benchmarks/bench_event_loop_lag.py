@@ -0,0 +1,148 @@
+"""
+Latency of a live-session socket while the same event loop serves concurrent
+/conversations/ listing traffic: metadata queries called blocking (the old synchronous
+Firestore path) vs awaited through the async MetadataStore.
+
+A small echo server runs on the app's event loop as a stand-in for /ws/audio; a client
+on its own thread pings it every PING_INTERVAL and records round trips.
+
+By default the metadata store is SQLite in a temporary directory. With
+FIRESTORE_EMULATOR_HOST set the Firestore stores are used instead:
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m lct_python_backend.benchmarks.bench_event_loop_lag
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_event_loop_lag
+"""
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from lct_python_backend.conversation_store import FirestoreMetadataStore, SQLiteMetadataStore
+
+CONVERSATIONS = 2_000
+SHARED_EVERY = 5
+USER = "heavy-user"
+LISTING_CLIENTS = 8
+DURATION = 5.0
+PING_INTERVAL = 0.02
+
+
+def seed_rows():
+    start = datetime(2024, 1, 1)
+    for i in range(CONVERSATIONS):
+        owner = USER if i % SHARED_EVERY else f"other-{i % 50}"
+        yield {
+            "id": f"conv-{i:06d}", "file_name": f"Meeting {i}", "no_of_nodes": 40 + i % 200,
+            "gcs_path": f"conversations/conv-{i:06d}/head", "created_at": start + timedelta(minutes=i),
+            "owner_uid": owner,
+        }, owner
+
+
+async def seed(store):
+    for row, owner in seed_rows():
+        await store.insert_conversation_metadata(row)
+        if owner != USER:
+            await store.share_conversation(row["id"], owner, [USER])
+
+
+def blocking_lister(store):
+    """
+    The old call path: a synchronous query executed directly on the event loop
+    """
+    if isinstance(store, SQLiteMetadataStore):
+        def list_all():
+            owned = store._get_owned_conversations(USER)
+            shared = store._get_shared_conversations(USER)
+            return owned + shared
+        return list_all
+
+    from google.cloud import firestore
+
+    collection = firestore.Client(project="live-conversational-threads", database="lct-db").collection("conversations_test")
+
+    def list_all():
+        owned = [doc.to_dict() for doc in collection.where("owner_uid", "==", USER).stream()]
+        shared = [doc.to_dict() for doc in collection.where("shared_with", "array_contains", USER).stream()]
+        return owned + shared
+    return list_all
+
+
+def ping_client(port, stop, rtts):
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while not stop.is_set():
+            start = time.perf_counter()
+            sock.sendall(b"p")
+            sock.recv(1)
+            rtts.append((time.perf_counter() - start) * 1000)
+            time.sleep(PING_INTERVAL)
+
+
+async def run(name, lister):
+    async def echo(reader, writer):
+        while data := await reader.read(1):
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(echo, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    stop = threading.Event()
+    rtts = []
+    client = threading.Thread(target=ping_client, args=(port, stop, rtts))
+    client.start()
+
+    listings = 0
+    deadline = time.perf_counter() + DURATION
+
+    async def listing_client():
+        nonlocal listings
+        while time.perf_counter() < deadline:
+            await lister()
+            listings += 1
+            # the next request arrives through the loop, as it would in the server
+            await asyncio.sleep(0)
+
+    if lister is None:
+        await asyncio.sleep(DURATION)
+    else:
+        await asyncio.gather(*(listing_client() for _ in range(LISTING_CLIENTS)))
+    stop.set()
+    await asyncio.to_thread(client.join)
+    server.close()
+    await server.wait_closed()
+
+    rtts.sort()
+    print(f"{name:<10} listings/s={listings / DURATION:>7.1f}  socket rtt ms: "
+          f"p50={statistics.median(rtts):>7.2f} p99={rtts[int(len(rtts) * 0.99)]:>7.2f} max={rtts[-1]:>7.2f}")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as root:
+        if os.getenv("FIRESTORE_EMULATOR_HOST"):
+            store = FirestoreMetadataStore()
+        else:
+            store = SQLiteMetadataStore(os.path.join(root, "metadata.db"))
+        await seed(store)
+        list_blocking = blocking_lister(store)
+
+        async def blocking():
+            list_blocking()
+
+        async def non_blocking():
+            await store.get_all_accessible_conversations(USER)
+
+        print(f"{CONVERSATIONS} conversations, {LISTING_CLIENTS} concurrent listing clients, {type(store).__name__}")
+        await run("idle", None)
+        await run("blocking", blocking)
+        await run("async", non_blocking)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Near-duplicate merging over a replayed live session: each chunk re-emits a few nodes of
+the previous one (chunk overlap), and now and then the conversation comes back to a
+topic from many chunks earlier. With the chunk window only the overlap is merged; the
+unbounded index (every earlier chunk, the previous behaviour) also folds the revisits
+into the old nodes. Also reports lookup latency.
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_node_dedup
+"""
+import random
+import statistics
+import time
+
+from lct_python_backend.node_dedup import NearDuplicateIndex
+
+CHUNKS = 400
+NODES_PER_CHUNK = 6
+# last nodes of the previous chunk re-emitted at the start of each chunk
+OVERLAP = 2
+# every Nth chunk revisits a topic from at least MIN_REVISIT_DISTANCE chunks back
+REVISIT_EVERY = 10
+MIN_REVISIT_DISTANCE = 5
+VOCABULARY = [f"word{i}" for i in range(5_000)]
+
+
+def paraphrase(rng, node, name):
+    """
+    Same topic words, one swapped: Jaccard well above the merge threshold
+    """
+    words = node["summary"].split()
+    words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    return {"node_name": name, "summary": " ".join(words)}
+
+
+def session(rng):
+    """
+    Chunks of (node, kind) with kind "new", "overlap" (near-duplicate of a node of the
+    previous chunk) or "revisit" (near-duplicate of a node far back)
+    """
+    chunks = []
+    for c in range(CHUNKS):
+        chunk_id = f"chunk-{c}"
+        nodes = []
+        if c:
+            for node, _ in chunks[-1][-OVERLAP:]:
+                nodes.append((paraphrase(rng, node, f"{node['node_name']} again"), "overlap"))
+        if c >= MIN_REVISIT_DISTANCE and c % REVISIT_EVERY == 0:
+            node, _ = rng.choice(chunks[rng.randrange(c - MIN_REVISIT_DISTANCE + 1)])
+            nodes.append((paraphrase(rng, node, f"Back to {node['node_name']} {c}"), "revisit"))
+        while len(nodes) < NODES_PER_CHUNK:
+            nodes.append(({"node_name": f"Topic {c}-{len(nodes)}", "summary": " ".join(rng.sample(VOCABULARY, 8))}, "new"))
+        for node, _ in nodes:
+            node["chunk_id"] = chunk_id
+        chunks.append(nodes)
+    return chunks
+
+
+def replay(chunks, index):
+    merged = {"new": 0, "overlap": 0, "revisit": 0}
+    timings = []
+    for nodes in chunks:
+        kept = []
+        for node, kind in nodes:
+            start = time.perf_counter()
+            target = index.find_duplicate(node)
+            timings.append((time.perf_counter() - start) * 1000)
+            if target is None:
+                kept.append(node)
+            else:
+                merged[kind] += 1
+        for node in kept:
+            index.add(node)
+    return merged, timings
+
+
+def main():
+    chunks = session(random.Random(0))
+    totals = {kind: sum(k == kind for nodes in chunks for _, k in nodes) for kind in ("new", "overlap", "revisit")}
+    print(f"{CHUNKS} chunks: {totals['overlap']} overlap duplicates, {totals['revisit']} revisits of earlier topics")
+    for label, index in (("window 1", NearDuplicateIndex()), ("unbounded", NearDuplicateIndex(chunk_window=CHUNKS))):
+        merged, timings = replay(chunks, index)
+        timings.sort()
+        print(f"{label:<10} merged overlap={merged['overlap']:>4} revisit={merged['revisit']:>3} new={merged['new']:>3}  "
+              f"lookup p50 ms={statistics.median(timings):.3f} p95 ms={timings[int(len(timings) * 0.95)]:.3f}")
+        if index.chunk_window == 1:
+            assert merged["revisit"] == 0 and merged["new"] == 0, merged
+            assert merged["overlap"] == totals["overlap"], merged
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Per-session memory and serialization time of the /ws/audio node state:
+plain list of dicts vs CompactNodeStore.
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_node_store
+"""
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from lct_python_backend.node_store import CompactNodeStore
+
+SIZES = (1_000, 10_000, 50_000)
+WORDS = ("budget", "sleep", "stress", "caffeine", "road", "trip", "rental", "insurance",
+         "proof", "loop", "model", "theory", "feedback", "signal", "planning", "motel")
+
+
+def _sentence(rng, n_words):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def make_nodes(n, seed=0):
+    """
+    Synthetic LLM-shaped nodes, generated the way the websocket receives them:
+    every batch is freshly decoded JSON, so equal names are distinct string objects.
+    """
+    rng = random.Random(seed)
+    names = [f"{_sentence(rng, 4).title()} #{i}" for i in range(n)]
+    nodes = []
+    for i, name in enumerate(names):
+        related = rng.sample(names[max(0, i - 50):i], min(i, 3)) if i else []
+        nodes.append({
+            "node_name": name,
+            "type": "bookmark" if i % 40 == 0 else "conversational_thread",
+            "predecessor": names[i - 1] if i else None,
+            "successor": names[i + 1] if i + 1 < n else None,
+            "contextual_relation": {r: _sentence(rng, 30) for r in related[:2]},
+            "linked_nodes": related,
+            "chunk_id": f"chunk-{i // 4:08d}",
+            "is_bookmark": i % 40 == 0,
+            "is_contextual_progress": i % 25 == 0,
+            "summary": _sentence(rng, 90),
+        })
+    return json.loads(json.dumps(nodes))
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    state = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return state, current
+
+
+def main():
+    print(f"{'nodes':>7} {'dict MiB':>9} {'store MiB':>10} {'ratio':>6} {'dict ser ms':>12} {'store ser ms':>13}")
+    for n in SIZES:
+        payload = json.dumps(make_nodes(n))
+
+        dict_state, dict_bytes = measure(lambda: json.loads(payload))
+        store, store_bytes = measure(lambda: CompactNodeStore(json.loads(payload)))
+
+        start = time.perf_counter()
+        json.dumps([dict_state])
+        dict_ser = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        json.dumps(store.to_graph_data())
+        store_ser = (time.perf_counter() - start) * 1000
+
+        print(f"{n:>7} {dict_bytes / 2**20:>9.1f} {store_bytes / 2**20:>10.1f} "
+              f"{dict_bytes / store_bytes:>6.2f} {dict_ser:>12.1f} {store_ser:>13.1f}")
+        del dict_state, store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Related-thread query latency of the semantic index as the corpus grows, and recall@10
+of the candidate-capped search against scoring every row that shares a term.
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_semantic_index
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+os.environ["SEMANTIC_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "semantic_index.db")
+
+from lct_python_backend.semantic_index import MIN_SIMILARITY, SemanticIndex  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000)
+NODES_PER_CONVERSATION = 100
+QUERIES = 200
+VOCABULARY = [f"word{i}" for i in range(20_000)]
+# recurring discussion topics, each a small set of content words
+TOPICS = [random.Random(i).sample(VOCABULARY, 8) for i in range(2_000)]
+
+
+def make_conversation(rng, conversation_number):
+    nodes = []
+    for i in range(NODES_PER_CONVERSATION):
+        words = rng.sample(rng.choice(TOPICS), 5) + rng.sample(VOCABULARY, 4)
+        nodes.append({
+            "node_name": f"{' '.join(words[:3]).title()} {conversation_number}-{i}",
+            "summary": " ".join(words),
+            "chunk_id": f"chunk-{i // 10}",
+        })
+    return [nodes]
+
+
+def main():
+    rng = random.Random(0)
+    index = SemanticIndex()
+    index.loaded = True
+    conversation_ids = set()
+    print(f"{'nodes':>8} {'index s':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall@10':>10}")
+    for size in SIZES:
+        start = time.perf_counter()
+        while len(index.rows) < size:
+            conversation_id = f"conv-{len(conversation_ids)}"
+            conversation_ids.add(conversation_id)
+            index.index_conversation(conversation_id, make_conversation(rng, len(conversation_ids)))
+        build = time.perf_counter() - start
+
+        keys = rng.sample(list(index.rows), QUERIES)
+        timings = []
+        recalls = []
+        for conversation_id, node_name in keys:
+            node = {"node_name": node_name}
+            start = time.perf_counter()
+            related = index.related_nodes(conversation_id, node, conversation_ids, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+
+            row = index.rows[(conversation_id, node_name)]
+            scores = index.matrix[:index.size] @ index.matrix[row]
+            scores[index.row_conversation[:index.size] == index.conversation_numbers[conversation_id]] = -2
+            scores[index.row_conversation[:index.size] < 0] = -2
+            # exact = every row sharing a term with the query, no candidate cap
+            sharing = set().union(*(index.postings[b] for b in index.row_buckets[row]))
+            no_overlap = np.ones(index.size, dtype=bool)
+            no_overlap[list(sharing)] = False
+            scores[no_overlap] = -2
+            exact = np.sort(scores)[-10:]
+            exact = exact[exact >= MIN_SIMILARITY]
+            if len(exact):
+                # ties are common, so a hit counts when it scores at least the exact 10th best
+                found = sum(h["score"] >= exact[0] - 1e-6 for h in related)
+                recalls.append(min(found, len(exact)) / len(exact))
+        timings.sort()
+        print(f"{size:>8} {build:>9.1f} {statistics.median(timings):>8.2f} "
+              f"{timings[int(len(timings) * 0.95)]:>8.2f} {statistics.mean(recalls):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
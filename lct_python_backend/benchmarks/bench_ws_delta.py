@@ -0,0 +1,129 @@
+"""
+Bytes per update and client apply time of the /ws/audio graph protocol on a replayed
+two-hour session: old full existing_json + chunk_dict messages vs graph_delta messages.
+
+Client apply time is measured with Node running lct_app/src/utils/graphDelta.js
+(skipped if `node` is not on PATH).
+
+Run from the repository root:
+    python -m lct_python_backend.benchmarks.bench_ws_delta
+"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import uuid
+from pathlib import Path
+
+from lct_python_backend.benchmarks.bench_node_store import _sentence
+from lct_python_backend.graph_delta import build_graph_delta
+from lct_python_backend.graph_repair import repair_and_add_nodes
+from lct_python_backend.node_store import CompactNodeStore
+
+SESSION_MINUTES = 120
+SECONDS_PER_BATCH = 30
+NODES_PER_BATCH = 3
+WORDS_PER_CHUNK = 300
+
+GRAPH_DELTA_JS = Path(__file__).resolve().parents[2] / "lct_app" / "src" / "utils" / "graphDelta.js"
+
+NODE_DRIVER = """
+import { readFileSync } from "node:fs";
+import { createGraphState, applyGraphDelta } from "%s";
+
+const [fullPath, deltaPath] = process.argv.slice(1);
+const full = readFileSync(fullPath, "utf8").trim().split("\\n");
+const deltas = readFileSync(deltaPath, "utf8").trim().split("\\n");
+
+let start = performance.now();
+let graphData, chunkDict;
+for (let i = 0; i < full.length; i += 2) {
+  graphData = JSON.parse(full[i]).data;
+  chunkDict = JSON.parse(full[i + 1]).data;
+}
+const fullMs = performance.now() - start;
+
+const state = createGraphState();
+start = performance.now();
+for (const line of deltas) {
+  if (!applyGraphDelta(state, JSON.parse(line))) throw new Error("out of sequence");
+}
+const deltaMs = performance.now() - start;
+
+if (state.nodes.length !== graphData[0].length) throw new Error("node count mismatch");
+console.log(JSON.stringify({ fullMs, deltaMs, updates: deltas.length }));
+"""
+
+
+def replay(seed=0):
+    """
+    Yield (full_messages, delta_message) per batch of a synthetic session
+    """
+    rng = random.Random(seed)
+    graph = CompactNodeStore()
+    chunk_dict = {}
+    batches = SESSION_MINUTES * 60 // SECONDS_PER_BATCH
+    for seq in range(1, batches + 1):
+        chunk_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        chunk_dict[chunk_id] = _sentence(rng, WORDS_PER_CHUNK)
+        existing = [n["node_name"] for n in graph.nodes[-30:]]
+        batch = []
+        for i in range(NODES_PER_BATCH):
+            related = rng.sample(existing, min(2, len(existing)))
+            batch.append({
+                "node_name": f"{_sentence(rng, 3).title()} {seq}.{i}",
+                "type": "conversational_thread",
+                "predecessor": None,
+                "successor": None,
+                "contextual_relation": {r: _sentence(rng, 30) for r in related},
+                "linked_nodes": related,
+                "chunk_id": chunk_id,
+                "is_bookmark": False,
+                "is_contextual_progress": rng.random() < 0.05,
+                "summary": _sentence(rng, 90),
+            })
+        repair = repair_and_add_nodes(graph, batch)
+        full = [
+            json.dumps({"type": "existing_json", "data": graph.to_graph_data()}),
+            json.dumps({"type": "chunk_dict", "data": chunk_dict}),
+        ]
+        delta = json.dumps(build_graph_delta(seq, graph, repair, {chunk_id: chunk_dict[chunk_id]}))
+        yield full, delta
+
+
+def main():
+    full_sizes, delta_sizes = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path = os.path.join(tmp, "full.ndjson")
+        delta_path = os.path.join(tmp, "delta.ndjson")
+        with open(full_path, "w") as full_file, open(delta_path, "w") as delta_file:
+            for full, delta in replay():
+                full_sizes.append(sum(len(m.encode()) for m in full))
+                delta_sizes.append(len(delta.encode()))
+                full_file.write("\n".join(full) + "\n")
+                delta_file.write(delta + "\n")
+
+        n = len(full_sizes)
+        print(f"{n} updates over {SESSION_MINUTES} min, {NODES_PER_BATCH} nodes per update")
+        print(f"{'':>8} {'mean KiB':>9} {'last KiB':>9} {'total MiB':>10}")
+        for label, sizes in (("full", full_sizes), ("delta", delta_sizes)):
+            print(f"{label:>8} {sum(sizes) / n / 1024:>9.1f} {sizes[-1] / 1024:>9.1f} {sum(sizes) / 2**20:>10.1f}")
+
+        if shutil.which("node") is None:
+            print("node not found; skipping client apply time")
+            return
+        driver = NODE_DRIVER % GRAPH_DELTA_JS.as_uri()
+        out = subprocess.run(
+            ["node", "--input-type=module", "-e", driver, full_path, delta_path],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        timing = json.loads(out)
+        print(f"client parse+apply, whole session: full {timing['fullMs']:.0f} ms, "
+              f"delta {timing['deltaMs']:.0f} ms "
+              f"({timing['fullMs'] / n:.2f} vs {timing['deltaMs'] / n:.3f} ms per update)")
+
+
+if __name__ == "__main__":
+    main()
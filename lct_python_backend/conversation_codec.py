@@ -0,0 +1,116 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# serialization of the conversation body: "json" or "msgpack"
+CONVERSATION_ENCODING = os.getenv("CONVERSATION_ENCODING", "json")
+# "zstd", "gzip" or "none"; zstd falls back to gzip when zstandard isn't installed
+CONVERSATION_COMPRESSION = os.getenv("CONVERSATION_COMPRESSION", "zstd")
+# fast levels: saves happen on the request path, and most of the size win is already there at 1
+ZSTD_LEVEL = int(os.getenv("CONVERSATION_ZSTD_LEVEL", "3"))
+GZIP_LEVEL = int(os.getenv("CONVERSATION_GZIP_LEVEL", "1"))
+
+# versioned objects start with MAGIC + format version, then one byte each for the
+# encoding and the compression. Legacy objects are bare (pretty-printed) JSON.
+MAGIC = b"LCT"
+FORMAT_VERSION = 1
+_ENCODINGS = {"json": b"j", "msgpack": b"m"}
+_COMPRESSIONS = {"none": b"n", "gzip": b"g", "zstd": b"z"}
+_HEADER_SIZE = len(MAGIC) + 3
+
+CONTENT_TYPE = "application/octet-stream"
+
+
+def _resolve(encoding: str, compression: str) -> Tuple[str, str]:
+    if encoding not in _ENCODINGS:
+        raise ValueError(f"Unknown conversation encoding: {encoding}")
+    if compression not in _COMPRESSIONS:
+        raise ValueError(f"Unknown conversation compression: {compression}")
+    if encoding == "msgpack" and msgpack is None:
+        print("[WARNING] msgpack is not installed, storing conversations as JSON")
+        encoding = "json"
+    if compression == "zstd" and zstandard is None:
+        compression = "gzip"
+    return encoding, compression
+
+
+def encode_conversation(data: Any, encoding: str = None, compression: str = None) -> bytes:
+    """
+    Conversation dict -> versioned storage object (compact, compressed)
+    """
+    encoding, compression = _resolve(encoding or CONVERSATION_ENCODING, compression or CONVERSATION_COMPRESSION)
+    if encoding == "msgpack":
+        body = msgpack.packb(data, use_bin_type=True)
+    else:
+        body = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if compression == "zstd":
+        body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    elif compression == "gzip":
+        # mtime=0 keeps the output deterministic for identical conversations
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return MAGIC + bytes([FORMAT_VERSION]) + _ENCODINGS[encoding] + _COMPRESSIONS[compression] + body
+
+
+def decode_conversation(raw: bytes) -> Any:
+    """
+    Storage object -> conversation dict. Accepts the versioned format as well as
+    legacy plain JSON objects (optionally gzipped).
+    """
+    if not raw.startswith(MAGIC):
+        if raw[:2] == b"\x1f\x8b":
+            raw = gzip.decompress(raw)
+        return json.loads(raw)
+    if len(raw) < _HEADER_SIZE or raw[len(MAGIC)] != FORMAT_VERSION:
+        raise ValueError("Unsupported conversation format version")
+    encoding = raw[len(MAGIC) + 1:len(MAGIC) + 2]
+    compression = raw[len(MAGIC) + 2:_HEADER_SIZE]
+    body = raw[_HEADER_SIZE:]
+    if compression == _COMPRESSIONS["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this conversation")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif compression == _COMPRESSIONS["gzip"]:
+        body = gzip.decompress(body)
+    elif compression != _COMPRESSIONS["none"]:
+        raise ValueError("Unknown conversation compression")
+    if encoding == _ENCODINGS["msgpack"]:
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read this conversation")
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if encoding != _ENCODINGS["json"]:
+        raise ValueError("Unknown conversation encoding")
+    return json.loads(body)
+
+
+def pack_chunks(chunks: Dict[str, Any]) -> Tuple[Dict[str, List[int]], bytes]:
+    """
+    Chunk texts -> (index, pack). Every chunk is encoded on its own, so one chunk can be
+    read back with a single range request: index[chunk_id] = [offset, length] in the pack.
+    """
+    index = {}
+    frames = []
+    offset = 0
+    for chunk_id, text in chunks.items():
+        frame = encode_conversation(text)
+        index[chunk_id] = [offset, len(frame)]
+        frames.append(frame)
+        offset += len(frame)
+    return index, b"".join(frames)
+
+
+def unpack_chunks(index: Dict[str, List[int]], pack: bytes) -> Dict[str, Any]:
+    return {
+        chunk_id: decode_conversation(pack[offset:offset + length])
+        for chunk_id, (offset, length) in index.items()
+    }
@@ -0,0 +1,212 @@
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, TypedDict
+
+
+class ConversationNode(TypedDict, total=False):
+    """
+    Wire format of a single conversation node as produced by the LLM and stored in graph_data
+    """
+    node_name: str
+    type: str
+    predecessor: Optional[str]
+    successor: Optional[str]
+    contextual_relation: Dict[str, str]
+    linked_nodes: List[str]
+    chunk_id: Optional[str]
+    is_bookmark: bool
+    is_contextual_progress: bool
+    summary: str
+
+
+class ConversationGraph:
+    """
+    Indexed view over a list of conversation nodes.
+
+    Nodes stay as plain dicts (the JSON wire format) but are indexed by name, chunk and
+    edge so lookups are O(1) instead of a scan over graph_data.
+    """
+
+    def __init__(self, nodes: Optional[List[ConversationNode]] = None):
+        self.nodes: List[ConversationNode] = []
+        self.by_name: Dict[str, ConversationNode] = {}
+        self.positions: Dict[str, int] = {}
+        self.predecessors: Dict[str, List[str]] = {}
+        self.successors: Dict[str, List[str]] = {}
+        self.linked: Dict[str, List[str]] = {}
+        self.by_chunk: Dict[str, List[ConversationNode]] = {}
+        if nodes:
+            self.add_nodes(nodes)
+
+    @classmethod
+    def from_graph_data(cls, graph_data: List[Any]) -> "ConversationGraph":
+        """
+        Build a graph from graph_data, accepting both the wrapped form [[node, ...]]
+        used by the frontend and a flat list of nodes
+        """
+        if graph_data and isinstance(graph_data[0], list):
+            return cls(graph_data[0])
+        return cls([node for node in (graph_data or []) if isinstance(node, dict)])
+
+    def add_nodes(self, nodes: List[ConversationNode]) -> None:
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: ConversationNode) -> None:
+        name = node.get("node_name")
+        self.nodes.append(node)
+        if name is None:
+            return
+
+        # keep the first occurrence, matching the old linear scan
+        if name not in self.by_name:
+            self.by_name[name] = node
+            self.positions[name] = len(self.nodes) - 1
+        self._index_edges(name, node)
+
+        chunk_id = node.get("chunk_id")
+        if chunk_id is not None:
+            self.by_chunk.setdefault(chunk_id, []).append(node)
+
+    def update_node(self, node: ConversationNode) -> None:
+        """
+        Replace the node with the same node_name and re-index its edges
+        """
+        name = node["node_name"]
+        old = self.by_name[name]
+        self._unindex_edges(name, old)
+        self.nodes[self.positions[name]] = node
+        self.by_name[name] = node
+        self._index_edges(name, node)
+        if old.get("chunk_id") != node.get("chunk_id"):
+            if old.get("chunk_id") is not None:
+                self.by_chunk[old["chunk_id"]] = [n for n in self.by_chunk[old["chunk_id"]] if n is not old]
+            if node.get("chunk_id") is not None:
+                self.by_chunk.setdefault(node["chunk_id"], []).append(node)
+        elif node.get("chunk_id") is not None:
+            chunk_nodes = self.by_chunk[node["chunk_id"]]
+            chunk_nodes[next(i for i, n in enumerate(chunk_nodes) if n is old)] = node
+
+    def last_node(self) -> Optional[ConversationNode]:
+        return self.nodes[-1] if self.nodes else None
+
+    def _index_edges(self, name: str, node: ConversationNode) -> None:
+        predecessor = node.get("predecessor")
+        successor = node.get("successor")
+        if predecessor:
+            _append_unique(self.predecessors, name, predecessor)
+            _append_unique(self.successors, predecessor, name)
+        if successor:
+            _append_unique(self.successors, name, successor)
+            _append_unique(self.predecessors, successor, name)
+
+        for linked_name in node.get("linked_nodes") or []:
+            _append_unique(self.linked, name, linked_name)
+
+    def _unindex_edges(self, name: str, node: ConversationNode) -> None:
+        predecessor = node.get("predecessor")
+        successor = node.get("successor")
+        if predecessor:
+            _remove(self.predecessors, name, predecessor)
+            _remove(self.successors, predecessor, name)
+        if successor:
+            _remove(self.successors, name, successor)
+            _remove(self.predecessors, successor, name)
+        self.linked.pop(name, None)
+
+    def get_node(self, node_name: str) -> Optional[ConversationNode]:
+        return self.by_name.get(node_name)
+
+    def get_linked_nodes(self, node_name: str) -> List[Optional[ConversationNode]]:
+        """
+        Resolve the linked_nodes of a node; unknown names resolve to None
+        """
+        return [self.by_name.get(n) for n in self.linked.get(node_name, [])]
+
+    def neighbours(self, node_name: str) -> List[str]:
+        """
+        Names of all nodes adjacent through linked_nodes or the temporal chain
+        """
+        seen = {}
+        for index in (self.linked, self.predecessors, self.successors):
+            for name in index.get(node_name, []):
+                if name in self.by_name and name != node_name:
+                    seen[name] = None
+        return list(seen)
+
+    def neighbourhood(self, node_name: str, depth: int = 1) -> List[ConversationNode]:
+        """
+        Nodes within `depth` hops of node_name (breadth-first order, excluding the node itself)
+        """
+        visited = {node_name}
+        frontier = [node_name]
+        result = []
+        for _ in range(depth):
+            next_frontier = []
+            for name in frontier:
+                for neighbour in self.neighbours(name):
+                    if neighbour not in visited:
+                        visited.add(neighbour)
+                        next_frontier.append(neighbour)
+                        result.append(self.by_name[neighbour])
+            frontier = next_frontier
+            if not frontier:
+                break
+        return result
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        Shortest undirected path between two nodes as a list of node names, or None
+        """
+        if source not in self.by_name or target not in self.by_name:
+            return None
+        parents: Dict[str, Optional[str]] = {source: None}
+        queue = deque([source])
+        while queue:
+            name = queue.popleft()
+            if name == target:
+                path = []
+                while name is not None:
+                    path.append(name)
+                    name = parents[name]
+                return path[::-1]
+            for neighbour in self.neighbours(name):
+                if neighbour not in parents:
+                    parents[neighbour] = name
+                    queue.append(neighbour)
+        return None
+
+    def get_chunk_nodes(self, chunk_id: str) -> List[ConversationNode]:
+        return self.by_chunk.get(chunk_id, [])
+
+    def contextual_progress_nodes(self) -> List[ConversationNode]:
+        return [node for node in self.nodes if node.get("is_contextual_progress")]
+
+    def bookmark_nodes(self) -> List[ConversationNode]:
+        return [node for node in self.nodes if node.get("is_bookmark")]
+
+    def to_graph_data(self) -> List[List[ConversationNode]]:
+        """
+        Wrapped graph_data format expected by the frontend and the save path
+        """
+        return [self.nodes]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[ConversationNode]:
+        return iter(self.nodes)
+
+    def __contains__(self, node_name: object) -> bool:
+        return node_name in self.by_name
+
+
+def _append_unique(index: Dict[str, List[str]], key: str, value: str) -> None:
+    values = index.setdefault(key, [])
+    if value not in values:
+        values.append(value)
+
+
+def _remove(index: Dict[str, List[str]], key: str, value: str) -> None:
+    values = index.get(key)
+    if values and value in values:
+        values.remove(value)
@@ -0,0 +1,414 @@
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from lct_python_backend.conversation_codec import decode_conversation, encode_conversation, pack_chunks, unpack_chunks
+from lct_python_backend.conversation_store import BlobNotFoundError, BlobPreconditionError, BlobStore, get_blob_store
+from lct_python_backend.graph_cache import LRUCache
+
+# compact the tail into a new snapshot once it is this large relative to the last
+# snapshot (snapshot sizes then grow geometrically, so a session writes a bounded
+# multiple of its final size in snapshots) ...
+LOG_COMPACT_RATIO = float(os.getenv("LOG_COMPACT_RATIO", "1.0"))
+# ... or has this many segments, which bounds the reads per load
+LOG_COMPACT_SEGMENTS = int(os.getenv("LOG_COMPACT_SEGMENTS", "64"))
+# 0 (the default) keeps every version readable. N > 0 opts in to deleting the
+# snapshots and segments older than the last N snapshots, along with those versions.
+LOG_KEEP_SNAPSHOTS = int(os.getenv("LOG_KEEP_SNAPSHOTS", "0"))
+# attempts of a save that keeps losing the head to concurrent saves
+LOG_SAVE_ATTEMPTS = int(os.getenv("LOG_SAVE_ATTEMPTS", "5"))
+# conversations whose last saved state is kept in memory for diffing
+LOG_STATE_CACHE_SIZE = int(os.getenv("LOG_STATE_CACHE_SIZE", "32"))
+
+CONTENT_TYPE = "application/octet-stream"
+
+
+class VersionNotFoundError(Exception):
+    pass
+
+
+def _node_name(node: Any) -> Optional[str]:
+    return node.get("node_name") if isinstance(node, dict) else None
+
+
+# snapshots: graph, chunk index and chunk pack as separate objects under one prefix,
+# plus the history: the segments between the previous snapshot and this one
+
+def snapshot_paths(prefix: str) -> dict:
+    return {"graph": f"{prefix}/graph", "chunk_index": f"{prefix}/chunk_index", "chunks": f"{prefix}/chunks",
+            "history": f"{prefix}/history"}
+
+
+def write_snapshot(store: BlobStore, prefix: str, graph: dict, chunks: dict, history: List[dict]) -> int:
+    """
+    Write a full snapshot, graph last; returns the bytes written
+    """
+    paths = snapshot_paths(prefix)
+    chunk_index, chunk_pack = pack_chunks(chunks)
+    objects = [
+        (paths["history"], encode_conversation(history)),
+        (paths["chunks"], chunk_pack),
+        (paths["chunk_index"], encode_conversation(chunk_index)),
+        (paths["graph"], encode_conversation(graph)),
+    ]
+    for path, data in objects:
+        store.upload(path, data, content_type=CONTENT_TYPE)
+    return sum(len(data) for _, data in objects)
+
+
+def read_snapshot(store: BlobStore, prefix: str, include_chunks: bool = True) -> Tuple[dict, dict]:
+    paths = snapshot_paths(prefix)
+    graph = decode_conversation(store.download(paths["graph"]))
+    chunks = {}
+    if include_chunks:
+        chunk_index = decode_conversation(store.download(paths["chunk_index"]))
+        chunks = unpack_chunks(chunk_index, store.download(paths["chunks"]))
+    return graph, chunks
+
+
+class ConversationLog:
+    """
+    Append-only, versioned storage of one conversation under `<base>/`:
+
+        head                        current version, snapshots, segments after the last snapshot
+        snapshots/<v>-<token>/...   full state at version v and the segments before it (see write_snapshot)
+        segments/<v>-<token>        changes made by version v: node updates/appends, chunk index
+        segments/<v>-<token>.chunks chunk texts added or changed by version v
+
+    A save writes one segment holding only the nodes and chunks that changed, plus the
+    small head object. Version v is read as the newest snapshot <= v followed by the
+    segments after it: from the head for the newest snapshot, otherwise from the history
+    of the snapshot that follows.
+
+    Several processes may save the same conversation: objects get unique names, and the
+    head is only replaced if it is still at the generation the save started from (the
+    save is retried on the new head otherwise), so a head always points at a complete
+    chain. Compaction writes a new snapshot once the tail has grown to
+    LOG_COMPACT_RATIO of the last one. Every version stays readable unless
+    LOG_KEEP_SNAPSHOTS is set, in which case compaction deletes the versions before the
+    last LOG_KEEP_SNAPSHOTS snapshots.
+    """
+
+    def __init__(self, cache_size: int = LOG_STATE_CACHE_SIZE):
+        # base -> last saved state: head, graph_data and chunks
+        self.states = LRUCache(cache_size)
+        # saves in this process queue up instead of conflicting on the head
+        self.locks: Dict[str, threading.Lock] = {}
+        self.guard = threading.Lock()
+
+    @staticmethod
+    def head_path(base: str) -> str:
+        return f"{base}/head"
+
+    def _lock(self, base: str) -> threading.Lock:
+        with self.guard:
+            return self.locks.setdefault(base, threading.Lock())
+
+    def _read_head(self, store: BlobStore, base: str) -> Tuple[Optional[dict], str]:
+        """
+        The head and the generation it was read at ("0" if there is none yet). The
+        generation is read first, so a head replaced in between fails the save's
+        precondition rather than being overwritten.
+        """
+        generation = store.generation(self.head_path(base))
+        if generation is None:
+            return None, "0"
+        try:
+            return decode_conversation(store.download(self.head_path(base))), generation
+        except BlobNotFoundError:
+            return None, "0"
+
+    @staticmethod
+    def _delete(store: BlobStore, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                store.delete(path)
+            except Exception as e:
+                print(f"[WARNING] Could not delete {path}: {e}")
+
+    @staticmethod
+    def _new_name(version: int) -> str:
+        return f"{version:08d}-{uuid.uuid4().hex[:12]}"
+
+    @staticmethod
+    def _snapshot_prefix(base: str, snapshot: dict) -> str:
+        return f"{base}/snapshots/{snapshot['name']}"
+
+    @staticmethod
+    def _segment_path(base: str, entry: dict) -> str:
+        return f"{base}/segments/{entry['name']}"
+
+    def _segment_objects(self, base: str, entry: dict) -> List[str]:
+        path = self._segment_path(base, entry)
+        return [path, f"{path}.chunks"]
+
+    def _commit(self, store: BlobStore, base: str, head: dict, generation: str, written: List[str]) -> int:
+        """
+        Replace the head if it is still at `generation`, then delete what the new head
+        no longer references; returns the bytes written. On a conflict the objects in
+        `written` are deleted and BlobPreconditionError is raised.
+        """
+        dropped = []
+        if LOG_KEEP_SNAPSHOTS > 0 and len(head["snapshots"]) > LOG_KEEP_SNAPSHOTS:
+            dropped = head["snapshots"][:-LOG_KEEP_SNAPSHOTS]
+            # the segments before the oldest kept snapshot are in its history and in
+            # the histories of the dropped ones
+            covering = dropped[1:] + [head["snapshots"][-LOG_KEEP_SNAPSHOTS]]
+            head = dict(head, snapshots=head["snapshots"][-LOG_KEEP_SNAPSHOTS:])
+        data = encode_conversation(head)
+        try:
+            store.upload(self.head_path(base), data, content_type=CONTENT_TYPE, if_generation_match=generation)
+        except BlobPreconditionError:
+            self._delete(store, written)
+            raise
+        if dropped:
+            pruned = [entry for snapshot in covering for entry in self._history(store, base, snapshot)]
+            self._delete(store, [path for snapshot in dropped
+                                 for path in snapshot_paths(self._snapshot_prefix(base, snapshot)).values()]
+                         + [path for entry in pruned for path in self._segment_objects(base, entry)])
+        return len(data)
+
+    def _history(self, store: BlobStore, base: str, snapshot: dict) -> List[dict]:
+        """
+        Segments between the previous snapshot and `snapshot`
+        """
+        return decode_conversation(store.download(snapshot_paths(self._snapshot_prefix(base, snapshot))["history"]))
+
+    @staticmethod
+    def _history_entries(tail: List[dict]) -> List[dict]:
+        # a snapshot's history is only replayed for older versions, which read chunks
+        # from the segments themselves, so the chunk indexes are left out
+        return [{"version": entry["version"], "name": entry["name"]} for entry in tail]
+
+    def _state(self, store: BlobStore, base: str) -> Optional[dict]:
+        """
+        Last saved state with the current head and its generation, rebuilt from storage
+        if the cached one is missing or stale (another process saved since)
+        """
+        head, generation = self._read_head(store, base)
+        if head is None:
+            return None
+        state = self.states.get(base)
+        if state is None or state["head"]["version"] != head["version"]:
+            data = self._load(store, base, head, head["version"], include_chunks=True)
+            state = self._remember(base, head, data["graph_data"], data["chunk_dict"])
+        return dict(state, head=head, generation=generation)
+
+    def _remember(self, base: str, head: dict, graph_data: list, chunks: dict) -> dict:
+        # shallow copies: later saves compare against these with ==, which is much
+        # cheaper than hashing every node
+        state = {"head": head, "graph_data": [list(nodes) for nodes in graph_data], "chunks": dict(chunks)}
+        self.states.set(base, state)
+        return state
+
+    # saving
+
+    @staticmethod
+    def _graph_changes(state: dict, graph_data: list) -> Optional[List[dict]]:
+        """
+        Node updates and appends per node list, or None if nodes were removed or
+        reordered (the save is then written as a snapshot)
+        """
+        if len(graph_data) != len(state["graph_data"]) or not all(isinstance(nodes, list) for nodes in graph_data):
+            return None
+        changes = []
+        for i, nodes in enumerate(graph_data):
+            saved = state["graph_data"][i]
+            if len(nodes) < len(saved):
+                return None
+            updated = []
+            for position, node in enumerate(nodes[:len(saved)]):
+                if node == saved[position]:
+                    continue
+                if _node_name(node) != _node_name(saved[position]):
+                    return None
+                updated.append([position, node])
+            appended = nodes[len(saved):]
+            if updated or appended:
+                changes.append({"list": i, "updated": updated, "appended": appended})
+        return changes
+
+    @staticmethod
+    def _needs_compaction(head: dict) -> bool:
+        return (len(head["tail"]) >= LOG_COMPACT_SEGMENTS
+                or head["tail_bytes"] >= LOG_COMPACT_RATIO * head["snapshot_bytes"])
+
+    def save(self, base: str, file_name: str, chunks: dict, graph_data: list) -> dict:
+        """
+        Append a version with the changes since the last save, retried against the new
+        head if another process saved first. Returns head_path, version, bytes_written
+        and needs_compaction.
+        """
+        store = get_blob_store()
+        with self._lock(base):
+            for attempt in range(1, LOG_SAVE_ATTEMPTS + 1):
+                try:
+                    return self._save(store, base, file_name, chunks, graph_data)
+                except BlobPreconditionError:
+                    if attempt == LOG_SAVE_ATTEMPTS:
+                        raise
+                    print(f"[WARNING] {base} was saved concurrently, retrying ({attempt}/{LOG_SAVE_ATTEMPTS})")
+
+    def _save(self, store: BlobStore, base: str, file_name: str, chunks: dict, graph_data: list) -> dict:
+        state = self._state(store, base)
+        changes = self._graph_changes(state, graph_data) if state is not None else None
+        generation = state["generation"] if state is not None else "0"
+
+        if changes is None:
+            version = state["head"]["version"] + 1 if state is not None else 1
+            snapshot = {"version": version, "name": self._new_name(version)}
+            prefix = self._snapshot_prefix(base, snapshot)
+            graph = {"file_name": file_name, "graph_data": graph_data}
+            history = self._history_entries(state["head"]["tail"]) if state is not None else []
+            snapshot_bytes = write_snapshot(store, prefix, graph, chunks, history)
+            head = {
+                "version": version,
+                "file_name": file_name,
+                "snapshots": (state["head"]["snapshots"] if state is not None else []) + [snapshot],
+                "snapshot_bytes": snapshot_bytes,
+                "tail": [],
+                "tail_bytes": 0,
+            }
+            bytes_written = snapshot_bytes + self._commit(store, base, head, generation,
+                                                          list(snapshot_paths(prefix).values()))
+            self._remember(base, head, graph_data, chunks)
+            return {"head_path": self.head_path(base), "version": version,
+                    "bytes_written": bytes_written, "needs_compaction": False}
+
+        head = state["head"]
+        saved_chunks = state["chunks"]
+        changed_chunks = {
+            chunk_id: text for chunk_id, text in chunks.items()
+            if chunk_id not in saved_chunks or saved_chunks[chunk_id] != text
+        }
+        removed_chunks = [chunk_id for chunk_id in saved_chunks if chunk_id not in chunks]
+        if not changes and not changed_chunks and not removed_chunks and file_name == head["file_name"]:
+            return {"head_path": self.head_path(base), "version": head["version"],
+                    "bytes_written": 0, "needs_compaction": False}
+
+        version = head["version"] + 1
+        entry = {"version": version, "name": self._new_name(version)}
+        segment_path = self._segment_path(base, entry)
+        chunk_index, chunk_pack = pack_chunks(changed_chunks)
+        segment = encode_conversation({
+            "version": version,
+            "file_name": file_name,
+            "changes": changes,
+            "chunks": chunk_index,
+            "removed_chunks": removed_chunks,
+        })
+        bytes_written = len(segment) + len(chunk_pack)
+        if chunk_pack:
+            store.upload(f"{segment_path}.chunks", chunk_pack, content_type=CONTENT_TYPE)
+        store.upload(segment_path, segment, content_type=CONTENT_TYPE)
+
+        entry.update(chunks=chunk_index, removed_chunks=removed_chunks)
+        head = dict(head, version=version, file_name=file_name, tail_bytes=head["tail_bytes"] + bytes_written,
+                    tail=head["tail"] + [entry])
+        bytes_written += self._commit(store, base, head, generation, self._segment_objects(base, entry))
+        self._remember(base, head, graph_data, chunks)
+        return {"head_path": self.head_path(base), "version": version,
+                "bytes_written": bytes_written, "needs_compaction": self._needs_compaction(head)}
+
+    def compact(self, base: str) -> int:
+        """
+        Snapshot the current version so reads no longer replay the tail; returns the
+        bytes written (0 if there was nothing to compact or another save got in first)
+        """
+        store = get_blob_store()
+        with self._lock(base):
+            state = self._state(store, base)
+            if state is None or not state["head"]["tail"]:
+                return 0
+            head = state["head"]
+            snapshot = {"version": head["version"], "name": self._new_name(head["version"])}
+            prefix = self._snapshot_prefix(base, snapshot)
+            graph = {"file_name": head["file_name"], "graph_data": state["graph_data"]}
+            snapshot_bytes = write_snapshot(store, prefix, graph, state["chunks"], self._history_entries(head["tail"]))
+            head = dict(head, snapshots=head["snapshots"] + [snapshot],
+                        snapshot_bytes=snapshot_bytes, tail=[], tail_bytes=0)
+            try:
+                bytes_written = snapshot_bytes + self._commit(store, base, head, state["generation"],
+                                                              list(snapshot_paths(prefix).values()))
+            except BlobPreconditionError:
+                # a save got in first; it will ask for compaction again
+                print(f"[INFO] Skipped compacting {base}: saved concurrently")
+                return 0
+            self._remember(base, head, state["graph_data"], state["chunks"])
+        print(f"[INFO] Compacted {base} at version {head['version']}")
+        return bytes_written
+
+    # loading
+
+    @staticmethod
+    def _apply_changes(graph_data: list, changes: List[dict]) -> None:
+        for change in changes:
+            nodes = graph_data[change["list"]]
+            for position, node in change["updated"]:
+                nodes[position] = node
+            nodes.extend(change["appended"])
+
+    def _load(self, store: BlobStore, base: str, head: dict, version: int, include_chunks: bool) -> dict:
+        position = sum(1 for snapshot in head["snapshots"] if snapshot["version"] <= version) - 1
+        if position < 0 or version > head["version"]:
+            raise VersionNotFoundError(f"Version {version} not found")
+        snapshot = head["snapshots"][position]
+        graph, chunks = read_snapshot(store, self._snapshot_prefix(base, snapshot), include_chunks)
+        graph_data = graph["graph_data"]
+        if version == snapshot["version"]:
+            segments = []
+        elif position == len(head["snapshots"]) - 1:
+            segments = head["tail"]
+        else:
+            segments = self._history(store, base, head["snapshots"][position + 1])
+        for entry in segments:
+            if entry["version"] > version:
+                break
+            segment_path = self._segment_path(base, entry)
+            segment = decode_conversation(store.download(segment_path))
+            self._apply_changes(graph_data, segment["changes"])
+            if include_chunks:
+                if segment["chunks"]:
+                    chunks.update(unpack_chunks(segment["chunks"], store.download(f"{segment_path}.chunks")))
+                for chunk_id in segment["removed_chunks"]:
+                    chunks.pop(chunk_id, None)
+        return {"graph_data": graph_data, "chunk_dict": chunks, "version": version, "latest_version": head["version"]}
+
+    def load(self, head_path: str, version: Optional[int] = None, include_chunks: bool = True) -> dict:
+        """
+        graph_data, chunk_dict (empty unless include_chunks), version and latest_version
+        """
+        store = get_blob_store()
+        base = head_path[:-len("/head")]
+        head, _ = self._read_head(store, base)
+        if head is None:
+            raise BlobNotFoundError(head_path)
+        return self._load(store, base, head, version or head["version"], include_chunks)
+
+    def load_chunk(self, head_path: str, chunk_id: str) -> Optional[Any]:
+        """
+        Text of one chunk at the latest version, None if there is no such chunk:
+        one range read of the segment or snapshot pack that holds it
+        """
+        store = get_blob_store()
+        base = head_path[:-len("/head")]
+        head, _ = self._read_head(store, base)
+        if head is None:
+            raise BlobNotFoundError(head_path)
+        for entry in reversed(head["tail"]):
+            if chunk_id in entry["chunks"]:
+                offset, length = entry["chunks"][chunk_id]
+                frame = store.download_range(f"{self._segment_path(base, entry)}.chunks", offset, length)
+                return decode_conversation(frame)
+            if chunk_id in entry["removed_chunks"]:
+                return None
+        paths = snapshot_paths(self._snapshot_prefix(base, head["snapshots"][-1]))
+        chunk_index = decode_conversation(store.download(paths["chunk_index"]))
+        if chunk_id not in chunk_index:
+            return None
+        offset, length = chunk_index[chunk_id]
+        return decode_conversation(store.download_range(paths["chunks"], offset, length))
+
+
+conversation_log = ConversationLog()
@@ -0,0 +1,837 @@
+import asyncio
+import base64
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from lct_python_backend.graph_cache import conversation_index_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: conditional uploads are only serialized within the process
+    fcntl = None
+
+# "gcs" (GCS blobs + Firestore metadata) or "local" (filesystem blobs + SQLite metadata)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+# metadata store: "firestore", "sqlite" or "postgres" (DATABASE_URL, see db.py); by
+# default the one that goes with STORAGE_BACKEND
+METADATA_BACKEND = os.getenv("METADATA_BACKEND") or {"gcs": "firestore", "local": "sqlite"}.get(STORAGE_BACKEND)
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "local_storage")
+
+GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
+
+
+class BlobNotFoundError(Exception):
+    pass
+
+
+class BlobPreconditionError(Exception):
+    """
+    A conditional upload found the object at another generation than expected
+    """
+
+
+class BlobStore:
+    """
+    Conversation blobs, addressed by object path (e.g. "<folder>/<conversation_id>.json")
+    """
+
+    def connect(self) -> None:
+        """
+        Set up long-lived clients; called once at app start-up
+        """
+
+    def close(self) -> None:
+        pass
+
+    def upload(self, path: str, data: bytes, content_type: str = "application/json",
+               if_generation_match: Optional[str] = None) -> Optional[str]:
+        """
+        Write the object and return its new generation. With if_generation_match, only
+        if the object is still at that generation ("0": only if there is none), else
+        BlobPreconditionError
+        """
+        raise NotImplementedError
+
+    def delete(self, path: str) -> None:
+        """
+        Remove the object; no error if there is none
+        """
+        raise NotImplementedError
+
+    def download(self, path: str) -> bytes:
+        """
+        Raises BlobNotFoundError if there is no object at `path`
+        """
+        raise NotImplementedError
+
+    def download_range(self, path: str, start: int, length: int) -> bytes:
+        """
+        `length` bytes from offset `start`; raises BlobNotFoundError like download()
+        """
+        return self.download(path)[start:start + length]
+
+    def generation(self, path: str) -> Optional[str]:
+        """
+        Opaque token that changes whenever the object is rewritten (metadata only,
+        no download); None if there is no object at `path`
+        """
+        raise NotImplementedError
+
+
+class GCSBlobStore(BlobStore):
+    """
+    One storage client per process (created by connect(), normally from the app
+    lifespan) and one request per read or write
+    """
+
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+        self.client = None
+        self.bucket = None
+
+    def connect(self) -> None:
+        if self.client is not None:
+            return
+        from google.cloud import storage
+
+        if os.getenv("STORAGE_EMULATOR_HOST"):
+            # local emulator (e.g. fake-gcs-server): no credentials needed
+            from google.auth.credentials import AnonymousCredentials
+
+            self.client = storage.Client(project=os.getenv("GCS_PROJECT", "test"), credentials=AnonymousCredentials())
+        else:
+            self.client = storage.Client()
+        self.bucket = self.client.bucket(self.bucket_name)
+        print(f"[INFO] GCS client ready for bucket {self.bucket_name}")
+
+    def close(self) -> None:
+        if self.client is not None and hasattr(self.client, "close"):
+            self.client.close()
+        self.client = self.bucket = None
+
+    def upload(self, path: str, data: bytes, content_type: str = "application/json",
+               if_generation_match: Optional[str] = None) -> Optional[str]:
+        from google.api_core.exceptions import PreconditionFailed
+
+        self.connect()
+        blob = self.bucket.blob(path)
+        try:
+            if if_generation_match is None:
+                blob.upload_from_string(data, content_type=content_type)
+            else:
+                blob.upload_from_string(data, content_type=content_type, if_generation_match=int(if_generation_match))
+        except PreconditionFailed:
+            raise BlobPreconditionError(path)
+        return str(blob.generation)
+
+    def delete(self, path: str) -> None:
+        from google.api_core.exceptions import NotFound
+
+        self.connect()
+        try:
+            self.bucket.blob(path).delete()
+        except NotFound:
+            pass
+
+    def download(self, path: str) -> bytes:
+        from google.api_core.exceptions import NotFound
+
+        self.connect()
+        try:
+            return self.bucket.blob(path).download_as_bytes()
+        except NotFound:
+            raise BlobNotFoundError(path)
+
+    def download_range(self, path: str, start: int, length: int) -> bytes:
+        from google.api_core.exceptions import NotFound
+
+        self.connect()
+        try:
+            # `end` is inclusive
+            return self.bucket.blob(path).download_as_bytes(start=start, end=start + length - 1)
+        except NotFound:
+            raise BlobNotFoundError(path)
+
+    def generation(self, path: str) -> Optional[str]:
+        self.connect()
+        blob = self.bucket.get_blob(path)
+        return str(blob.generation) if blob is not None else None
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        # conditional uploads check and write under this lock, and under an flock on
+        # <root>/.lock where available so processes sharing the directory agree too
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def _exclusive(self):
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file(self, path: str) -> Path:
+        file = (self.root / path).resolve()
+        if self.root not in file.parents:
+            raise ValueError(f"Invalid object path: {path}")
+        return file
+
+    def upload(self, path: str, data: bytes, content_type: str = "application/json",
+               if_generation_match: Optional[str] = None) -> Optional[str]:
+        file = self._file(path)
+        # write-then-rename so readers never see a partial object
+        tmp = file.with_name(f".{file.name}.{uuid.uuid4().hex}.tmp")
+        for attempt in range(2):
+            file.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                tmp.write_bytes(data)
+                break
+            except FileNotFoundError:
+                # a delete() removed the directory in between
+                if attempt:
+                    raise
+        if if_generation_match is None:
+            os.replace(tmp, file)
+            return self.generation(path)
+        with self._exclusive():
+            if (self.generation(path) or "0") != if_generation_match:
+                tmp.unlink()
+                raise BlobPreconditionError(path)
+            os.replace(tmp, file)
+            return self.generation(path)
+
+    def delete(self, path: str) -> None:
+        file = self._file(path)
+        file.unlink(missing_ok=True)
+        # drop directories left empty, as object stores have none
+        for parent in file.parents:
+            if parent == self.root:
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+
+    def download(self, path: str) -> bytes:
+        try:
+            return self._file(path).read_bytes()
+        except FileNotFoundError:
+            raise BlobNotFoundError(path)
+
+    def download_range(self, path: str, start: int, length: int) -> bytes:
+        try:
+            with open(self._file(path), "rb") as f:
+                f.seek(start)
+                return f.read(length)
+        except FileNotFoundError:
+            raise BlobNotFoundError(path)
+
+    def generation(self, path: str) -> Optional[str]:
+        try:
+            stat = self._file(path).stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_ino}-{stat.st_mtime_ns}-{stat.st_size}"
+
+
+# listing pages are ordered newest first by (created_at, id); a cursor is the key of the
+# last row of the previous page, handed to clients as an opaque token
+Cursor = Tuple[datetime, str]
+
+
+def encode_cursor(row: dict) -> str:
+    created_at = row["created_at"]
+    key = [created_at.isoformat() if isinstance(created_at, datetime) else str(created_at), str(row["id"])]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Raises ValueError for a malformed token
+    """
+    try:
+        created_at, conversation_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.fromisoformat(created_at), str(conversation_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+def _sort_key(row: dict) -> Tuple:
+    return row["created_at"], str(row["id"])
+
+
+def merge_newest_first(*streams: Iterable[dict]) -> Iterator[dict]:
+    """
+    k-way merge of row streams that are each newest first; a conversation appearing
+    in several streams is yielded once, from the earliest stream
+    """
+    seen = set()
+    for row in heapq.merge(*streams, key=_sort_key, reverse=True):
+        if row["id"] not in seen:
+            seen.add(row["id"])
+            yield row
+
+
+def _tagged(rows: Iterable[dict], access_type: str) -> Iterator[dict]:
+    for row in rows:
+        row["access_type"] = access_type
+        yield row
+
+
+def merge_accessible_conversations(owned: Iterable[dict], shared: Iterable[dict]) -> Iterator[dict]:
+    """
+    Lazy newest-first merge of the owned and shared listings (each already newest
+    first), tagging access_type; a conversation in both is listed once, as "owner"
+    """
+    return merge_newest_first(_tagged(owned, "owner"), _tagged(shared, "shared"))
+
+
+# listing views -> access_type of the index rows they show (None: all)
+_VIEW_ACCESS_TYPES = {"all": None, "owned": "owner", "shared": "shared"}
+# cached pages per user before that user's entry starts over
+CONVERSATION_INDEX_PAGES_PER_USER = 64
+
+
+def _page(rows: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """
+    rows holds up to limit + 1 entries; the extra one only signals a next page
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+class MetadataStore:
+    """
+    Conversation metadata and sharing. Conversation rows are dicts with id, file_name,
+    no_of_nodes, gcs_path, created_at, owner_uid and shared_with.
+
+    Methods are coroutines so they can be awaited from endpoints without blocking the
+    event loop.
+
+    Every user also has a conversation index: their listing rows (id, file_name,
+    no_of_nodes, created_at, access_type) kept up to date by insert, share and remove,
+    so a listing is one read instead of the owned and shared queries.
+    """
+
+    async def connect(self) -> None:
+        """
+        Open connections / create tables; called once at app start-up
+        """
+
+    async def close(self) -> None:
+        pass
+
+    async def insert_conversation_metadata(self, metadata: dict) -> None:
+        """
+        metadata must contain: id, file_name, no_of_nodes, gcs_path, created_at, owner_uid
+        """
+        raise NotImplementedError
+
+    async def get_conversation_gcs_path(self, conversation_id: str, user_uid: str) -> Optional[str]:
+        """
+        Object path of the conversation if the user owns it or it is shared with them
+        """
+        raise NotImplementedError
+
+    async def share_conversation(self, conversation_id: str, owner_uid: str, shared_uids: List[str]) -> bool:
+        raise NotImplementedError
+
+    async def remove_user_from_conversation(self, conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
+        raise NotImplementedError
+
+    async def get_conversation_shared_users(self, conversation_id: str, owner_uid: str) -> List[str]:
+        raise NotImplementedError
+
+    async def get_owned_conversations(self, user_uid: str) -> List[dict]:
+        raise NotImplementedError
+
+    async def get_shared_conversations(self, user_uid: str) -> List[dict]:
+        raise NotImplementedError
+
+    async def query_owned_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor] = None) -> List[dict]:
+        """
+        At most `limit` (None: all) owned conversations, newest first, strictly after `start_after`
+        """
+        raise NotImplementedError
+
+    async def query_shared_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor] = None) -> List[dict]:
+        raise NotImplementedError
+
+    async def query_user_conversations(self, user_uid: str, access_type: Optional[str] = None,
+                                       limit: Optional[int] = None, start_after: Optional[Cursor] = None) -> List[dict]:
+        """
+        Rows of the user's conversation index (only `access_type` ones if given), newest
+        first by (created_at, id), strictly after `start_after`, at most `limit` (None: all)
+        """
+        raise NotImplementedError
+
+    async def list_user_conversations(self, user_uid: str, view: str = "all", limit: Optional[int] = None,
+                                      cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Listing page from the conversation index: view is "all", "owned" or "shared";
+        without a limit the whole listing is returned and the next cursor is None.
+
+        Each page is one store query; pages are kept in the in-process TTL cache (rows
+        are shared, callers must not modify them) until one of the user's conversations
+        changes.
+        """
+        if view not in _VIEW_ACCESS_TYPES:
+            raise ValueError(f"Unknown view: {view}")
+        start_after = decode_cursor(cursor) if cursor else None
+        pages = conversation_index_cache.get(user_uid)
+        if pages is None or len(pages) >= CONVERSATION_INDEX_PAGES_PER_USER:
+            pages = {}
+            conversation_index_cache.set(user_uid, pages)
+        key = (view, limit, cursor)
+        if key not in pages:
+            access_type = _VIEW_ACCESS_TYPES[view]
+            if limit is None:
+                page = await self.query_user_conversations(user_uid, access_type, None, start_after), None
+            else:
+                page = _page(await self.query_user_conversations(user_uid, access_type, limit + 1, start_after), limit)
+            # an invalidation during the query replaced `pages`, so this lands in the
+            # discarded dict rather than caching a stale page
+            pages[key] = page
+        return pages[key]
+
+    async def accessible_conversation_ids(self, user_uid: str) -> Set[str]:
+        """
+        Ids of the conversations the user owns or has been shared, from the (cached)
+        conversation index; the access filter for search and related threads
+        """
+        rows, _ = await self.list_user_conversations(user_uid)
+        return {row["id"] for row in rows}
+
+    async def confirm_access(self, conversation_ids: Iterable[str], user_uid: str) -> Set[str]:
+        """
+        The conversations the user can still access, checked against the store: the
+        cached index can lag a share revoked on another instance, so results built from
+        accessible_conversation_ids are filtered through this before they are served
+        """
+        conversation_ids = list(set(conversation_ids))
+        paths = await asyncio.gather(*(self.get_conversation_gcs_path(conversation_id, user_uid)
+                                       for conversation_id in conversation_ids))
+        return {conversation_id for conversation_id, path in zip(conversation_ids, paths) if path}
+
+    @staticmethod
+    def _user_conversations_changed(user_uids: Iterable[str]) -> None:
+        for user_uid in user_uids:
+            conversation_index_cache.invalidate(user_uid)
+
+    async def get_all_accessible_conversations(self, user_uid: str) -> List[dict]:
+        """
+        Owned + shared, newest first, each tagged with access_type. The two ordered
+        queries run concurrently and are merged without a re-sort.
+        """
+        owned, shared = await asyncio.gather(
+            self.query_owned_conversations(user_uid, None),
+            self.query_shared_conversations(user_uid, None),
+        )
+        return list(merge_accessible_conversations(owned, shared))
+
+
+class FirestoreMetadataStore(MetadataStore):
+    """
+    The `conversations_test` Firestore collection (see firestore_db, async client)
+    """
+
+    def __init__(self):
+        from lct_python_backend import firestore_db
+
+        self.firestore_db = firestore_db
+
+    async def insert_conversation_metadata(self, metadata: dict) -> None:
+        self._user_conversations_changed(await self.firestore_db.insert_conversation_metadata_test(metadata))
+
+    async def get_conversation_gcs_path(self, conversation_id: str, user_uid: str) -> Optional[str]:
+        return await self.firestore_db.get_conversation_gcs_path_test(conversation_id, owner_uid=user_uid)
+
+    async def share_conversation(self, conversation_id: str, owner_uid: str, shared_uids: List[str]) -> bool:
+        shared = await self.firestore_db.share_conversation_test(conversation_id, owner_uid, shared_uids)
+        if shared:
+            self._user_conversations_changed(shared_uids)
+        return shared
+
+    async def remove_user_from_conversation(self, conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
+        removed = await self.firestore_db.remove_user_from_conversation_test(conversation_id, owner_uid, user_uid_to_remove)
+        if removed:
+            self._user_conversations_changed([user_uid_to_remove])
+        return removed
+
+    async def get_conversation_shared_users(self, conversation_id: str, owner_uid: str) -> List[str]:
+        return await self.firestore_db.get_conversation_shared_users_test(conversation_id, owner_uid)
+
+    async def get_owned_conversations(self, user_uid: str) -> List[dict]:
+        return await self.firestore_db.get_owned_conversations_test(user_uid)
+
+    async def get_shared_conversations(self, user_uid: str) -> List[dict]:
+        return await self.firestore_db.get_shared_conversations_test(user_uid)
+
+    async def get_all_accessible_conversations(self, user_uid: str) -> List[dict]:
+        return await self.firestore_db.get_all_accessible_conversations_test(user_uid)
+
+    async def query_owned_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor] = None) -> List[dict]:
+        return await self.firestore_db.get_owned_conversations_page_test(user_uid, limit, start_after)
+
+    async def query_shared_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor] = None) -> List[dict]:
+        return await self.firestore_db.get_shared_conversations_page_test(user_uid, limit, start_after)
+
+    async def query_user_conversations(self, user_uid: str, access_type: Optional[str] = None,
+                                       limit: Optional[int] = None, start_after: Optional[Cursor] = None) -> List[dict]:
+        rows = await self.firestore_db.get_user_conversation_page_test(user_uid, access_type, limit, start_after)
+        if rows is None:
+            # first listing since the index was introduced: build it, then page the result
+            rows = await self.firestore_db.build_user_conversation_index_test(user_uid)
+            if access_type is not None:
+                rows = [row for row in rows if row["access_type"] == access_type]
+            if start_after is not None:
+                rows = [row for row in rows if _sort_key(row) < start_after]
+            rows = rows[:limit] if limit is not None else rows
+        return rows
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id          TEXT PRIMARY KEY,
+    file_name   TEXT NOT NULL,
+    no_of_nodes INTEGER NOT NULL,
+    gcs_path    TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    owner_uid   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversations_owner_created ON conversations (owner_uid, created_at, id);
+CREATE TABLE IF NOT EXISTS conversation_shares (
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    user_uid        TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, user_uid)
+);
+CREATE INDEX IF NOT EXISTS conversation_shares_user ON conversation_shares (user_uid);
+CREATE TABLE IF NOT EXISTS user_conversations (
+    user_uid        TEXT NOT NULL,
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    access_type     TEXT NOT NULL,
+    file_name       TEXT NOT NULL,
+    no_of_nodes     INTEGER NOT NULL,
+    created_at      TEXT NOT NULL,
+    PRIMARY KEY (user_uid, conversation_id)
+);
+CREATE INDEX IF NOT EXISTS user_conversations_listing ON user_conversations (user_uid, created_at, conversation_id);
+"""
+
+# user_conversations rows derived from conversations + conversation_shares (filtered with
+# a "WHERE c.id = ?" when one conversation changes). Owners go first, so a conversation
+# that is also shared with its owner is indexed as owned.
+_SQLITE_INDEX_OWNED = (
+    "INSERT OR IGNORE INTO user_conversations "
+    "(user_uid, conversation_id, access_type, file_name, no_of_nodes, created_at) "
+    "SELECT c.owner_uid, c.id, 'owner', c.file_name, c.no_of_nodes, c.created_at FROM conversations c"
+)
+_SQLITE_INDEX_SHARED = (
+    "INSERT OR IGNORE INTO user_conversations "
+    "(user_uid, conversation_id, access_type, file_name, no_of_nodes, created_at) "
+    "SELECT s.user_uid, c.id, 'shared', c.file_name, c.no_of_nodes, c.created_at "
+    "FROM conversation_shares s JOIN conversations c ON c.id = s.conversation_id"
+)
+
+
+class SQLiteMetadataStore(MetadataStore):
+    """
+    Single-node metadata store; same semantics as the Firestore collection
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            new_index = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_conversations'").fetchone() is None
+            conn.executescript(_SQLITE_SCHEMA)
+            if new_index:
+                # database from before the index existed
+                conn.execute(_SQLITE_INDEX_OWNED)
+                conn.execute(_SQLITE_INDEX_SHARED)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _rows(self, conn, where: str, params: tuple, order_limit: str = "") -> List[dict]:
+        rows = conn.execute(
+            "SELECT c.*, (SELECT group_concat(s.user_uid, char(31)) FROM conversation_shares s "
+            "WHERE s.conversation_id = c.id) AS shared "
+            f"FROM conversations c WHERE {where} {order_limit}",
+            params,
+        ).fetchall()
+        conversations = []
+        for row in rows:
+            conv = dict(row)
+            conv["created_at"] = datetime.fromisoformat(conv["created_at"])
+            conv["shared_with"] = conv.pop("shared").split("\x1f") if conv["shared"] else []
+            conversations.append(conv)
+        return conversations
+
+    def _owner(self, conn, conversation_id: str) -> Optional[str]:
+        row = conn.execute("SELECT owner_uid FROM conversations WHERE id = ?", (conversation_id,)).fetchone()
+        return row["owner_uid"] if row else None
+
+    def _reindex_conversation(self, conn, conversation_id: str) -> List[str]:
+        """
+        Rewrite the conversation's user_conversations rows; returns the users whose
+        index changed
+        """
+        changed = {row["user_uid"] for row in conn.execute(
+            "SELECT user_uid FROM user_conversations WHERE conversation_id = ?", (conversation_id,)
+        )}
+        conn.execute("DELETE FROM user_conversations WHERE conversation_id = ?", (conversation_id,))
+        conn.execute(_SQLITE_INDEX_OWNED + " WHERE c.id = ?", (conversation_id,))
+        conn.execute(_SQLITE_INDEX_SHARED + " WHERE c.id = ?", (conversation_id,))
+        changed.update(row["user_uid"] for row in conn.execute(
+            "SELECT user_uid FROM user_conversations WHERE conversation_id = ?", (conversation_id,)
+        ))
+        return list(changed)
+
+    def _insert_conversation_metadata(self, metadata: dict) -> List[str]:
+        created_at = metadata["created_at"]
+        with self._connect() as conn:
+            # like Firestore .set(): overwrite the row, keep the sharing entries
+            conn.execute(
+                "INSERT INTO conversations (id, file_name, no_of_nodes, gcs_path, created_at, owner_uid) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "file_name = excluded.file_name, no_of_nodes = excluded.no_of_nodes, "
+                "gcs_path = excluded.gcs_path, created_at = excluded.created_at, owner_uid = excluded.owner_uid",
+                (str(metadata["id"]), metadata["file_name"], metadata["no_of_nodes"], metadata["gcs_path"],
+                 created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+                 metadata["owner_uid"]),
+            )
+            return self._reindex_conversation(conn, str(metadata["id"]))
+
+    def _get_conversation_gcs_path(self, conversation_id: str, user_uid: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT gcs_path FROM conversations c WHERE c.id = ? AND (c.owner_uid = ? OR EXISTS "
+                "(SELECT 1 FROM conversation_shares s WHERE s.conversation_id = c.id AND s.user_uid = ?))",
+                (conversation_id, user_uid, user_uid),
+            ).fetchone()
+        return row["gcs_path"] if row else None
+
+    def _share_conversation(self, conversation_id: str, owner_uid: str, shared_uids: List[str]) -> bool:
+        with self._connect() as conn:
+            if self._owner(conn, conversation_id) != owner_uid:
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO conversation_shares (conversation_id, user_uid) VALUES (?, ?)",
+                [(conversation_id, uid) for uid in shared_uids],
+            )
+            self._reindex_conversation(conn, conversation_id)
+        return True
+
+    def _remove_user_from_conversation(self, conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
+        with self._connect() as conn:
+            if self._owner(conn, conversation_id) != owner_uid:
+                return False
+            cursor = conn.execute(
+                "DELETE FROM conversation_shares WHERE conversation_id = ? AND user_uid = ?",
+                (conversation_id, user_uid_to_remove),
+            )
+            self._reindex_conversation(conn, conversation_id)
+        return cursor.rowcount > 0
+
+    def _get_conversation_shared_users(self, conversation_id: str, owner_uid: str) -> List[str]:
+        with self._connect() as conn:
+            if self._owner(conn, conversation_id) != owner_uid:
+                return []
+            return [
+                row["user_uid"]
+                for row in conn.execute(
+                    "SELECT user_uid FROM conversation_shares WHERE conversation_id = ?", (conversation_id,)
+                )
+            ]
+
+    def _get_owned_conversations(self, user_uid: str) -> List[dict]:
+        with self._connect() as conn:
+            return self._rows(conn, "c.owner_uid = ?", (user_uid,))
+
+    def _get_shared_conversations(self, user_uid: str) -> List[dict]:
+        with self._connect() as conn:
+            return self._rows(
+                conn,
+                "c.id IN (SELECT conversation_id FROM conversation_shares WHERE user_uid = ?)",
+                (user_uid,),
+            )
+
+    def _query_page(self, where: str, params: tuple, limit: Optional[int], start_after: Optional[Cursor]) -> List[dict]:
+        if start_after is not None:
+            where += " AND (c.created_at, c.id) < (?, ?)"
+            params += (start_after[0].isoformat(), start_after[1])
+        # LIMIT -1 is "no limit" in SQLite
+        params += (limit if limit is not None else -1,)
+        with self._connect() as conn:
+            return self._rows(conn, where, params, "ORDER BY c.created_at DESC, c.id DESC LIMIT ?")
+
+    def _query_owned_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor]) -> List[dict]:
+        return self._query_page("c.owner_uid = ?", (user_uid,), limit, start_after)
+
+    def _query_shared_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor]) -> List[dict]:
+        return self._query_page(
+            "c.id IN (SELECT conversation_id FROM conversation_shares WHERE user_uid = ?)", (user_uid,), limit, start_after
+        )
+
+    def _query_user_conversations(self, user_uid: str, access_type: Optional[str], limit: Optional[int],
+                                  start_after: Optional[Cursor]) -> List[dict]:
+        where, params = "user_uid = ?", (user_uid,)
+        if access_type is not None:
+            where += " AND access_type = ?"
+            params += (access_type,)
+        if start_after is not None:
+            where += " AND (created_at, conversation_id) < (?, ?)"
+            params += (start_after[0].isoformat(), start_after[1])
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT conversation_id AS id, file_name, no_of_nodes, created_at, access_type "
+                f"FROM user_conversations WHERE {where} ORDER BY created_at DESC, conversation_id DESC LIMIT ?",
+                params + (limit if limit is not None else -1,),
+            ).fetchall()
+        conversations = []
+        for row in rows:
+            conv = dict(row)
+            conv["created_at"] = datetime.fromisoformat(conv["created_at"])
+            conversations.append(conv)
+        return conversations
+
+    # blocking sqlite calls run on a worker thread
+
+    async def insert_conversation_metadata(self, metadata: dict) -> None:
+        self._user_conversations_changed(await asyncio.to_thread(self._insert_conversation_metadata, metadata))
+
+    async def get_conversation_gcs_path(self, conversation_id: str, user_uid: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get_conversation_gcs_path, conversation_id, user_uid)
+
+    async def share_conversation(self, conversation_id: str, owner_uid: str, shared_uids: List[str]) -> bool:
+        shared = await asyncio.to_thread(self._share_conversation, conversation_id, owner_uid, shared_uids)
+        if shared:
+            self._user_conversations_changed(shared_uids)
+        return shared
+
+    async def remove_user_from_conversation(self, conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
+        removed = await asyncio.to_thread(self._remove_user_from_conversation, conversation_id, owner_uid, user_uid_to_remove)
+        if removed:
+            self._user_conversations_changed([user_uid_to_remove])
+        return removed
+
+    async def get_conversation_shared_users(self, conversation_id: str, owner_uid: str) -> List[str]:
+        return await asyncio.to_thread(self._get_conversation_shared_users, conversation_id, owner_uid)
+
+    async def get_owned_conversations(self, user_uid: str) -> List[dict]:
+        return await asyncio.to_thread(self._get_owned_conversations, user_uid)
+
+    async def get_shared_conversations(self, user_uid: str) -> List[dict]:
+        return await asyncio.to_thread(self._get_shared_conversations, user_uid)
+
+    async def query_owned_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor] = None) -> List[dict]:
+        return await asyncio.to_thread(self._query_owned_conversations, user_uid, limit, start_after)
+
+    async def query_shared_conversations(self, user_uid: str, limit: Optional[int], start_after: Optional[Cursor] = None) -> List[dict]:
+        return await asyncio.to_thread(self._query_shared_conversations, user_uid, limit, start_after)
+
+    async def query_user_conversations(self, user_uid: str, access_type: Optional[str] = None,
+                                       limit: Optional[int] = None, start_after: Optional[Cursor] = None) -> List[dict]:
+        return await asyncio.to_thread(self._query_user_conversations, user_uid, access_type, limit, start_after)
+
+
+class PostgresMetadataStore(MetadataStore):
+    """
+    PostgreSQL through the pooled async `databases` connection in db.py (asyncpg, one
+    prepared statement per query and connection); conversations plus a
+    conversation_shares join table, queries in db_helpers
+    """
+
+    def __init__(self):
+        from lct_python_backend import db, db_helpers
+
+        self.db = db.db
+        self.db_helpers = db_helpers
+
+    async def connect(self) -> None:
+        if not self.db.is_connected:
+            await self.db.connect()
+            await self.db_helpers.create_schema()
+            print("[INFO] Connected to PostgreSQL metadata store")
+
+    async def close(self) -> None:
+        if self.db.is_connected:
+            await self.db.disconnect()
+
+    async def insert_conversation_metadata(self, metadata: dict) -> None:
+        shared_with = await self.db_helpers.insert_conversation_metadata(metadata)
+        self._user_conversations_changed([metadata["owner_uid"], *shared_with])
+
+    async def get_conversation_gcs_path(self, conversation_id: str, user_uid: str) -> Optional[str]:
+        return await self.db_helpers.get_conversation_gcs_path(conversation_id, user_uid)
+
+    async def share_conversation(self, conversation_id: str, owner_uid: str, shared_uids: List[str]) -> bool:
+        shared = await self.db_helpers.share_conversation(conversation_id, owner_uid, shared_uids)
+        if shared:
+            self._user_conversations_changed(shared_uids)
+        return shared
+
+    async def remove_user_from_conversation(self, conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
+        removed = await self.db_helpers.remove_user_from_conversation(conversation_id, owner_uid, user_uid_to_remove)
+        if removed:
+            self._user_conversations_changed([user_uid_to_remove])
+        return removed
+
+    async def get_conversation_shared_users(self, conversation_id: str, owner_uid: str) -> List[str]:
+        return await self.db_helpers.get_conversation_shared_users(conversation_id, owner_uid)
+
+    async def query_user_conversations(self, user_uid: str, access_type: Optional[str] = None,
+                                       limit: Optional[int] = None, start_after: Optional[Cursor] = None) -> List[dict]:
+        # owned UNION shared over the two indexes is already a single round trip, so
+        # Postgres needs no denormalized copy; listings never use the separate
+        # owned/shared queries, so this store doesn't implement them
+        return await self.db_helpers.get_user_conversations(user_uid, access_type, limit, start_after)
+
+
+@lru_cache(maxsize=None)
+def get_blob_store() -> BlobStore:
+    if STORAGE_BACKEND == "local":
+        return LocalBlobStore(os.path.join(LOCAL_STORAGE_DIR, "blobs"))
+    if STORAGE_BACKEND == "gcs":
+        return GCSBlobStore(GCS_BUCKET_NAME)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+@lru_cache(maxsize=None)
+def get_metadata_store() -> MetadataStore:
+    if METADATA_BACKEND == "sqlite":
+        return SQLiteMetadataStore(os.path.join(LOCAL_STORAGE_DIR, "metadata.db"))
+    if METADATA_BACKEND == "firestore":
+        return FirestoreMetadataStore()
+    if METADATA_BACKEND == "postgres":
+        return PostgresMetadataStore()
+    raise ValueError(f"Unknown METADATA_BACKEND: {METADATA_BACKEND}")
@@ -2,5 +2,15 @@ from databases import Database
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# asyncpg connection pool; each pooled connection prepares a statement the first time
+# it runs it and reuses it afterwards (up to DATABASE_STATEMENT_CACHE_SIZE statements)
+DATABASE_POOL_MIN_SIZE = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+DATABASE_STATEMENT_CACHE_SIZE = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100"))
 
-db = Database(DATABASE_URL)
\ No newline at end of file
+db = Database(
+    DATABASE_URL,
+    min_size=DATABASE_POOL_MIN_SIZE,
+    max_size=DATABASE_POOL_MAX_SIZE,
+    statement_cache_size=DATABASE_STATEMENT_CACHE_SIZE,
+)
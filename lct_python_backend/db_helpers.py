@@ -4,25 +4,144 @@ from lct_python_backend.db import db
 # from datetime import datetime
 # from typing import Optional, List, Dict, Any
 
-async def insert_conversation_metadata(metadata: dict):
+# conversations + the sharing join table; the indexes cover the owner listing, the
+# shared-with listing (newest first) and the per-conversation ACL checks
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id          TEXT PRIMARY KEY,
+        file_name   TEXT,
+        no_of_nodes INTEGER,
+        gcs_path    TEXT,
+        created_at  TIMESTAMP
+    )
+    """,
+    # tables created from the README schema predate owners
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS owner_uid TEXT",
+    "CREATE INDEX IF NOT EXISTS conversations_owner_created ON conversations (owner_uid, created_at DESC, id DESC)",
+    """
+    CREATE TABLE IF NOT EXISTS conversation_shares (
+        conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+        user_uid        TEXT NOT NULL,
+        PRIMARY KEY (conversation_id, user_uid)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS conversation_shares_user ON conversation_shares (user_uid, conversation_id)",
+]
+
+
+async def create_schema():
+    for statement in SCHEMA:
+        await db.execute(statement)
+
+
+async def insert_conversation_metadata(metadata: dict) -> list:
+    """
+    metadata must contain: id, file_name, no_of_nodes, gcs_path, created_at, owner_uid
+    Returns the UIDs the conversation is shared with (the sharing entries are kept)
+    """
     query = """
-    INSERT INTO conversations (id, file_name, no_of_nodes, gcs_path, created_at)
-    VALUES (:id, :file_name, :no_of_nodes, :gcs_path, :created_at)
-    ON CONFLICT (id) DO UPDATE SET
-        file_name = EXCLUDED.file_name,
-        no_of_nodes = EXCLUDED.no_of_nodes,
-        gcs_path = EXCLUDED.gcs_path,
-        created_at = EXCLUDED.created_at
+    WITH upsert AS (
+        INSERT INTO conversations (id, file_name, no_of_nodes, gcs_path, created_at, owner_uid)
+        VALUES (:id, :file_name, :no_of_nodes, :gcs_path, :created_at, :owner_uid)
+        ON CONFLICT (id) DO UPDATE SET
+            file_name = EXCLUDED.file_name,
+            no_of_nodes = EXCLUDED.no_of_nodes,
+            gcs_path = EXCLUDED.gcs_path,
+            created_at = EXCLUDED.created_at,
+            owner_uid = EXCLUDED.owner_uid
+    )
+    SELECT user_uid FROM conversation_shares WHERE conversation_id = :id
     """
-    await db.execute(query, values=metadata)
+    values = {key: metadata[key] for key in ("id", "file_name", "no_of_nodes", "gcs_path", "created_at", "owner_uid")}
+    values["id"] = str(values["id"])
+    return [row["user_uid"] for row in await db.fetch_all(query, values=values)]
 
 async def get_all_conversations():
     query = "SELECT * FROM conversations ORDER BY created_at DESC"
     return await db.fetch_all(query)
 
-async def get_conversation_gcs_path(conversation_id: str) -> str:
-    query = "SELECT gcs_path FROM conversations WHERE id = :id"
-    result = await db.fetch_one(query, values={"id": conversation_id})
+async def get_conversation_gcs_path(conversation_id: str, user_uid: str = None) -> str:
+    """
+    With user_uid, only if the user owns the conversation or it is shared with them
+    """
+    if user_uid is None:
+        query = "SELECT gcs_path FROM conversations WHERE id = :id"
+        result = await db.fetch_one(query, values={"id": conversation_id})
+    else:
+        query = """
+        SELECT gcs_path FROM conversations c WHERE c.id = :id AND (c.owner_uid = :uid OR EXISTS
+            (SELECT 1 FROM conversation_shares s WHERE s.conversation_id = c.id AND s.user_uid = :uid))
+        """
+        result = await db.fetch_one(query, values={"id": conversation_id, "uid": user_uid})
     if result:
         return result["gcs_path"]
-    return None
\ No newline at end of file
+    return None
+
+
+async def share_conversation(conversation_id: str, owner_uid: str, shared_uids: list) -> bool:
+    """
+    Ownership check and insert in one statement; False if the user doesn't own it
+    """
+    query = """
+    WITH owned AS (
+        SELECT id FROM conversations WHERE id = :id AND owner_uid = :owner_uid
+    ), shared AS (
+        INSERT INTO conversation_shares (conversation_id, user_uid)
+        SELECT owned.id, uid FROM owned, unnest(CAST(:uids AS TEXT[])) AS uid
+        ON CONFLICT DO NOTHING
+    )
+    SELECT count(*) FROM owned
+    """
+    values = {"id": conversation_id, "owner_uid": owner_uid, "uids": list(shared_uids)}
+    return await db.fetch_val(query, values=values) > 0
+
+
+async def remove_user_from_conversation(conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
+    """
+    False if the user doesn't own the conversation or it wasn't shared with user_uid_to_remove
+    """
+    query = """
+    DELETE FROM conversation_shares s USING conversations c
+    WHERE s.conversation_id = c.id AND c.id = :id AND c.owner_uid = :owner_uid AND s.user_uid = :uid
+    RETURNING s.user_uid
+    """
+    values = {"id": conversation_id, "owner_uid": owner_uid, "uid": user_uid_to_remove}
+    return await db.fetch_one(query, values=values) is not None
+
+
+async def get_conversation_shared_users(conversation_id: str, owner_uid: str) -> list:
+    query = """
+    SELECT s.user_uid FROM conversation_shares s JOIN conversations c ON c.id = s.conversation_id
+    WHERE c.id = :id AND c.owner_uid = :owner_uid
+    """
+    rows = await db.fetch_all(query, values={"id": conversation_id, "owner_uid": owner_uid})
+    return [row["user_uid"] for row in rows]
+
+
+async def get_user_conversations(user_uid: str, access_type: str = None, limit: int = None,
+                                 start_after: tuple = None) -> list:
+    """
+    Listing rows (id, file_name, no_of_nodes, created_at, access_type) the user can open,
+    newest first, in one query; only `access_type` ones if given, after the
+    (created_at, id) cursor `start_after`, at most `limit` (None: all)
+    """
+    values = {"uid": user_uid, "limit": limit}
+    after = ""
+    if start_after is not None:
+        after = " AND (c.created_at, c.id) < (:after_created_at, :after_id)"
+        values.update(after_created_at=start_after[0], after_id=start_after[1])
+    branches = []
+    if access_type in (None, "owner"):
+        branches.append(f"""
+        SELECT c.id, c.file_name, c.no_of_nodes, c.created_at, 'owner' AS access_type
+        FROM conversations c WHERE c.owner_uid = :uid{after}
+        """)
+    if access_type in (None, "shared"):
+        branches.append(f"""
+        SELECT c.id, c.file_name, c.no_of_nodes, c.created_at, 'shared' AS access_type
+        FROM conversation_shares s JOIN conversations c ON c.id = s.conversation_id
+        WHERE s.user_uid = :uid AND c.owner_uid IS DISTINCT FROM :uid{after}
+        """)
+    query = " UNION ALL ".join(branches) + " ORDER BY created_at DESC, id DESC LIMIT :limit"
+    return [dict(row._mapping) for row in await db.fetch_all(query, values=values)]
@@ -1,6 +1,7 @@
 # Firebase configuration for backend
 # This file helps manage Firebase Admin SDK initialization
 
+import asyncio
 import os
 import json
 import firebase_admin
@@ -106,6 +107,48 @@ def get_user_by_email(email: str) -> dict:
             detail="Failed to get user information"
         )
 
+# auth.get_users accepts at most 100 identifiers per request
+GET_USERS_BATCH_SIZE = 100
+
+def normalize_email(email: str) -> str:
+    """
+    Key email lookups are made and matched on: addresses differing only in case or
+    surrounding whitespace are the same account
+    """
+    return email.strip().lower()
+
+def get_users_by_emails(emails: list) -> dict:
+    """
+    Look up users by email in batched requests; returns {normalized email: user info}
+    for the emails that belong to a user (see normalize_email)
+    """
+    emails = list(dict.fromkeys(normalize_email(email) for email in emails))
+    users = {}
+    for start in range(0, len(emails), GET_USERS_BATCH_SIZE):
+        batch = emails[start:start + GET_USERS_BATCH_SIZE]
+        result = auth.get_users([auth.EmailIdentifier(email) for email in batch])
+        for user in result.users:
+            email = normalize_email(user.email or "")
+            if email in batch:
+                users[email] = {
+                    'uid': user.uid,
+                    'email': user.email,
+                    'email_verified': user.email_verified,
+                    'display_name': user.display_name
+                }
+    return users
+
+async def resolve_users_by_emails(emails: list) -> dict:
+    """
+    get_users_by_emails with the batches looked up concurrently, off the event loop
+    """
+    emails = list(dict.fromkeys(normalize_email(email) for email in emails))
+    batches = [emails[start:start + GET_USERS_BATCH_SIZE] for start in range(0, len(emails), GET_USERS_BATCH_SIZE)]
+    users = {}
+    for found in await asyncio.gather(*(asyncio.to_thread(get_users_by_emails, batch) for batch in batches)):
+        users.update(found)
+    return users
+
 def get_users_by_uids(uids: list) -> list:
     """
     Get user information by list of UIDs
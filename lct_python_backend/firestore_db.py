@@ -1,18 +1,27 @@
+import asyncio
+from functools import lru_cache
+
 from google.cloud import firestore
 
-# synchronous
-db = firestore.Client(project="live-conversational-threads",
-                      database="lct-db") 
+from lct_python_backend.conversation_store import merge_accessible_conversations
+
+
+# async client, so queries don't block the event loop; created on first use (inside
+# the running loop) rather than at import time
+@lru_cache(maxsize=None)
+def get_db() -> firestore.AsyncClient:
+    return firestore.AsyncClient(project="live-conversational-threads",
+                                 database="lct-db")
 
 
-def insert_conversation_metadata(metadata: dict) -> None:
+async def insert_conversation_metadata(metadata: dict) -> None:
     """
     metadata must contain: id, file_name, no_of_nodes, gcs_path, created_at
     """
-    doc_ref = db.collection("conversations").document(str(metadata["id"]))
+    doc_ref = get_db().collection("conversations").document(str(metadata["id"]))
     # .set() overwrites the doc if it already exists → behaves like
     # “INSERT … ON CONFLICT(id) DO UPDATE …” in Postgres
-    doc_ref.set({
+    await doc_ref.set({
         "file_name"  : metadata["file_name"],
         "no_of_nodes": metadata["no_of_nodes"],
         "gcs_path"   : metadata["gcs_path"],
@@ -20,18 +29,18 @@ def insert_conversation_metadata(metadata: dict) -> None:
     })
 
 
-def get_all_conversations() -> list[dict]:
+async def get_all_conversations() -> list[dict]:
     docs = (
-        db.collection("conversations")
+        get_db().collection("conversations")
           .order_by("created_at", direction=firestore.Query.DESCENDING)
-          .stream()                                  # blocking iterator
+          .stream()                                  # async iterator
     )
-    return [{"id": doc.id, **(doc.to_dict() or {})} for doc in docs]
+    return [{"id": doc.id, **(doc.to_dict() or {})} async for doc in docs]
 
 
-def get_conversation_gcs_path(conversation_id: str) -> str | None:
-    snap = (
-        db.collection("conversations")
+async def get_conversation_gcs_path(conversation_id: str) -> str | None:
+    snap = await (
+        get_db().collection("conversations")
           .document(conversation_id)
           .get()
     )
@@ -40,39 +49,95 @@ def get_conversation_gcs_path(conversation_id: str) -> str | None:
     return None
 
 
-def insert_conversation_metadata_test(metadata: dict) -> None:
+# Per-user conversation index: user_conversations_test/{uid}/conversations/{conversation_id}
+# holds the listing row of every conversation the user can open. The owner's entry is
+# written in the same transaction as the change to conversations_test; shared users'
+# entries are fanned out in batches right after, since one conversation can be shared
+# with more users than a transaction can write. The user document itself marks the
+# index as built (conversations saved before the index existed are added on first read).
+def _user_index(user_uid: str):
+    return get_db().collection("user_conversations_test").document(user_uid)
+
+
+def _index_entry(user_uid: str, conversation_id: str):
+    return _user_index(user_uid).collection("conversations").document(conversation_id)
+
+
+def _index_row(data: dict, access_type: str) -> dict:
+    return {
+        "file_name"  : data.get("file_name"),
+        "no_of_nodes": data.get("no_of_nodes"),
+        "created_at" : data.get("created_at"),
+        "access_type": access_type,
+    }
+
+
+# Firestore commits at most 500 writes per batch or transaction
+MAX_WRITES = 500
+
+
+async def _write_index_entries(conversation_id: str, user_uids: list[str], row: dict) -> None:
+    for start in range(0, len(user_uids), MAX_WRITES):
+        batch = get_db().batch()
+        for uid in user_uids[start:start + MAX_WRITES]:
+            batch.set(_index_entry(uid, conversation_id), row)
+        await batch.commit()
+
+
+async def insert_conversation_metadata_test(metadata: dict) -> list[str]:
     """
     metadata must contain: id, file_name, no_of_nodes, gcs_path, created_at, owner_uid
+    Returns the users whose conversation index changed
     """
-    doc_ref = db.collection("conversations_test").document(str(metadata["id"]))
-    doc_ref.set({
+    conversation_id = str(metadata["id"])
+    doc_ref = get_db().collection("conversations_test").document(conversation_id)
+    data = {
         "file_name"  : metadata["file_name"],
         "no_of_nodes": metadata["no_of_nodes"],
         "gcs_path"   : metadata["gcs_path"],
         "created_at" : metadata["created_at"],
         "owner_uid"  : metadata["owner_uid"],
-    })
+    }
 
+    @firestore.async_transactional
+    async def insert(transaction) -> tuple[list[str], list[str]]:
+        snap = await doc_ref.get(field_paths=["owner_uid", "shared_with"], transaction=transaction)
+        current = (snap.to_dict() or {}) if snap.exists else {}
+        shared_with = [uid for uid in current.get("shared_with", []) if uid != data["owner_uid"]]
+        # merge keeps shared_with: saving a new version doesn't unshare the conversation
+        transaction.set(doc_ref, data, merge=True)
+        transaction.set(_index_entry(data["owner_uid"], conversation_id), _index_row(data, "owner"))
+        changed = [data["owner_uid"]]
+        previous_owner = current.get("owner_uid")
+        if previous_owner and previous_owner != data["owner_uid"]:
+            transaction.delete(_index_entry(previous_owner, conversation_id))
+            changed.append(previous_owner)
+        return changed, shared_with
 
-def get_all_conversations_test(owner_uid: str) -> list[dict]:
+    changed, shared_with = await insert(get_db().transaction())
+    await _write_index_entries(conversation_id, shared_with, _index_row(data, "shared"))
+    return changed + shared_with
+
+
+async def get_all_conversations_test(owner_uid: str) -> list[dict]:
     """
     Get all conversations for a specific owner
     """
     docs = (
-        db.collection("conversations_test")
+        get_db().collection("conversations_test")
           .where("owner_uid", "==", owner_uid)
           .order_by("created_at", direction=firestore.Query.DESCENDING)
           .stream()
     )
-    return [{"id": doc.id, **(doc.to_dict() or {})} for doc in docs]
+    return [{"id": doc.id, **(doc.to_dict() or {})} async for doc in docs]
 
 
-def get_conversation_gcs_path_test(conversation_id: str, owner_uid: str) -> str | None:
+async def get_conversation_gcs_path_test(conversation_id: str, owner_uid: str) -> str | None:
     """
     Get conversation GCS path only if the user is the owner or has shared access
     """
-    snap = (
-        db.collection("conversations_test")
+    snap = await (
+        get_db().collection("conversations_test")
           .document(conversation_id)
           .get()
     )
@@ -84,92 +149,114 @@ def get_conversation_gcs_path_test(conversation_id: str, owner_uid: str) -> str
     return None
 
 
-def share_conversation_test(conversation_id: str, owner_uid: str, shared_uids: list[str]) -> bool:
+async def share_conversation_test(conversation_id: str, owner_uid: str, shared_uids: list[str]) -> bool:
     """
     Share a conversation with specified users by adding their UIDs to shared_with array
     Only the owner can share the conversation
     """
-    doc_ref = db.collection("conversations_test").document(conversation_id)
-    snap = doc_ref.get()
-    
-    if not snap.exists:
+    doc_ref = get_db().collection("conversations_test").document(conversation_id)
+
+    # the ownership check and the write commit together, and ArrayUnion merges with
+    # concurrent shares on the server instead of overwriting them
+    @firestore.async_transactional
+    async def share(transaction) -> dict | None:
+        snap = await doc_ref.get(
+            field_paths=["owner_uid", "file_name", "no_of_nodes", "created_at"], transaction=transaction
+        )
+        data = (snap.to_dict() or {}) if snap.exists else {}
+        if data.get("owner_uid") != owner_uid:
+            return None  # Only owner can share
+        transaction.update(doc_ref, {"shared_with": firestore.ArrayUnion(list(shared_uids))})
+        return data
+
+    data = await share(get_db().transaction())
+    if data is None:
         return False
-        
-    data = snap.to_dict() or {}
-    if data.get("owner_uid") != owner_uid:
-        return False  # Only owner can share
-    
-    # Get existing shared_with list or create empty list
-    current_shared = data.get("shared_with", [])
-    
-    # Add new UIDs to the list (avoiding duplicates)
-    updated_shared = list(set(current_shared + shared_uids))
-    
-    # Update the document
-    doc_ref.update({"shared_with": updated_shared})
+    await _write_index_entries(
+        conversation_id, [uid for uid in shared_uids if uid != owner_uid], _index_row(data, "shared")
+    )
     return True
 
 
-def get_owned_conversations_test(user_uid: str) -> list[dict]:
+async def get_owned_conversations_test(user_uid: str) -> list[dict]:
     """
     Get all conversations owned by a specific user (without sorting)
     """
     docs = (
-        db.collection("conversations_test")
+        get_db().collection("conversations_test")
           .where("owner_uid", "==", user_uid)
           .stream()
     )
-    return [{"id": doc.id, **(doc.to_dict() or {})} for doc in docs]
+    return [{"id": doc.id, **(doc.to_dict() or {})} async for doc in docs]
 
 
-def get_shared_conversations_test(user_uid: str) -> list[dict]:
+async def get_shared_conversations_test(user_uid: str) -> list[dict]:
     """
     Get all conversations shared with a specific user (without sorting)
     """
     docs = (
-        db.collection("conversations_test")
+        get_db().collection("conversations_test")
           .where("shared_with", "array_contains", user_uid)
           .stream()
     )
-    return [{"id": doc.id, **(doc.to_dict() or {})} for doc in docs]
+    return [{"id": doc.id, **(doc.to_dict() or {})} async for doc in docs]
 
 
-def get_all_accessible_conversations_test(user_uid: str) -> list[dict]:
+def _conversation_page_query(field: str, op: str, value, limit: int | None, start_after: tuple | None):
     """
-    Get all conversations accessible to a user (owned + shared)
+    Newest first by (created_at, document id). Needs the composite indexes in
+    firestore.indexes.json (field + created_at descending).
     """
-    # Get owned and shared conversations using helper functions
-    owned_conversations = get_owned_conversations_test(user_uid)
-    shared_conversations = get_shared_conversations_test(user_uid)
-    
-    # Combine and deduplicate
-    all_conversations = {}
-    
-    # Add owned conversations
-    for conv in owned_conversations:
-        conv["access_type"] = "owner"
-        all_conversations[conv["id"]] = conv
-    
-    # Add shared conversations (avoid duplicates)
-    for conv in shared_conversations:
-        if conv["id"] not in all_conversations:
-            conv["access_type"] = "shared"
-            all_conversations[conv["id"]] = conv
-    
-    # Sort by created_at
-    conversations_list = list(all_conversations.values())
-    conversations_list.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    
-    return conversations_list
+    collection = get_db().collection("conversations_test")
+    query = (
+        collection
+          .where(field, op, value)
+          .order_by("created_at", direction=firestore.Query.DESCENDING)
+          .order_by("__name__", direction=firestore.Query.DESCENDING)
+    )
+    if start_after is not None:
+        created_at, conversation_id = start_after
+        query = query.start_after({"created_at": created_at, "__name__": collection.document(conversation_id)})
+    return query.limit(limit) if limit is not None else query
 
 
-def get_conversation_shared_users_test(conversation_id: str, owner_uid: str) -> list[str]:
+async def get_owned_conversations_page_test(user_uid: str, limit: int | None, start_after: tuple | None = None) -> list[dict]:
+    """
+    At most `limit` (None: all) conversations owned by the user, newest first, after
+    the (created_at, id) cursor `start_after`
+    """
+    docs = _conversation_page_query("owner_uid", "==", user_uid, limit, start_after).stream()
+    return [{"id": doc.id, **(doc.to_dict() or {})} async for doc in docs]
+
+
+async def get_shared_conversations_page_test(user_uid: str, limit: int | None, start_after: tuple | None = None) -> list[dict]:
+    """
+    Same as get_owned_conversations_page_test for conversations shared with the user
+    """
+    docs = _conversation_page_query("shared_with", "array_contains", user_uid, limit, start_after).stream()
+    return [{"id": doc.id, **(doc.to_dict() or {})} async for doc in docs]
+
+
+async def get_all_accessible_conversations_test(user_uid: str) -> list[dict]:
+    """
+    Get all conversations accessible to a user (owned + shared), newest first
+    """
+    # both queries in flight at once, each already ordered by created_at, so the
+    # listing costs the slower of the two and the merge needs no re-sort
+    owned_conversations, shared_conversations = await asyncio.gather(
+        get_owned_conversations_page_test(user_uid, None),
+        get_shared_conversations_page_test(user_uid, None),
+    )
+    return list(merge_accessible_conversations(owned_conversations, shared_conversations))
+
+
+async def get_conversation_shared_users_test(conversation_id: str, owner_uid: str) -> list[str]:
     """
     Get the list of UIDs that a conversation is shared with
     Only the owner can see this information
     """
-    snap = (
-        db.collection("conversations_test")
+    snap = await (
+        get_db().collection("conversations_test")
           .document(conversation_id)
           .get()
     )
@@ -184,26 +271,73 @@ def get_conversation_shared_users_test(conversation_id: str, owner_uid: str) ->
     return data.get("shared_with", [])
 
 
-def remove_user_from_conversation_test(conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
+async def remove_user_from_conversation_test(conversation_id: str, owner_uid: str, user_uid_to_remove: str) -> bool:
     """
     Remove a user from the shared_with list of a conversation
     Only the owner can remove users
     """
-    doc_ref = db.collection("conversations_test").document(conversation_id)
-    snap = doc_ref.get()
-    
-    if not snap.exists:
-        return False
-        
-    data = snap.to_dict() or {}
-    if data.get("owner_uid") != owner_uid:
-        return False  # Only owner can remove users
-    
-    current_shared = data.get("shared_with", [])
-    
-    if user_uid_to_remove in current_shared:
-        updated_shared = [uid for uid in current_shared if uid != user_uid_to_remove]
-        doc_ref.update({"shared_with": updated_shared})
+    doc_ref = get_db().collection("conversations_test").document(conversation_id)
+
+    @firestore.async_transactional
+    async def remove(transaction) -> bool:
+        snap = await doc_ref.get(field_paths=["owner_uid", "shared_with"], transaction=transaction)
+        if not snap.exists:
+            return False
+        data = snap.to_dict() or {}
+        if data.get("owner_uid") != owner_uid:
+            return False  # Only owner can remove users
+        if user_uid_to_remove not in data.get("shared_with", []):
+            return False  # User was not in the shared list
+        transaction.update(doc_ref, {"shared_with": firestore.ArrayRemove([user_uid_to_remove])})
+        if user_uid_to_remove != owner_uid:
+            transaction.delete(_index_entry(user_uid_to_remove, conversation_id))
         return True
-    
-    return False  # User was not in the shared list
\ No newline at end of file
+
+    return await remove(get_db().transaction())
+
+
+async def get_user_conversation_page_test(user_uid: str, access_type: str | None = None, limit: int | None = None,
+                                          start_after: tuple | None = None) -> list[dict] | None:
+    """
+    One page of the user's index (only `access_type` rows if given), newest first by
+    (created_at, id), after the cursor `start_after`; None if the index hasn't been
+    built for this user yet. Filtering on access_type needs the index in
+    firestore.indexes.json.
+    """
+    index_ref = _user_index(user_uid)
+    entries = index_ref.collection("conversations")
+    query = entries
+    if access_type is not None:
+        query = query.where("access_type", "==", access_type)
+    query = (
+        query
+          .order_by("created_at", direction=firestore.Query.DESCENDING)
+          .order_by("__name__", direction=firestore.Query.DESCENDING)
+    )
+    if start_after is not None:
+        created_at, conversation_id = start_after
+        query = query.start_after({"created_at": created_at, "__name__": entries.document(conversation_id)})
+    if limit is not None:
+        query = query.limit(limit)
+
+    async def rows():
+        return [{"id": doc.id, **(doc.to_dict() or {})} async for doc in query.stream()]
+
+    marker, conversations = await asyncio.gather(index_ref.get(), rows())
+    return conversations if marker.exists else None
+
+
+async def build_user_conversation_index_test(user_uid: str) -> list[dict]:
+    """
+    (Re)build the user's index from conversations_test; returns the listing rows
+    """
+    conversations = await get_all_accessible_conversations_test(user_uid)
+    rows = [{"id": conv["id"], **_index_row(conv, conv["access_type"])} for conv in conversations]
+    # the marker is set once every row is in
+    for start in range(0, len(rows), MAX_WRITES):
+        batch = get_db().batch()
+        for row in rows[start:start + MAX_WRITES]:
+            batch.set(_index_entry(user_uid, row["id"]), {k: v for k, v in row.items() if k != "id"})
+        await batch.commit()
+    await _user_index(user_uid).set({"built_at": firestore.SERVER_TIMESTAMP})
+    return rows
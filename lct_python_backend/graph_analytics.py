@@ -0,0 +1,198 @@
+import hashlib
+import json
+import random
+from collections import deque
+from typing import Dict, List
+
+from lct_python_backend.conversation_graph import ConversationGraph
+from lct_python_backend.graph_cache import LRUCache, GRAPH_CACHE_SIZE
+
+# exact betweenness up to this many nodes, pivot-sampled above it
+BETWEENNESS_EXACT_LIMIT = 2000
+BETWEENNESS_PIVOTS = 256
+TOP_K = 10
+
+# conversation_id -> analytics dict (carries the graph version it was computed for)
+analytics_cache = LRUCache(GRAPH_CACHE_SIZE)
+
+
+def graph_version(graph_data: list) -> str:
+    """
+    Content hash of graph_data; identifies the saved version analytics were computed for
+    """
+    canonical = json.dumps(graph_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def _context_edges(graph: ConversationGraph):
+    """
+    Undirected adjacency over linked_nodes + contextual_relation, and the directed
+    "provides context to" edges (relation key -> node), as index lists.
+    """
+    names = list(graph.by_name)
+    ids = {name: i for i, name in enumerate(names)}
+    undirected = [set() for _ in names]
+    provides = [set() for _ in names]
+    for name, i in ids.items():
+        node = graph.by_name[name]
+        for other in node.get("linked_nodes") or []:
+            j = ids.get(other)
+            if j is not None and j != i:
+                undirected[i].add(j)
+                undirected[j].add(i)
+        for other in (node.get("contextual_relation") or {}):
+            j = ids.get(other)
+            if j is not None and j != i:
+                undirected[i].add(j)
+                undirected[j].add(i)
+                provides[j].add(i)
+    return names, [sorted(a) for a in undirected], [sorted(p) for p in provides]
+
+
+def _betweenness(adjacency: List[List[int]], seed: int = 0) -> List[float]:
+    """
+    Brandes' algorithm on an unweighted undirected graph, normalized to [0, 1].
+    Large graphs use a fixed random sample of source pivots and extrapolate.
+    """
+    n = len(adjacency)
+    scores = [0.0] * n
+    if n < 3:
+        return scores
+    sources = range(n)
+    scale = 1.0
+    if n > BETWEENNESS_EXACT_LIMIT:
+        sources = random.Random(seed).sample(range(n), BETWEENNESS_PIVOTS)
+        scale = n / BETWEENNESS_PIVOTS
+
+    for s in sources:
+        stack = []
+        predecessors = [[] for _ in range(n)]
+        sigma = [0] * n
+        sigma[s] = 1
+        dist = [-1] * n
+        dist[s] = 0
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            stack.append(v)
+            for w in adjacency[v]:
+                if dist[w] < 0:
+                    dist[w] = dist[v] + 1
+                    queue.append(w)
+                if dist[w] == dist[v] + 1:
+                    sigma[w] += sigma[v]
+                    predecessors[w].append(v)
+        delta = [0.0] * n
+        while stack:
+            w = stack.pop()
+            for v in predecessors[w]:
+                delta[v] += sigma[v] / sigma[w] * (1 + delta[w])
+            if w != s:
+                scores[w] += delta[w]
+
+    # each pair is counted from both ends in an undirected graph
+    norm = scale / ((n - 1) * (n - 2))
+    return [score * norm for score in scores]
+
+
+def _components(adjacency: List[List[int]]) -> List[List[int]]:
+    seen = [False] * len(adjacency)
+    components = []
+    for start in range(len(adjacency)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        component = [start]
+        queue = deque([start])
+        while queue:
+            for w in adjacency[queue.popleft()]:
+                if not seen[w]:
+                    seen[w] = True
+                    component.append(w)
+                    queue.append(w)
+        components.append(component)
+    components.sort(key=len, reverse=True)
+    return components
+
+
+def _reach(provides: List[List[int]], start: int) -> int:
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        for w in provides[queue.popleft()]:
+            if w not in seen:
+                seen.add(w)
+                queue.append(w)
+    return len(seen) - 1
+
+
+def _longest_chains(provides: List[List[int]], order: Dict[int, int], k: int) -> List[List[int]]:
+    """
+    Longest chains of context-providing edges that move forward in time (a DAG, so a
+    single DP pass in conversation order), best `k` by distinct end node
+    """
+    nodes = sorted(order, key=order.get)
+    length = {v: 0 for v in nodes}
+    parent: Dict[int, int] = {}
+    for v in nodes:
+        for w in provides[v]:
+            if order[w] > order[v] and length[v] + 1 > length[w]:
+                length[w] = length[v] + 1
+                parent[w] = v
+    chains = []
+    for end in sorted(nodes, key=lambda v: (-length[v], order[v]))[:k]:
+        if length[end] == 0:
+            break
+        chain = [end]
+        while chain[-1] in parent:
+            chain.append(parent[chain[-1]])
+        chains.append(chain[::-1])
+    return chains
+
+
+def compute_graph_analytics(graph: ConversationGraph, version: str) -> dict:
+    names, adjacency, provides = _context_edges(graph)
+    n = len(names)
+    degree = [len(a) for a in adjacency]
+    betweenness = _betweenness(adjacency)
+    ids = {name: i for i, name in enumerate(names)}
+    order = {i: graph.positions[name] for i, name in enumerate(names)}
+
+    def top(values):
+        ranked = sorted(range(n), key=lambda i: (-values[i], order[i]))[:TOP_K]
+        return [{"node_name": names[i], "score": values[i]} for i in ranked if values[i] > 0]
+
+    degree_centrality = [d / (n - 1) for d in degree] if n > 1 else [0.0] * n
+    return {
+        "version": version,
+        "node_count": n,
+        "edge_count": sum(degree) // 2,
+        "degree_centrality": {names[i]: degree_centrality[i] for i in range(n)},
+        "betweenness_centrality": {names[i]: betweenness[i] for i in range(n)},
+        "top_degree": top(degree_centrality),
+        "top_betweenness": top(betweenness),
+        "thread_clusters": [
+            [names[i] for i in sorted(c, key=order.get)] for c in _components(adjacency)
+        ],
+        "bookmark_reach": {
+            node["node_name"]: _reach(provides, ids[node["node_name"]])
+            for node in graph.bookmark_nodes() if node.get("node_name") in ids
+        },
+        "longest_contextual_chains": [
+            [names[i] for i in chain] for chain in _longest_chains(provides, order, 3)
+        ],
+    }
+
+
+def refresh_graph_analytics(conversation_id: str, graph_data: list) -> dict:
+    """
+    Analytics for a conversation version, computed once and cached
+    """
+    version = graph_version(graph_data)
+    cached = analytics_cache.get(conversation_id)
+    if cached is not None and cached["version"] == version:
+        return cached
+    analytics = compute_graph_analytics(ConversationGraph.from_graph_data(graph_data), version)
+    analytics_cache.set(conversation_id, analytics)
+    print(f"[INFO] Computed analytics for {conversation_id} (version {version[:12]}, {analytics['node_count']} nodes)")
+    return analytics
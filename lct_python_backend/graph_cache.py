@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+GRAPH_CACHE_SIZE = int(os.getenv("GRAPH_CACHE_SIZE", "64"))
+# parsed conversations are much larger than graphs (they can include the transcript)
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "16"))
+# per-user listing indexes; other instances' writes show up after at most the TTL
+CONVERSATION_INDEX_CACHE_SIZE = int(os.getenv("CONVERSATION_INDEX_CACHE_SIZE", "1024"))
+CONVERSATION_INDEX_TTL = float(os.getenv("CONVERSATION_INDEX_TTL", "30"))
+
+
+class LRUCache:
+    """
+    Small in-process LRU cache; evicts the least recently used entry past max_size.
+    Safe to share between threadpool workers.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.guard = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.guard:
+            return self._get(key)
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self.guard:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.guard:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TTLCache(LRUCache):
+    """
+    LRUCache whose entries expire `ttl` seconds after they were set
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size)
+        self.ttl = ttl
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        entry = super()._get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        super().set(key, (time.monotonic() + self.ttl, value))
+
+
+# conversation_id -> (generation, ConversationGraph built from the stored graph_data); entries
+# are validated against the object's current generation before use
+graph_cache = LRUCache(GRAPH_CACHE_SIZE)
+
+# (object path, version, include_chunks) -> (generation, loaded conversation); entries are
+# validated against the object's current generation before use
+conversation_cache = LRUCache(CONVERSATION_CACHE_SIZE)
+
+# user_uid -> the user's conversation listing rows, newest first (see MetadataStore.get_user_conversations)
+conversation_index_cache = TTLCache(CONVERSATION_INDEX_CACHE_SIZE, CONVERSATION_INDEX_TTL)
@@ -0,0 +1,32 @@
+from typing import Dict
+
+
+def build_graph_delta(seq: int, graph, repair: dict, new_chunks: Dict[str, str]) -> dict:
+    """
+    Incremental /ws/audio update for one processed batch.
+
+    Carries the nodes added by the batch (as stored, after repair), the changed fields of
+    existing nodes and the new transcript chunks. Clients apply deltas in `seq` order and
+    ask for a "resync" when they see a gap.
+    """
+    return {
+        "type": "graph_delta",
+        "seq": seq,
+        "added_nodes": [graph.get_node(node["node_name"]) for node in repair["added"]],
+        "updated_nodes": [
+            {"node_name": name, "fields": fields} for name, fields in repair["changes"].items()
+        ],
+        "new_chunks": new_chunks,
+    }
+
+
+def build_graph_snapshot(seq: int, graph, chunk_dict: Dict[str, str]) -> dict:
+    """
+    Full state at `seq`, sent when a client asks to resync
+    """
+    return {
+        "type": "graph_snapshot",
+        "seq": seq,
+        "graph_data": graph.to_graph_data(),
+        "chunk_dict": chunk_dict,
+    }
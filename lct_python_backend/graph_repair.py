@@ -0,0 +1,147 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+from lct_python_backend.conversation_graph import ConversationNode
+
+
+def _copy_node(node: ConversationNode) -> ConversationNode:
+    copied = dict(node)
+    copied["linked_nodes"] = list(node.get("linked_nodes") or [])
+    copied["contextual_relation"] = dict(node.get("contextual_relation") or {})
+    return copied
+
+
+def _is_bookmark(node: Optional[ConversationNode]) -> bool:
+    return bool(node) and (node.get("is_bookmark") or node.get("type") == "bookmark")
+
+
+def repair_and_add_nodes(
+    graph,
+    new_nodes: List[ConversationNode],
+    updated_nodes: Optional[List[ConversationNode]] = None,
+) -> dict:
+    """
+    Validate a freshly generated batch of nodes against the graph, repair it and add it.
+
+    Only the new nodes and their direct neighbours are read or rewritten, so the cost is
+    proportional to the batch, not the graph. `graph` is a ConversationGraph or a
+    CompactNodeStore. Invariants enforced:
+    - node names are unique: a re-emitted bookmark is merged into the existing bookmark,
+      any other duplicate is renamed with a numeric suffix
+    - linked_nodes and contextual_relation only reference existing nodes, never the node
+      itself, and every contextual_relation key is also in linked_nodes
+    - predecessor/successor follow insertion order and are mutual
+    - linked_nodes are mutual
+
+    `updated_nodes` are pending rewrites of existing nodes (e.g. from near-duplicate
+    merging); they are validated and written back together with the batch.
+
+    Returns {"counts": repair counts, "added": nodes added, "updated": existing nodes
+    that were rewritten, "changes": {node_name: {field: new value}} for those nodes}.
+    """
+    counts: Counter = Counter()
+    neighbours: Dict[str, ConversationNode] = {
+        node["node_name"]: _copy_node(node) for node in updated_nodes or []
+    }
+    originals: Dict[str, ConversationNode] = {
+        name: graph.get_node(name) for name in neighbours
+    }
+
+    def neighbour(name: str) -> ConversationNode:
+        if name not in neighbours:
+            originals[name] = graph.get_node(name)
+            neighbours[name] = _copy_node(originals[name])
+        return neighbours[name]
+
+    # 1. unique names
+    batch: List[ConversationNode] = []
+    batch_names = set()
+    for raw in new_nodes:
+        if not isinstance(raw, dict) or not raw.get("node_name"):
+            counts["dropped_unnamed"] += 1
+            continue
+        node = _copy_node(raw)
+        name = node["node_name"]
+        if name in graph and _is_bookmark(node) and _is_bookmark(graph.get_node(name)):
+            existing = neighbour(name)
+            for linked_name in node["linked_nodes"]:
+                if linked_name not in existing["linked_nodes"]:
+                    existing["linked_nodes"].append(linked_name)
+            existing["contextual_relation"].update(node["contextual_relation"])
+            if node.get("summary"):
+                existing["summary"] = node["summary"]
+            if node.get("is_contextual_progress"):
+                existing["is_contextual_progress"] = True
+            counts["merged_bookmarks"] += 1
+            continue
+        if name in graph or name in batch_names:
+            suffix = 2
+            while f"{name} ({suffix})" in graph or f"{name} ({suffix})" in batch_names:
+                suffix += 1
+            node["node_name"] = f"{name} ({suffix})"
+            counts["renamed_duplicates"] += 1
+        batch_names.add(node["node_name"])
+        batch.append(node)
+
+    by_name = {node["node_name"]: node for node in batch}
+
+    def exists(name) -> bool:
+        return isinstance(name, str) and (name in by_name or name in graph)
+
+    # 2. dangling and self references
+    for node in list(batch) + list(neighbours.values()):
+        name = node["node_name"]
+        relation = {k: v for k, v in node["contextual_relation"].items() if exists(k) and k != name}
+        counts["dropped_relations"] += len(node["contextual_relation"]) - len(relation)
+        node["contextual_relation"] = relation
+
+        original = set(node["linked_nodes"])
+        linked = []
+        for linked_name in node["linked_nodes"] + list(relation):
+            if linked_name in linked:
+                continue
+            if linked_name == name or not exists(linked_name):
+                counts["dropped_links"] += 1
+                continue
+            linked.append(linked_name)
+        counts["added_relation_links"] += sum(1 for n in linked if n not in original)
+        node["linked_nodes"] = linked
+
+    # 3. temporal chain in insertion order
+    tail = graph.last_node()
+    previous = tail.get("node_name") if tail else None
+    for node in batch:
+        if node.get("predecessor") != previous:
+            node["predecessor"] = previous
+            counts["fixed_predecessors"] += 1
+        if previous is not None:
+            previous_node = by_name.get(previous) or neighbour(previous)
+            if previous_node.get("successor") != node["node_name"]:
+                previous_node["successor"] = node["node_name"]
+                counts["fixed_successors"] += 1
+        previous = node["node_name"]
+    if batch and batch[-1].get("successor") is not None:
+        batch[-1]["successor"] = None
+        counts["fixed_successors"] += 1
+
+    # 4. mutual links
+    for node in list(batch) + list(neighbours.values()):
+        for linked_name in node["linked_nodes"]:
+            other = by_name.get(linked_name) or neighbour(linked_name)
+            if node["node_name"] not in other["linked_nodes"]:
+                other["linked_nodes"].append(node["node_name"])
+                counts["mutual_links"] += 1
+
+    graph.add_nodes(batch)
+    changes: Dict[str, dict] = {}
+    for name, node in neighbours.items():
+        graph.update_node(node)
+        original = originals[name] or {}
+        changed = {k: v for k, v in node.items() if original.get(k) != v}
+        if changed:
+            changes[name] = changed
+
+    counts = {k: v for k, v in counts.items() if v}
+    if counts:
+        print(f"[INFO]: Graph repair on {len(batch)} new nodes: {counts}")
+    return {"counts": counts, "added": batch, "updated": list(neighbours.values()), "changes": changes}
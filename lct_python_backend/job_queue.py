@@ -0,0 +1,289 @@
+import asyncio
+import json
+import os
+import sqlite3
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional
+
+# jobs and their results survive restarts here
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# queued (not yet running) jobs across all users
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_USER_CONCURRENCY = int(os.getenv("JOB_USER_CONCURRENCY", "2"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    user_uid    TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    progress    TEXT,
+    result      TEXT,
+    error       TEXT,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+# handler(payload, report_progress) -> JSON-serializable result
+JobHandler = Callable[[dict, Callable[[Any], None]], Awaitable[Any]]
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(JOB_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _execute(query: str, params: tuple = ()) -> None:
+    with _connect() as conn:
+        conn.execute(query, params)
+
+
+def _fetch_one(query: str, params: tuple = ()) -> Optional[dict]:
+    with _connect() as conn:
+        row = conn.execute(query, params).fetchone()
+    return dict(row) if row is not None else None
+
+
+class JobQueue:
+    """
+    In-process job queue backed by SQLite.
+
+    Jobs wait in per-user FIFO queues; workers take them round-robin across users, never
+    running more than `user_concurrency` jobs of one user at a time. At most `max_queued`
+    jobs may be waiting. Every state change is persisted, and on start-up jobs that were
+    queued or running when the process stopped are queued again. Database calls run in
+    worker threads (asyncio.to_thread), off the event loop; progress reports are kept in
+    memory and stored with the job's final state.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE,
+                 user_concurrency: int = JOB_USER_CONCURRENCY):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.user_concurrency = user_concurrency
+        self.handlers: Dict[str, JobHandler] = {}
+        # user_uid -> queued job ids; ordered so users are served round-robin
+        self.pending: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self.running: Dict[str, asyncio.Task] = {}
+        self.running_by_user: Dict[str, int] = {}
+        self.job_users: Dict[str, str] = {}
+        # jobs the user cancelled after they left the pending queues
+        self.cancel_requested = set()
+        # job_id -> latest progress of a running job
+        self.progress: Dict[str, Any] = {}
+        self.condition: Optional[asyncio.Condition] = None
+        self.worker_tasks = []
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    # lifecycle
+
+    @staticmethod
+    def _recover() -> list:
+        with _connect() as conn:
+            conn.executescript(_SCHEMA)
+            resumed = conn.execute(
+                "SELECT id, user_uid FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING),
+            ).fetchall()
+            conn.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+        return resumed
+
+    async def start(self) -> None:
+        resumed = await asyncio.to_thread(self._recover)
+        self.condition = asyncio.Condition()
+        for row in resumed:
+            self._enqueue(row["id"], row["user_uid"])
+        self.worker_tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"[INFO] Job queue started with {self.workers} workers, {len(resumed)} jobs resumed")
+
+    async def stop(self) -> None:
+        """
+        Stop the workers; interrupted jobs stay `running` in the database and are
+        picked up again on the next start
+        """
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        self.worker_tasks = []
+
+    # submission and control
+
+    def _queued_count(self) -> int:
+        return sum(len(queue) for queue in self.pending.values())
+
+    def _enqueue(self, job_id: str, user_uid: str) -> None:
+        self.pending.setdefault(user_uid, deque()).append(job_id)
+        self.job_users[job_id] = user_uid
+
+    async def submit(self, user_uid: str, kind: str, payload: dict) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queued_count() >= self.max_queued:
+            raise QueueFullError(f"Job queue is full ({self.max_queued} jobs waiting)")
+        job_id = str(uuid.uuid4())
+        await asyncio.to_thread(
+            _execute,
+            "INSERT INTO jobs (id, user_uid, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, user_uid, kind, QUEUED, json.dumps(payload), _now()),
+        )
+        async with self.condition:
+            self._enqueue(job_id, user_uid)
+            self.condition.notify()
+        return job_id
+
+    async def get(self, job_id: str, user_uid: str, with_result: bool = False) -> Optional[dict]:
+        """
+        Job record if it belongs to the user
+        """
+        columns = "id, kind, status, progress, error, created_at, started_at, finished_at"
+        if with_result:
+            columns += ", result"
+        job = await asyncio.to_thread(
+            _fetch_one, f"SELECT {columns} FROM jobs WHERE id = ? AND user_uid = ?", (job_id, user_uid)
+        )
+        if job is None:
+            return None
+        if job_id in self.progress:
+            job["progress"] = self.progress[job_id]
+        else:
+            job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        if with_result:
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    async def cancel(self, job_id: str, user_uid: str) -> Optional[str]:
+        """
+        Cancel a queued or running job. Returns its resulting status, None if not found.
+        """
+        job = await self.get(job_id, user_uid)
+        if job is None:
+            return None
+        if job["status"] in FINISHED_STATES:
+            return job["status"]
+        async with self.condition:
+            queue = self.pending.get(user_uid)
+            if queue and job_id in queue:
+                queue.remove(job_id)
+                self.job_users.pop(job_id, None)
+                await self._set_status(job_id, CANCELLED, finished_at=_now())
+                return CANCELLED
+        self.cancel_requested.add(job_id)
+        task = self.running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return CANCELLED
+
+    # workers
+
+    async def _set_status(self, job_id: str, status: str, **fields) -> None:
+        assignments = ", ".join(["status = ?"] + [f"{name} = ?" for name in fields])
+        await asyncio.to_thread(
+            _execute, f"UPDATE jobs SET {assignments} WHERE id = ?", (status, *fields.values(), job_id)
+        )
+
+    def _next_job(self) -> Optional[str]:
+        for user_uid in list(self.pending):
+            queue = self.pending[user_uid]
+            if not queue:
+                del self.pending[user_uid]
+                continue
+            if self.running_by_user.get(user_uid, 0) >= self.user_concurrency:
+                continue
+            job_id = queue.popleft()
+            # this user goes to the back of the round-robin order
+            self.pending.move_to_end(user_uid)
+            if not queue:
+                del self.pending[user_uid]
+            self.running_by_user[user_uid] = self.running_by_user.get(user_uid, 0) + 1
+            return job_id
+        return None
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            async with self.condition:
+                job_id = self._next_job()
+                while job_id is None:
+                    await self.condition.wait()
+                    job_id = self._next_job()
+            user_uid = self.job_users.pop(job_id)
+            try:
+                await self._run(job_id)
+            finally:
+                async with self.condition:
+                    self.running_by_user[user_uid] -= 1
+                    self.condition.notify_all()
+
+    async def _run(self, job_id: str) -> None:
+        if job_id in self.cancel_requested:
+            self.cancel_requested.discard(job_id)
+            await self._set_status(job_id, CANCELLED, finished_at=_now())
+            return
+        row = await asyncio.to_thread(_fetch_one, "SELECT kind, payload FROM jobs WHERE id = ?", (job_id,))
+        await self._set_status(job_id, RUNNING, started_at=_now())
+
+        def report_progress(progress: Any) -> None:
+            # called from handlers on the event loop and from their threads alike
+            self.progress[job_id] = progress
+
+        task = asyncio.create_task(self.handlers[row["kind"]](json.loads(row["payload"]), report_progress))
+        self.running[job_id] = task
+        if job_id in self.cancel_requested:
+            # cancelled while the job was being started, when there was no task to cancel yet
+            task.cancel()
+        try:
+            result = await task
+            await self._set_status(job_id, SUCCEEDED, result=json.dumps(result), finished_at=_now(),
+                                   progress=self._final_progress(job_id))
+            print(f"[INFO] Job {job_id} ({row['kind']}) succeeded")
+        except asyncio.CancelledError:
+            if job_id not in self.cancel_requested:
+                # the worker itself is being stopped; leave the job to be resumed
+                raise
+            await self._set_status(job_id, CANCELLED, finished_at=_now(), progress=self._final_progress(job_id))
+            print(f"[INFO] Job {job_id} ({row['kind']}) cancelled")
+        except Exception as e:
+            await self._set_status(job_id, FAILED, error=str(e), finished_at=_now(),
+                                   progress=self._final_progress(job_id))
+            print(f"[ERROR] Job {job_id} ({row['kind']}) failed: {e}")
+        finally:
+            self.running.pop(job_id, None)
+            self.cancel_requested.discard(job_id)
+            self.progress.pop(job_id, None)
+
+    def _final_progress(self, job_id: str) -> Optional[str]:
+        progress = self.progress.get(job_id)
+        return json.dumps(progress) if progress is not None else None
+
+
+job_queue = JobQueue()
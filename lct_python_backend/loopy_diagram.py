@@ -0,0 +1,255 @@
+import json
+import math
+import urllib.parse
+from typing import Any, Dict, List, Tuple
+
+# LOOPY canvas the layout is fitted into
+CANVAS_WIDTH = 800
+CANVAS_HEIGHT = 600
+MARGIN = 80
+MAX_LABEL_LENGTH = 40
+# text labels go in rows across the bottom margin, in as many columns as needed
+LABEL_LINE_HEIGHT = 20
+# arc for one edge of a two-way pair, so the pair doesn't draw on top of itself
+REVERSE_EDGE_ARC = 40
+
+# characters LOOPY reads back unescaped; everything else is percent-encoded
+_URL_SAFE = "[],:-."
+
+
+def strip_code_fences(text: str) -> str:
+    """
+    Model reply without a surrounding ``` / ```json fence
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1:] if newline >= 0 else text.lstrip("`")
+        end = text.rfind("```")
+        if end >= 0:
+            text = text[:end]
+    return text.strip()
+
+
+def parse_loopy(raw: Any) -> Any:
+    """
+    LOOPY structure from a model response: a parsed list as-is, otherwise the JSON array
+    at the start of the text (trailing commentary and code fences are ignored)
+    """
+    if not isinstance(raw, str):
+        return raw
+    text = strip_code_fences(raw)
+    start = text.find("[")
+    if start < 0:
+        raise ValueError("No LOOPY array in model output")
+    data, _ = json.JSONDecoder().raw_decode(text[start:])
+    return data
+
+
+def parse_loopy_reply(reply: str, prefill: str = "[") -> list:
+    """
+    LOOPY structure from a reply that continues the assistant `prefill`. Models
+    sometimes fence the continuation or start the structure over, so the fence is
+    stripped before the prefill is put back, and the reply is read on its own if
+    that doesn't give a [nodes, edges, ...] list.
+    """
+    text = strip_code_fences(reply)
+    for candidate in (prefill + text, text):
+        try:
+            data = parse_loopy(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, list) and len(data) >= 2:
+            return data
+    raise ValueError("No LOOPY structure in model output")
+
+
+def _number(value, default=0.0) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return number if math.isfinite(number) else default
+
+
+def strongly_connected_components(n: int, edges: List[Tuple[int, int]]) -> List[List[int]]:
+    """
+    Tarjan's algorithm, iterative; components come out in reverse topological order
+    """
+    adjacency: List[List[int]] = [[] for _ in range(n)]
+    for source, target in edges:
+        adjacency[source].append(target)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            recurse = False
+            for j in range(i, len(adjacency[v])):
+                w = adjacency[v][j]
+                if index[w] < 0:
+                    work.append((v, j + 1))
+                    work.append((w, 0))
+                    recurse = True
+                    break
+                if on_stack[w]:
+                    low[v] = min(low[v], index[w])
+            if recurse:
+                continue
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(sorted(component))
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+    return components
+
+
+def _layout(n: int, components: List[List[int]]) -> List[Tuple[int, int]]:
+    """
+    Deterministic layout: each component gets a grid cell, loops are drawn as circles
+    """
+    positions = [(0, 0)] * n
+    columns = max(1, math.ceil(math.sqrt(len(components))))
+    rows = max(1, math.ceil(len(components) / columns))
+    cell_width = (CANVAS_WIDTH - 2 * MARGIN) / columns
+    cell_height = (CANVAS_HEIGHT - 2 * MARGIN) / rows
+    for cell, component in enumerate(components):
+        cx = MARGIN + (cell % columns + 0.5) * cell_width
+        cy = MARGIN + (cell // columns + 0.5) * cell_height
+        radius = 0.35 * min(cell_width, cell_height) if len(component) > 1 else 0
+        for k, v in enumerate(component):
+            angle = 2 * math.pi * k / len(component) - math.pi / 2
+            positions[v] = (round(cx + radius * math.cos(angle)), round(cy + radius * math.sin(angle)))
+    return positions
+
+
+def _label_positions(count: int) -> List[Tuple[int, int]]:
+    """
+    Label anchors in the bottom margin, clear of the node grid and inside the canvas:
+    filled row by row, with more columns once the rows are used up
+    """
+    rows = max(1, MARGIN // LABEL_LINE_HEIGHT)
+    columns = max(1, math.ceil(count / rows))
+    column_width = CANVAS_WIDTH / columns
+    return [
+        (round((i % columns + 0.5) * column_width),
+         round(CANVAS_HEIGHT - MARGIN + (i // columns + 0.5) * LABEL_LINE_HEIGHT))
+        for i in range(count)
+    ]
+
+
+def normalize_loopy(data: Any) -> Tuple[list, Dict[str, Any]]:
+    """
+    Validate and repair a LOOPY [nodes, edges, labels, meta] structure.
+
+    Malformed entries, edges to unknown nodes, duplicate edges and isolated nodes are
+    dropped; node ids are renumbered from 0, strengths snapped to +-1, colours kept in
+    range, coordinates laid out again and meta recomputed. Returns (structure, report);
+    report["loops"] is the number of feedback loops (non-trivial SCCs or self edges).
+    """
+    if not isinstance(data, list) or len(data) < 2:
+        raise ValueError("LOOPY data must be a list of [nodes, edges, labels, meta]")
+    raw_nodes = data[0] if isinstance(data[0], list) else []
+    raw_edges = data[1] if isinstance(data[1], list) else []
+    raw_labels = data[2] if len(data) > 2 and isinstance(data[2], list) else []
+    report: Dict[str, Any] = {"dropped_nodes": 0, "dropped_edges": 0, "dropped_labels": 0}
+
+    nodes: Dict[Any, dict] = {}
+    for node in raw_nodes:
+        if not isinstance(node, list) or len(node) < 5 or node[0] in nodes:
+            report["dropped_nodes"] += 1
+            continue
+        nodes[node[0]] = {
+            "init": min(1.0, max(0.0, _number(node[3], 1.0))),
+            "label": str(node[4]).strip()[:MAX_LABEL_LENGTH] or "?",
+            "color": int(_number(node[5] if len(node) > 5 else 0)),
+        }
+
+    edges: Dict[Tuple[Any, Any], dict] = {}
+    for edge in raw_edges:
+        if (not isinstance(edge, list) or len(edge) < 2
+                or edge[0] not in nodes or edge[1] not in nodes or (edge[0], edge[1]) in edges):
+            report["dropped_edges"] += 1
+            continue
+        strength = _number(edge[3] if len(edge) > 3 else 1.0, 1.0)
+        edges[(edge[0], edge[1])] = {
+            "arc": int(_number(edge[2] if len(edge) > 2 else 0)),
+            "strength": -1 if strength < 0 else 1,
+        }
+
+    connected = {key for pair in edges for key in pair}
+    report["dropped_nodes"] += sum(1 for key in nodes if key not in connected)
+    ids = {key: i for i, key in enumerate(k for k in nodes if k in connected)}
+    n = len(ids)
+    pairs = [(ids[source], ids[target]) for source, target in edges]
+
+    components = strongly_connected_components(n, pairs)
+    self_loops = {s for s, t in pairs if s == t}
+    report["loops"] = sum(1 for c in components if len(c) > 1 or c[0] in self_loops)
+    # loops first, biggest first, so they get the first grid cells
+    components.sort(key=lambda c: (-len(c), c[0]))
+    positions = _layout(n, components)
+
+    n_colors = max(1, int(n / 1.5))
+    out_nodes = []
+    for key, i in ids.items():
+        node = nodes[key]
+        x, y = positions[i]
+        out_nodes.append([i, x, y, node["init"], node["label"], node["color"] % n_colors])
+
+    out_edges = []
+    for (source, target), edge in edges.items():
+        arc = edge["arc"]
+        if arc == 0 and source != target and (target, source) in edges:
+            arc = REVERSE_EDGE_ARC
+        out_edges.append([ids[source], ids[target], arc, edge["strength"], 0])
+
+    texts = []
+    for label in raw_labels:
+        if not isinstance(label, list) or len(label) < 3 or not str(label[2]).strip():
+            report["dropped_labels"] += 1
+            continue
+        texts.append(str(label[2]).strip())
+    out_labels = [[x, y, text] for (x, y), text in zip(_label_positions(len(texts)), texts)]
+
+    meta = len(out_nodes) + len(out_labels) + 2
+    report.update(nodes=len(out_nodes), edges=len(out_edges), meta=meta)
+    return [out_nodes, out_edges, out_labels, meta], report
+
+
+def encode_loopy_url(data: list, base_url: str = "https://ncase.me/loopy/v1.1/") -> str:
+    """
+    Compact LOOPY link: no JSON whitespace, integral floats written as ints, and only the
+    characters LOOPY needs escaped are percent-encoded. The final "]" is escaped the
+    way LOOPY's own export does, so link shorteners and chat apps don't drop it.
+    """
+    def compact(value):
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, list):
+            return [compact(v) for v in value]
+        return value
+
+    encoded = urllib.parse.quote(json.dumps(compact(data), separators=(",", ":")), safe=_URL_SAFE)
+    if encoded.endswith("]"):
+        encoded = encoded[:-1] + "%5D"
+    return f"{base_url}?data={encoded}"
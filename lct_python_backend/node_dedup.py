@@ -0,0 +1,173 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from lct_python_backend.conversation_graph import ConversationNode
+
+NUM_PERM = 100
+BANDS = 25
+ROWS = NUM_PERM // BANDS
+JACCARD_THRESHOLD = 0.5
+# a node is only merged into nodes from this many preceding chunks: overlapping chunks
+# re-emit the discussion at their boundary, while a similar node further away is the
+# conversation coming back to a topic and stays a node of its own
+CHUNK_WINDOW = 1
+
+# multiply-shift hash family over 64-bit shingle hashes (uint64 arithmetic wraps)
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+_EMPTY = np.iinfo(np.uint64).max
+
+_STOPWORDS = frozenset(
+    "the and for with that this from about into their they them then than are was were "
+    "has have had not but its also which what when where while how who can could would "
+    "should will discuss discusses discussed discussion conversation talk talks".split()
+)
+
+
+def node_shingles(node: ConversationNode) -> Set[str]:
+    """
+    Content words of the node name and summary
+    """
+    text = f"{node.get('node_name') or ''} {node.get('summary') or ''}".lower()
+    return {w for w in re.findall(r"\w+", text) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def minhash_signature(shingles: Set[str]) -> np.ndarray:
+    if not shingles:
+        return np.full(NUM_PERM, _EMPTY, dtype=np.uint64)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+         for s in shingles),
+        dtype=np.uint64, count=len(shingles))
+    return ((hashes[None, :] * _PERM_A[:, None] + _PERM_B[:, None]) >> _SHIFT).min(axis=1)
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index over the nodes of one conversation.
+
+    Each node is hashed into BANDS buckets; only nodes sharing a bucket are compared with
+    exact Jaccard similarity, so a lookup costs O(bucket size) rather than O(graph size).
+    Chunks are numbered in the order their nodes are added; matches are limited to the
+    `chunk_window` chunks before the node's own.
+    """
+
+    def __init__(self, threshold: float = JACCARD_THRESHOLD, chunk_window: int = CHUNK_WINDOW):
+        self.threshold = threshold
+        self.chunk_window = chunk_window
+        self.buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self.shingles: Dict[str, Set[str]] = {}
+        self.chunks: Dict[str, Optional[str]] = {}
+        self.chunk_positions: Dict[Optional[str], int] = {}
+
+    def _chunk_position(self, chunk_id: Optional[str]) -> int:
+        # a chunk with no nodes indexed yet is the one being processed, after all others
+        return self.chunk_positions.get(chunk_id, len(self.chunk_positions))
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        bands = signature.reshape(BANDS, ROWS)
+        return [(i, bands[i].tobytes()) for i in range(BANDS)]
+
+    def add(self, node: ConversationNode) -> None:
+        name = node.get("node_name")
+        if not name or name in self.shingles:
+            return
+        shingles = node_shingles(node)
+        self.shingles[name] = shingles
+        self.chunks[name] = node.get("chunk_id")
+        self.chunk_positions.setdefault(node.get("chunk_id"), len(self.chunk_positions))
+        if not shingles:
+            return
+        for key in self._band_keys(minhash_signature(shingles)):
+            self.buckets.setdefault(key, []).append(name)
+
+    def find_duplicate(self, node: ConversationNode) -> Optional[str]:
+        """
+        Best matching indexed node from one of the preceding `chunk_window` chunks, if it
+        is similar enough
+        """
+        shingles = node_shingles(node)
+        if not shingles:
+            return None
+        candidates: Set[str] = set()
+        for key in self._band_keys(minhash_signature(shingles)):
+            candidates.update(self.buckets.get(key, ()))
+
+        position = self._chunk_position(node.get("chunk_id"))
+        best, best_score = None, self.threshold
+        for name in candidates:
+            if not 0 < position - self.chunk_positions[self.chunks[name]] <= self.chunk_window:
+                continue
+            score = jaccard(shingles, self.shingles[name])
+            if score >= best_score:
+                best, best_score = name, score
+        return best
+
+
+def merge_near_duplicates(
+    graph, index: NearDuplicateIndex, new_nodes: List[ConversationNode]
+) -> Tuple[List[ConversationNode], List[ConversationNode]]:
+    """
+    Fold new nodes that near-duplicate an existing node from a preceding chunk (see
+    NearDuplicateIndex) into it.
+
+    Returns (remaining new nodes with references rewritten to the surviving names,
+    existing nodes that absorbed a duplicate). Nothing is written to the graph; both lists
+    are meant to go through repair_and_add_nodes.
+    """
+    renames: Dict[str, str] = {}
+    merged: Dict[str, ConversationNode] = {}
+    remaining: List[ConversationNode] = []
+
+    for node in new_nodes:
+        name = node.get("node_name") if isinstance(node, dict) else None
+        target = index.find_duplicate(node) if name and name not in graph else None
+        if target is None:
+            remaining.append(node)
+            continue
+        renames[name] = target
+        if target not in merged:
+            existing = graph.get_node(target)
+            merged[target] = dict(existing,
+                                  linked_nodes=list(existing.get("linked_nodes") or []),
+                                  contextual_relation=dict(existing.get("contextual_relation") or {}))
+        survivor = merged[target]
+        for linked_name in node.get("linked_nodes") or []:
+            if linked_name not in survivor["linked_nodes"]:
+                survivor["linked_nodes"].append(linked_name)
+        for key, value in (node.get("contextual_relation") or {}).items():
+            survivor["contextual_relation"].setdefault(key, value)
+        if len(node.get("summary") or "") > len(survivor.get("summary") or ""):
+            survivor["summary"] = node["summary"]
+        survivor["is_bookmark"] = bool(survivor.get("is_bookmark") or node.get("is_bookmark"))
+        survivor["is_contextual_progress"] = bool(
+            survivor.get("is_contextual_progress") or node.get("is_contextual_progress"))
+
+    if renames:
+        print(f"[INFO]: Merged {len(renames)} near-duplicate nodes: {renames}")
+        for node in remaining + list(merged.values()):
+            _rewrite_references(node, renames)
+    return remaining, list(merged.values())
+
+
+def _rewrite_references(node: ConversationNode, renames: Dict[str, str]) -> None:
+    for key in ("predecessor", "successor"):
+        if node.get(key) in renames:
+            node[key] = renames[node[key]]
+    if node.get("linked_nodes"):
+        node["linked_nodes"] = list(dict.fromkeys(renames.get(n, n) for n in node["linked_nodes"]))
+    if node.get("contextual_relation"):
+        node["contextual_relation"] = {
+            renames.get(k, k): v for k, v in node["contextual_relation"].items()
+        }
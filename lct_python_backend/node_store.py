@@ -0,0 +1,212 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from lct_python_backend.conversation_graph import ConversationNode
+
+NO_ID = -1
+
+FLAG_BOOKMARK = 1
+FLAG_CONTEXTUAL_PROGRESS = 2
+
+# keys that have a dedicated slot; anything else the LLM emits is kept in `extra`
+_KNOWN_KEYS = frozenset({
+    "node_name", "type", "predecessor", "successor", "contextual_relation",
+    "linked_nodes", "chunk_id", "is_bookmark", "is_contextual_progress", "summary",
+})
+
+
+class CompactNode:
+    """
+    Slotted node record. Node names and chunk ids are stored as integer ids into the
+    owning CompactNodeStore's intern tables.
+    """
+    __slots__ = (
+        "name", "type", "predecessor", "successor", "relations",
+        "linked", "chunk", "flags", "summary", "extra",
+    )
+
+    def __init__(self, name: int, type: Optional[str], predecessor: int, successor: int,
+                 relations: Tuple[Tuple[int, str], ...], linked: array, chunk: int,
+                 flags: int, summary: Optional[str], extra: Optional[Dict[str, Any]]):
+        self.name = name
+        self.type = type
+        self.predecessor = predecessor
+        self.successor = successor
+        self.relations = relations
+        self.linked = linked
+        self.chunk = chunk
+        self.flags = flags
+        self.summary = summary
+        self.extra = extra
+
+
+class CompactNodeStore:
+    """
+    Memory-compact node storage for long-running sessions.
+
+    Node names are interned once and every edge (predecessor, successor, linked_nodes,
+    contextual_relation keys) is an integer id. Nodes are converted back to the JSON
+    wire format only when they leave the store (prompt building, websocket sends, saves).
+    Exposes the same read API as ConversationGraph.
+    """
+
+    def __init__(self, nodes: Optional[List[ConversationNode]] = None):
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._chunks: List[str] = []
+        self._chunk_ids: Dict[str, int] = {}
+        self._records: List[CompactNode] = []
+        # name id -> index of the first record with that name
+        self._record_index: Dict[int, int] = {}
+        # chunk id -> record indexes
+        self._chunk_records: Dict[int, array] = {}
+        if nodes:
+            self.add_nodes(nodes)
+
+    # interning
+
+    def _name_id(self, name: Optional[str]) -> int:
+        if name is None:
+            return NO_ID
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            name = sys.intern(name)
+            self._names.append(name)
+            self._name_ids[name] = name_id
+        return name_id
+
+    def _chunk_id(self, chunk_id: Optional[str]) -> int:
+        if chunk_id is None:
+            return NO_ID
+        cid = self._chunk_ids.get(chunk_id)
+        if cid is None:
+            cid = len(self._chunks)
+            self._chunks.append(chunk_id)
+            self._chunk_ids[chunk_id] = cid
+        return cid
+
+    def _name(self, name_id: int) -> Optional[str]:
+        return None if name_id == NO_ID else self._names[name_id]
+
+    # conversion
+
+    def _encode(self, node: ConversationNode) -> CompactNode:
+        relations = tuple(
+            (self._name_id(key), value)
+            for key, value in (node.get("contextual_relation") or {}).items()
+        )
+        linked = array("i", (self._name_id(n) for n in node.get("linked_nodes") or []))
+        flags = 0
+        if node.get("is_bookmark"):
+            flags |= FLAG_BOOKMARK
+        if node.get("is_contextual_progress"):
+            flags |= FLAG_CONTEXTUAL_PROGRESS
+        node_type = node.get("type")
+        extra = {k: v for k, v in node.items() if k not in _KNOWN_KEYS} or None
+        return CompactNode(
+            name=self._name_id(node.get("node_name")),
+            type=sys.intern(node_type) if isinstance(node_type, str) else node_type,
+            predecessor=self._name_id(node.get("predecessor")),
+            successor=self._name_id(node.get("successor")),
+            relations=relations,
+            linked=linked,
+            chunk=self._chunk_id(node.get("chunk_id")),
+            flags=flags,
+            summary=node.get("summary"),
+            extra=extra,
+        )
+
+    def _decode(self, record: CompactNode) -> ConversationNode:
+        names = self._names
+        node: Dict[str, Any] = {
+            "node_name": self._name(record.name),
+            "type": record.type,
+            "predecessor": self._name(record.predecessor),
+            "successor": self._name(record.successor),
+            "contextual_relation": {names[k]: v for k, v in record.relations},
+            "linked_nodes": [names[i] for i in record.linked],
+            "chunk_id": None if record.chunk == NO_ID else self._chunks[record.chunk],
+            "is_bookmark": bool(record.flags & FLAG_BOOKMARK),
+            "is_contextual_progress": bool(record.flags & FLAG_CONTEXTUAL_PROGRESS),
+            "summary": record.summary,
+        }
+        if record.extra:
+            node.update(record.extra)
+        return node
+
+    # mutation
+
+    def add_nodes(self, nodes: List[ConversationNode]) -> None:
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: ConversationNode) -> None:
+        record = self._encode(node)
+        index = len(self._records)
+        self._records.append(record)
+        if record.name != NO_ID:
+            self._record_index.setdefault(record.name, index)
+        if record.chunk != NO_ID:
+            self._chunk_records.setdefault(record.chunk, array("i")).append(index)
+
+    def update_node(self, node: ConversationNode) -> None:
+        """
+        Replace the stored record with the same node_name
+        """
+        index = self._record_index[self._name_ids[node["node_name"]]]
+        old = self._records[index]
+        record = self._encode(node)
+        self._records[index] = record
+        if old.chunk != record.chunk:
+            if old.chunk != NO_ID:
+                self._chunk_records[old.chunk].remove(index)
+            if record.chunk != NO_ID:
+                self._chunk_records.setdefault(record.chunk, array("i")).append(index)
+
+    # read API (mirrors ConversationGraph)
+
+    def get_node(self, node_name: str) -> Optional[ConversationNode]:
+        index = self._record_index.get(self._name_ids.get(node_name, NO_ID))
+        if index is None:
+            return None
+        return self._decode(self._records[index])
+
+    def get_linked_nodes(self, node_name: str) -> List[Optional[ConversationNode]]:
+        index = self._record_index.get(self._name_ids.get(node_name, NO_ID))
+        if index is None:
+            return []
+        return [self.get_node(self._names[i]) for i in self._records[index].linked]
+
+    def get_chunk_nodes(self, chunk_id: str) -> List[ConversationNode]:
+        indexes = self._chunk_records.get(self._chunk_ids.get(chunk_id, NO_ID), ())
+        return [self._decode(self._records[i]) for i in indexes]
+
+    def contextual_progress_nodes(self) -> List[ConversationNode]:
+        return [self._decode(r) for r in self._records if r.flags & FLAG_CONTEXTUAL_PROGRESS]
+
+    def bookmark_nodes(self) -> List[ConversationNode]:
+        return [self._decode(r) for r in self._records if r.flags & FLAG_BOOKMARK]
+
+    def last_node(self) -> Optional[ConversationNode]:
+        return self._decode(self._records[-1]) if self._records else None
+
+    @property
+    def nodes(self) -> List[ConversationNode]:
+        """
+        All nodes in the JSON wire format; materialized on every access
+        """
+        return [self._decode(r) for r in self._records]
+
+    def to_graph_data(self) -> List[List[ConversationNode]]:
+        return [self.nodes]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[ConversationNode]:
+        return (self._decode(r) for r in self._records)
+
+    def __contains__(self, node_name: object) -> bool:
+        return self._name_ids.get(node_name, NO_ID) in self._record_index
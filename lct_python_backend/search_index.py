@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List
+
+from lct_python_backend.conversation_graph import ConversationGraph
+
+# local SQLite FTS5 index; keep it on the same disk as the app, it is rebuilt from saves
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.db")
+
+# chunk-text matches rank below direct node matches
+CHUNK_HIT_WEIGHT = 0.5
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS node_fts USING fts5(
+    node_name, summary, claims,
+    conversation_id UNINDEXED, chunk_id UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+    chunk_text,
+    conversation_id UNINDEXED, chunk_id UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS indexed_docs (
+    conversation_id TEXT NOT NULL,
+    kind            TEXT NOT NULL,
+    doc_key         TEXT NOT NULL,
+    digest          TEXT NOT NULL,
+    doc_rowid       INTEGER NOT NULL,
+    chunk_id        TEXT,
+    PRIMARY KEY (conversation_id, kind, doc_key)
+);
+CREATE INDEX IF NOT EXISTS indexed_docs_chunk ON indexed_docs (conversation_id, chunk_id);
+CREATE TABLE IF NOT EXISTS indexed_conversations (
+    conversation_id TEXT PRIMARY KEY,
+    file_name       TEXT
+);
+"""
+
+_initialized = set()
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """
+    Short-lived connection (safe to use from threadpool workers); commits on success
+    """
+    conn = sqlite3.connect(SEARCH_INDEX_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        if SEARCH_INDEX_PATH not in _initialized:
+            conn.executescript(_SCHEMA)
+            _initialized.add(SEARCH_INDEX_PATH)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _sync_docs(conn, conversation_id: str, kind: str, table: str, docs: Dict[str, tuple]) -> int:
+    """
+    Bring one document kind of a conversation in line with `docs`
+    ({doc_key: (digest, chunk_id, column values)}), touching only changed rows
+    """
+    existing = {
+        row["doc_key"]: (row["digest"], row["doc_rowid"])
+        for row in conn.execute(
+            "SELECT doc_key, digest, doc_rowid FROM indexed_docs WHERE conversation_id = ? AND kind = ?",
+            (conversation_id, kind),
+        )
+    }
+    changed = 0
+    for key, (digest, rowid) in existing.items():
+        if key not in docs or docs[key][0] != digest:
+            conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+            conn.execute(
+                "DELETE FROM indexed_docs WHERE conversation_id = ? AND kind = ? AND doc_key = ?",
+                (conversation_id, kind, key),
+            )
+            changed += 1
+
+    columns = "node_name, summary, claims" if table == "node_fts" else "chunk_text"
+    placeholders = ", ".join("?" for _ in columns.split(","))
+    for key, (digest, chunk_id, values) in docs.items():
+        if key in existing and existing[key][0] == digest:
+            continue
+        cursor = conn.execute(
+            f"INSERT INTO {table} ({columns}, conversation_id, chunk_id) VALUES ({placeholders}, ?, ?)",
+            (*values, conversation_id, chunk_id),
+        )
+        conn.execute(
+            "INSERT INTO indexed_docs (conversation_id, kind, doc_key, digest, doc_rowid, chunk_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (conversation_id, kind, key, digest, cursor.lastrowid, chunk_id),
+        )
+        changed += 1
+    return changed
+
+
+def index_conversation(conversation_id: str, file_name: str, graph_data: list, chunks: Dict[str, str]) -> None:
+    """
+    Incrementally (re)index a saved conversation: only nodes and chunks whose content
+    changed since the last save are rewritten
+    """
+    node_docs = {}
+    for node in ConversationGraph.from_graph_data(graph_data):
+        name = node.get("node_name")
+        if not name:
+            continue
+        claims = node.get("claims") or []
+        values = (name, node.get("summary") or "", "\n".join(str(c) for c in claims))
+        node_docs[name] = (_digest(values, node.get("chunk_id")), node.get("chunk_id"), values)
+    chunk_docs = {
+        chunk_id: (_digest(text), chunk_id, (text,)) for chunk_id, text in (chunks or {}).items()
+    }
+
+    with _connect() as conn:
+        changed = _sync_docs(conn, conversation_id, "node", "node_fts", node_docs)
+        changed += _sync_docs(conn, conversation_id, "chunk", "chunk_fts", chunk_docs)
+        conn.execute(
+            "INSERT INTO indexed_conversations (conversation_id, file_name) VALUES (?, ?) "
+            "ON CONFLICT (conversation_id) DO UPDATE SET file_name = excluded.file_name",
+            (conversation_id, file_name),
+        )
+    print(f"[INFO] Search index updated for {conversation_id}: {changed} documents changed")
+
+
+def conversation_file_names(conversation_ids: List[str]) -> Dict[str, str]:
+    with _connect() as conn:
+        return {
+            row["conversation_id"]: row["file_name"]
+            for row in conn.execute(
+                "SELECT conversation_id, file_name FROM indexed_conversations WHERE conversation_id IN "
+                f"({', '.join('?' for _ in conversation_ids)})",
+                list(conversation_ids),
+            )
+        }
+
+
+def _restrict(conn, conversation_ids: Iterable[str]) -> None:
+    """
+    Load the ids a query may return into the connection's temp table `allowed`
+    (a bound IN list would hit SQLite's variable limit for large accounts)
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS allowed (conversation_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM allowed")
+    conn.executemany("INSERT OR IGNORE INTO allowed (conversation_id) VALUES (?)",
+                     ((conversation_id,) for conversation_id in conversation_ids))
+
+
+def _match_expression(query: str) -> str:
+    """
+    Free text -> FTS5 expression: every term must match, the last one as a prefix
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_nodes(conversation_ids: Iterable[str], query: str, limit: int = 20) -> List[dict]:
+    """
+    Ranked node hits across the given conversations (the ones the user can access,
+    from the metadata store). Matches on node name/summary/claims rank first;
+    chunk-text matches surface the nodes of that chunk.
+    """
+    expression = _match_expression(query)
+    if not expression:
+        return []
+
+    accessible = "SELECT conversation_id FROM allowed"
+    with _connect() as conn:
+        _restrict(conn, conversation_ids)
+        node_rows = conn.execute(
+            f"""
+            SELECT conversation_id, node_name, chunk_id,
+                   bm25(node_fts, 10.0, 4.0, 2.0) AS score,
+                   snippet(node_fts, -1, '[', ']', '…', 12) AS snippet
+            FROM node_fts
+            WHERE node_fts MATCH :q AND conversation_id IN ({accessible})
+            ORDER BY score LIMIT :limit
+            """,
+            {"q": expression, "limit": limit},
+        ).fetchall()
+        chunk_rows = conn.execute(
+            f"""
+            SELECT c.conversation_id, d.doc_key AS node_name, c.chunk_id,
+                   bm25(chunk_fts) * {CHUNK_HIT_WEIGHT} AS score,
+                   snippet(chunk_fts, 0, '[', ']', '…', 12) AS snippet
+            FROM chunk_fts AS c
+            JOIN indexed_docs AS d
+              ON d.conversation_id = c.conversation_id AND d.chunk_id = c.chunk_id AND d.kind = 'node'
+            WHERE chunk_fts MATCH :q AND c.conversation_id IN ({accessible})
+            ORDER BY score LIMIT :limit
+            """,
+            {"q": expression, "limit": limit},
+        ).fetchall()
+
+        # bm25 is lower-is-better; keep each node's best hit
+        best: Dict[tuple, dict] = {}
+        for row in list(node_rows) + list(chunk_rows):
+            key = (row["conversation_id"], row["node_name"])
+            if key not in best or row["score"] < best[key]["score"]:
+                best[key] = {
+                    "conversation_id": row["conversation_id"],
+                    "node_name": row["node_name"],
+                    "chunk_id": row["chunk_id"],
+                    "snippet": row["snippet"],
+                    "score": row["score"],
+                }
+
+        conversation_ids = list({conversation_id for conversation_id, _ in best})
+        file_names = {
+            row["conversation_id"]: row["file_name"]
+            for row in conn.execute(
+                "SELECT conversation_id, file_name FROM indexed_conversations WHERE conversation_id IN "
+                f"({', '.join('?' for _ in conversation_ids)})",
+                conversation_ids,
+            )
+        }
+
+    hits = sorted(best.values(), key=lambda hit: hit["score"])[:limit]
+    for hit in hits:
+        hit["score"] = -hit["score"]
+        hit["file_name"] = file_names.get(hit["conversation_id"])
+    return hits
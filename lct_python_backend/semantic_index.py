@@ -0,0 +1,295 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from lct_python_backend.conversation_graph import ConversationGraph, ConversationNode
+from lct_python_backend.node_dedup import node_shingles
+
+# node vectors are persisted here and loaded into memory on first use
+SEMANTIC_INDEX_PATH = os.getenv("SEMANTIC_INDEX_PATH", "semantic_index.db")
+
+# signed feature hashing folds the TF-IDF vector into this many dimensions
+VECTOR_DIM = 256
+# document frequencies are counted over this many hash buckets
+DF_BUCKETS = 1 << 20
+MIN_SIMILARITY = 0.2
+# most rows scored per query; candidates come from the query's rarest terms first
+MAX_CANDIDATES = 4096
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_vectors (
+    conversation_id TEXT NOT NULL,
+    node_name       TEXT NOT NULL,
+    summary         TEXT,
+    digest          TEXT NOT NULL,
+    terms           TEXT NOT NULL,
+    vector          BLOB NOT NULL,
+    PRIMARY KEY (conversation_id, node_name)
+);
+"""
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(SEMANTIC_INDEX_PATH)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.executescript(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+@lru_cache(maxsize=200_000)
+def _term_hash(term: str) -> Tuple[int, int, float]:
+    """
+    (df bucket, vector dimension, sign) for a term
+    """
+    h = int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+    return h % DF_BUCKETS, (h >> 20) % VECTOR_DIM, 1.0 if (h >> 63) & 1 else -1.0
+
+
+def _node_text(node: ConversationNode) -> str:
+    return f"{node.get('node_name') or ''} {node.get('summary') or ''}"
+
+
+class SemanticIndex:
+    """
+    In-memory hashed TF-IDF index over the node summaries of every saved conversation.
+
+    Each node is a unit-length VECTOR_DIM float32 row in one contiguous matrix. A term
+    posting list (term bucket -> rows) picks at most MAX_CANDIDATES rows that share the
+    query's rarest terms, and only those rows are scored, so query cost is bounded by
+    MAX_CANDIDATES rather than by the corpus size. IDF weights are taken from the corpus
+    at the time a node is indexed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.matrix = np.zeros((1024, VECTOR_DIM), dtype=np.float32)
+        # row -> conversation number (-1 for a free row)
+        self.row_conversation = np.full(1024, -1, dtype=np.int32)
+        self.rows: Dict[Tuple[str, str], int] = {}
+        self.row_keys: Dict[int, Tuple[str, str]] = {}
+        self.row_buckets: Dict[int, Tuple[int, ...]] = {}
+        self.summaries: Dict[int, Optional[str]] = {}
+        self.free_rows: List[int] = []
+        self.size = 0
+        self.conversation_numbers: Dict[str, int] = {}
+        self.document_frequency = np.zeros(DF_BUCKETS, dtype=np.int32)
+        self.document_count = 0
+        self.postings: Dict[int, Set[int]] = {}
+
+    # vectors
+
+    def _conversation_number(self, conversation_id: str) -> int:
+        return self.conversation_numbers.setdefault(conversation_id, len(self.conversation_numbers))
+
+    def _count_terms(self, terms: Set[str], delta: int) -> None:
+        for term in terms:
+            self.document_frequency[_term_hash(term)[0]] += delta
+        self.document_count += delta
+
+    def vectorize(self, terms: Set[str]) -> np.ndarray:
+        vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+        n = self.document_count
+        for term in terms:
+            bucket, dim, sign = _term_hash(term)
+            vector[dim] += sign * (math.log((1 + n) / (1 + self.document_frequency[bucket])) + 1.0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    # rows
+
+    def _allocate_row(self) -> int:
+        if self.free_rows:
+            return self.free_rows.pop()
+        if self.size == len(self.matrix):
+            capacity = len(self.matrix) * 2
+            self.matrix = np.resize(self.matrix, (capacity, VECTOR_DIM))
+            self.matrix[self.size:] = 0
+            self.row_conversation = np.concatenate(
+                [self.row_conversation, np.full(capacity - self.size, -1, dtype=np.int32)])
+        self.size += 1
+        return self.size - 1
+
+    def _set_row(self, conversation_id: str, node_name: str, summary: Optional[str],
+                 terms: Set[str], vector: np.ndarray) -> None:
+        self._drop_row(conversation_id, node_name)
+        key = (conversation_id, node_name)
+        row = self._allocate_row()
+        self.rows[key] = row
+        self.row_keys[row] = key
+        self.matrix[row] = vector
+        self.row_conversation[row] = self._conversation_number(conversation_id)
+        self.summaries[row] = summary
+        self.row_buckets[row] = tuple({_term_hash(term)[0] for term in terms})
+        for bucket in self.row_buckets[row]:
+            self.postings.setdefault(bucket, set()).add(row)
+
+    def _drop_row(self, conversation_id: str, node_name: str) -> None:
+        row = self.rows.pop((conversation_id, node_name), None)
+        if row is None:
+            return
+        del self.row_keys[row]
+        for bucket in self.row_buckets.pop(row):
+            self.postings[bucket].discard(row)
+        self.summaries.pop(row, None)
+        self.matrix[row] = 0
+        self.row_conversation[row] = -1
+        self.free_rows.append(row)
+
+    def _candidate_rows(self, buckets: Tuple[int, ...], allowed: np.ndarray) -> np.ndarray:
+        """
+        Allowed rows sharing a term with the query, rarest terms first, capped at
+        MAX_CANDIDATES
+        """
+        candidates: Set[int] = set()
+        for bucket in sorted(buckets, key=lambda b: self.document_frequency[b]):
+            posting = self.postings.get(bucket)
+            if not posting:
+                continue
+            # very common terms are only sampled, they add little to the ranking
+            count = min(len(posting), 4 * MAX_CANDIDATES)
+            rows = np.fromiter(islice(posting, count), dtype=np.int64, count=count)
+            rows = rows[allowed[self.row_conversation[rows]]]
+            candidates.update(rows[:MAX_CANDIDATES - len(candidates)].tolist())
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+    # persistence
+
+    def load(self) -> None:
+        """
+        Load every persisted vector; called lazily under the lock
+        """
+        if self.loaded:
+            return
+        with _connect() as conn:
+            for row in conn.execute(
+                "SELECT conversation_id, node_name, summary, terms, vector FROM node_vectors"
+            ):
+                terms = set(row["terms"].split()) if row["terms"] else set()
+                self._count_terms(terms, 1)
+                self._set_row(row["conversation_id"], row["node_name"], row["summary"], terms,
+                              np.frombuffer(row["vector"], dtype=np.float32))
+        self.loaded = True
+        print(f"[INFO] Semantic index loaded: {len(self.rows)} nodes")
+
+    def index_conversation(self, conversation_id: str, graph_data: list) -> int:
+        """
+        Incrementally (re)index the nodes of a saved conversation; only nodes whose
+        name or summary changed are re-vectorized. Returns the number of changed nodes.
+        """
+        nodes = {}
+        for node in ConversationGraph.from_graph_data(graph_data):
+            name = node.get("node_name")
+            if name:
+                nodes[name] = node
+
+        with self.lock:
+            self.load()
+            with _connect() as conn:
+                existing = {
+                    row["node_name"]: (row["digest"], row["terms"])
+                    for row in conn.execute(
+                        "SELECT node_name, digest, terms FROM node_vectors WHERE conversation_id = ?",
+                        (conversation_id,),
+                    )
+                }
+                changed = 0
+                for name, (digest, terms) in existing.items():
+                    node = nodes.get(name)
+                    if node is None or hashlib.sha1(_node_text(node).encode("utf-8")).hexdigest() != digest:
+                        self._count_terms(set(terms.split()) if terms else set(), -1)
+                        self._drop_row(conversation_id, name)
+                        conn.execute(
+                            "DELETE FROM node_vectors WHERE conversation_id = ? AND node_name = ?",
+                            (conversation_id, name),
+                        )
+                        changed += node is None
+
+                pending = []
+                for name, node in nodes.items():
+                    digest = hashlib.sha1(_node_text(node).encode("utf-8")).hexdigest()
+                    if name in existing and existing[name][0] == digest:
+                        continue
+                    terms = node_shingles(node)
+                    self._count_terms(terms, 1)
+                    pending.append((name, node, digest, terms))
+
+                # vectorize after counting so the whole batch sees the same IDF weights
+                for name, node, digest, terms in pending:
+                    vector = self.vectorize(terms)
+                    self._set_row(conversation_id, name, node.get("summary"), terms, vector)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO node_vectors "
+                        "(conversation_id, node_name, summary, digest, terms, vector) VALUES (?, ?, ?, ?, ?, ?)",
+                        (conversation_id, name, node.get("summary"), digest,
+                         " ".join(sorted(terms)), vector.astype(np.float32).tobytes()),
+                    )
+                changed += len(pending)
+
+        print(f"[INFO] Semantic index updated for {conversation_id}: {changed} nodes changed")
+        return changed
+
+    # queries
+
+    def related_nodes(self, conversation_id: str, node: ConversationNode,
+                      conversation_ids: Set[str], limit: int = 10,
+                      min_similarity: float = MIN_SIMILARITY) -> List[dict]:
+        """
+        Most similar nodes from the other conversations in `conversation_ids`
+        """
+        with self.lock:
+            self.load()
+            row = self.rows.get((conversation_id, node.get("node_name")))
+            if row is not None:
+                query = self.matrix[row].copy()
+                buckets = self.row_buckets[row]
+            else:
+                terms = node_shingles(node)
+                query = self.vectorize(terms)
+                buckets = tuple({_term_hash(term)[0] for term in terms})
+            if not query.any():
+                return []
+
+            # one extra slot so free rows (-1) index a False entry
+            allowed = np.zeros(len(self.conversation_numbers) + 1, dtype=bool)
+            for c in conversation_ids:
+                if c != conversation_id and c in self.conversation_numbers:
+                    allowed[self.conversation_numbers[c]] = True
+            if not allowed.any():
+                return []
+            rows = self._candidate_rows(buckets, allowed)
+            if not len(rows):
+                return []
+            scores = self.matrix[rows] @ query
+
+            k = min(limit, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {
+                    "conversation_id": self.row_keys[row][0],
+                    "node_name": self.row_keys[row][1],
+                    "summary": self.summaries.get(row),
+                    "score": float(score),
+                }
+                for row, score in zip(rows[top].tolist(), scores[top].tolist())
+                if score >= min_similarity
+            ]
+
+
+semantic_index = SemanticIndex()
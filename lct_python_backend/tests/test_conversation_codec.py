@@ -0,0 +1,77 @@
+import gzip
+import json
+
+import pytest
+
+from lct_python_backend import conversation_codec
+from lct_python_backend.conversation_codec import decode_conversation, encode_conversation, pack_chunks, unpack_chunks
+
+CONVERSATION = {
+    "file_name": "Zoë's call",
+    "graph_data": [[{"node_name": "A", "summary": "naïve — ok", "linked_nodes": [], "is_bookmark": False}]],
+    "chunk_dict": {"c1": "first chunk", "c2": ""},
+    "version": 3,
+}
+
+
+def formats():
+    params = []
+    for encoding in ("json", "msgpack"):
+        for compression in ("none", "gzip", "zstd"):
+            marks = []
+            if encoding == "msgpack" and conversation_codec.msgpack is None:
+                marks.append(pytest.mark.skip(reason="msgpack is not installed"))
+            if compression == "zstd" and conversation_codec.zstandard is None:
+                marks.append(pytest.mark.skip(reason="zstandard is not installed"))
+            params.append(pytest.param(encoding, compression, marks=marks, id=f"{encoding}-{compression}"))
+    return params
+
+
+@pytest.mark.parametrize("encoding,compression", formats())
+def test_round_trip(encoding, compression):
+    raw = encode_conversation(CONVERSATION, encoding=encoding, compression=compression)
+    assert raw.startswith(b"LCT")
+    assert decode_conversation(raw) == CONVERSATION
+
+
+def test_encoding_is_deterministic():
+    assert encode_conversation(CONVERSATION, compression="gzip") == encode_conversation(CONVERSATION, compression="gzip")
+
+
+def test_missing_zstandard_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setattr(conversation_codec, "zstandard", None)
+    raw = encode_conversation(CONVERSATION, encoding="json", compression="zstd")
+    assert raw[5:6] == b"g"
+    assert decode_conversation(raw) == CONVERSATION
+
+
+def test_legacy_json_objects():
+    legacy = json.dumps(CONVERSATION, indent=2).encode("utf-8")
+    assert decode_conversation(legacy) == CONVERSATION
+    assert decode_conversation(gzip.compress(legacy)) == CONVERSATION
+
+
+def test_unknown_format_version():
+    raw = bytearray(encode_conversation(CONVERSATION, compression="none"))
+    raw[3] = 99
+    with pytest.raises(ValueError):
+        decode_conversation(bytes(raw))
+
+
+def test_unknown_options():
+    with pytest.raises(ValueError):
+        encode_conversation(CONVERSATION, encoding="yaml")
+    with pytest.raises(ValueError):
+        encode_conversation(CONVERSATION, compression="brotli")
+
+
+def test_chunk_pack_round_trip_and_range_reads():
+    chunks = {"c1": "first chunk", "c2": "", "c3": "third " * 100}
+    index, pack = pack_chunks(chunks)
+    assert unpack_chunks(index, pack) == chunks
+    for chunk_id, (offset, length) in index.items():
+        assert decode_conversation(pack[offset:offset + length]) == chunks[chunk_id]
+
+
+def test_empty_chunk_pack():
+    assert pack_chunks({}) == ({}, b"")
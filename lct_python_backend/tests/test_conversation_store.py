@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from lct_python_backend.conversation_store import (
+    decode_cursor, encode_cursor, merge_accessible_conversations, merge_newest_first,
+)
+
+
+def row(conversation_id, day):
+    return {"id": conversation_id, "created_at": datetime(2025, 1, day, tzinfo=timezone.utc)}
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 4, 5, 6, 7, 890, tzinfo=timezone.utc)
+    token = encode_cursor({"id": "conv-1", "created_at": created_at})
+    assert "=" not in token
+    assert decode_cursor(token) == (created_at, "conv-1")
+
+
+def test_cursor_from_a_string_timestamp():
+    token = encode_cursor({"id": 7, "created_at": "2025-03-04T05:06:07"})
+    assert decode_cursor(token) == (datetime(2025, 3, 4, 5, 6, 7), "7")
+
+
+@pytest.mark.parametrize("token", ["", "not base64!", "bm90IGpzb24", "WyJ4Il0"])
+def test_malformed_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_merge_is_newest_first_across_streams():
+    merged = merge_newest_first([row("a", 9), row("b", 5)], [row("c", 7), row("d", 1)], [row("e", 6)])
+    assert [r["id"] for r in merged] == ["a", "c", "e", "b", "d"]
+
+
+def test_merge_breaks_ties_by_id():
+    merged = merge_newest_first([row("a", 3)], [row("b", 3)])
+    assert [r["id"] for r in merged] == ["b", "a"]
+
+
+def test_merge_yields_a_conversation_once_from_the_earliest_stream():
+    first, second = row("a", 3), row("a", 3)
+    merged = list(merge_newest_first([first], [second, row("b", 1)]))
+    assert [r["id"] for r in merged] == ["a", "b"]
+    assert merged[0] is first
+
+
+def test_accessible_merge_prefers_ownership():
+    owned = [row("a", 5), row("b", 2)]
+    shared = [row("c", 4), row("b", 2)]
+    merged = list(merge_accessible_conversations(owned, shared))
+    assert [(r["id"], r["access_type"]) for r in merged] == [("a", "owner"), ("c", "shared"), ("b", "owner")]
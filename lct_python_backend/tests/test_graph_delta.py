@@ -0,0 +1,57 @@
+import copy
+
+import pytest
+
+from lct_python_backend.conversation_graph import ConversationGraph
+from lct_python_backend.graph_delta import build_graph_delta, build_graph_snapshot
+from lct_python_backend.graph_repair import repair_and_add_nodes
+from lct_python_backend.node_store import CompactNodeStore
+
+
+def node(name, chunk_id, **fields):
+    return dict({"node_name": name, "summary": name.lower(), "chunk_id": chunk_id, "linked_nodes": []}, **fields)
+
+
+def apply_delta(nodes, delta):
+    """
+    What the client does with a graph_delta
+    """
+    by_name = {n["node_name"]: n for n in nodes}
+    for update in delta["updated_nodes"]:
+        by_name[update["node_name"]].update(update["fields"])
+    nodes.extend(copy.deepcopy(delta["added_nodes"]))
+
+
+@pytest.mark.parametrize("graph_class", [ConversationGraph, CompactNodeStore])
+def test_deltas_rebuild_the_graph(graph_class):
+    graph = graph_class()
+    client = []
+    batches = [
+        [node("Road trip", "c1")],
+        [node("Sleep", "c2", linked_nodes=["Road trip", "Unknown"], contextual_relation={"Road trip": "finals"})],
+        [node("Movies", "c3", linked_nodes=["Sleep"]), node("Sleep", "c3")],
+    ]
+    for seq, batch in enumerate(batches, start=1):
+        repair = repair_and_add_nodes(graph, batch)
+        delta = build_graph_delta(seq, graph, repair, {batch[0]["chunk_id"]: f"text {seq}"})
+        assert delta["type"] == "graph_delta" and delta["seq"] == seq
+        assert delta["new_chunks"] == {batch[0]["chunk_id"]: f"text {seq}"}
+        apply_delta(client, delta)
+        assert client == graph.nodes
+
+
+def test_delta_carries_nodes_as_stored():
+    graph = ConversationGraph()
+    repair_and_add_nodes(graph, [node("A", "c1")])
+    repair = repair_and_add_nodes(graph, [node("B", "c2", linked_nodes=["A", "Gone"])])
+    delta = build_graph_delta(2, graph, repair, {})
+    assert delta["added_nodes"] == [graph.get_node("B")]
+    assert delta["added_nodes"][0]["linked_nodes"] == ["A"]
+    assert delta["updated_nodes"] == [{"node_name": "A", "fields": {"linked_nodes": ["B"], "successor": "B"}}]
+
+
+def test_snapshot_is_the_full_state():
+    graph = ConversationGraph()
+    repair_and_add_nodes(graph, [node("A", "c1"), node("B", "c1")])
+    snapshot = build_graph_snapshot(5, graph, {"c1": "text"})
+    assert snapshot == {"type": "graph_snapshot", "seq": 5, "graph_data": graph.to_graph_data(), "chunk_dict": {"c1": "text"}}
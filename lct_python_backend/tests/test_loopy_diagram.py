@@ -0,0 +1,49 @@
+import pytest
+
+from lct_python_backend.loopy_diagram import parse_loopy_reply, strongly_connected_components
+
+NODES = '[[1,100,100,0.5,"Stress",0],[2,300,100,0.5,"Sleep",1]]'
+EDGES = '[[1,2,20,1,0],[2,1,20,1,0]]'
+
+
+def test_reply_continues_the_prefill():
+    data = parse_loopy_reply(f"{NODES}, {EDGES}, [], 2]")
+    assert data[0][1][4] == "Sleep"
+    assert len(data[1]) == 2
+
+
+def test_fenced_continuation_is_unfenced_before_the_prefill():
+    data = parse_loopy_reply(f"```json\n{NODES}, {EDGES}, [], 2]\n```")
+    assert [node[4] for node in data[0]] == ["Stress", "Sleep"]
+
+
+def test_reply_that_starts_the_structure_over():
+    data = parse_loopy_reply(f"```\n[{NODES}, {EDGES}, [], 2]\n```\nThe loop reinforces itself.")
+    assert [node[4] for node in data[0]] == ["Stress", "Sleep"]
+    assert data[3] == 2
+
+
+def test_reply_without_a_structure():
+    with pytest.raises(ValueError):
+        parse_loopy_reply("I can't draw that.")
+
+
+def test_components_of_two_cycles_and_a_chain():
+    # 0 <-> 1 -> 2 -> 3 -> 2, 4 alone
+    components = strongly_connected_components(5, [(0, 1), (1, 0), (1, 2), (2, 3), (3, 2)])
+    assert sorted(components) == [[0, 1], [2, 3], [4]]
+
+
+def test_components_come_out_in_reverse_topological_order():
+    components = strongly_connected_components(4, [(0, 1), (1, 2), (2, 1), (2, 3)])
+    assert components.index([3]) < components.index([1, 2]) < components.index([0])
+
+
+def test_self_loop_is_its_own_component():
+    assert strongly_connected_components(2, [(0, 0), (0, 1)]) == [[1], [0]]
+
+
+def test_long_cycle_does_not_recurse():
+    n = 20_000
+    edges = [(i, (i + 1) % n) for i in range(n)]
+    assert strongly_connected_components(n, edges) == [list(range(n))]